@@ -0,0 +1,352 @@
+"""Performance benchmarks for the hot paths of NRE-AI.
+
+Times observation building, action execution, rule-based planning, the
+training environment, world sanitizing and the bot manager on the test world
+and on generated worlds of different sizes.
+Results are written as JSON and can be compared against a stored baseline:
+
+    python scripts/benchmark.py --output bench.json
+    python scripts/benchmark.py --compare bench.json --tolerance 0.25
+"""
+
+import contextlib
+import copy
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from time import perf_counter
+
+from nrecity import CityProcessor, JsonManager
+
+from nre_ai.agent import AIAgent
+from nre_ai.bot_state_processor import BotStateProcessor
+from nre_ai.manager import BotManager
+from nre_ai.mechanics import execute_action, get_observation, sanitize_city_data
+from nre_ai.trading_env import TradingEnv
+from nre_ai.worldgen import generate_world
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_PATH = os.path.join(os.path.dirname(SCRIPTS_DIR), "tests", "test_city_data.json")
+
+DEFAULT_CITIES = [38, 1000, 10000]
+DEFAULT_BOTS = [1, 100, 10000]
+# Cells changed between two economy updates in the sanitize benchmark
+DIRTY_CELLS = 10
+
+
+def load_cities(world_path: str) -> dict:
+    """Builds the City objects of a world file."""
+    processor = CityProcessor(JsonManager(world_path))
+    return processor.get_dict_of_cities("after")
+
+
+def time_call(func, min_time: float, repeat: int, setup=None) -> dict:
+    """Times func, calling it until each of `repeat` rounds lasts min_time.
+
+    Args:
+        func (callable): The function to time, called without arguments.
+        min_time (float): Minimum duration of a single round in seconds.
+        repeat (int): Number of rounds.
+        setup (callable | None): Called without arguments before every
+            round, outside the timing, e.g. to restore the world func changes.
+
+    Returns:
+        dict: Per-call timings in seconds and the total number of calls.
+    """
+    per_call = []
+    calls = 0
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        number = 0
+        start = perf_counter()
+        while True:
+            func()
+            number += 1
+            elapsed = perf_counter() - start
+            if elapsed >= min_time:
+                break
+        per_call.append(elapsed / number)
+        calls += number
+
+    return {
+        "median_s": statistics.median(per_call),
+        "mean_s": statistics.fmean(per_call),
+        "min_s": min(per_call),
+        "calls": calls,
+    }
+
+
+def _first_connected_city(cities: dict) -> str:
+    for name, city in cities.items():
+        if city.connections:
+            return name
+    return next(iter(cities))
+
+
+def _result(name: str, timing: dict, n_cities: int, n_bots: int = 1) -> dict:
+    return {"name": name, "cities": n_cities, "bots": n_bots, **timing}
+
+
+class World:
+    """Fresh copies of a world, so trades timed before do not drain later ones."""
+
+    def __init__(self, cities: dict):
+        """Keeps the world to copy; it is never handed out itself."""
+        self._pristine = copy.deepcopy(cities)
+        self.cities = self.fresh()
+
+    def fresh(self) -> dict:
+        """Returns a new copy of the world."""
+        return copy.deepcopy(self._pristine)
+
+    def reset(self):
+        """Replaces self.cities with a new copy."""
+        self.cities = self.fresh()
+
+
+def bench_world(world_path: str, world: World, args) -> list[dict]:
+    """Benchmarks mechanics, rule-based planning and the environment.
+
+    Every benchmark round starts from a fresh copy of the world.
+    """
+    n_cities = len(world.cities)
+    start_city = _first_connected_city(world.cities)
+    results = []
+
+    def time_world(func):
+        return time_call(func, args.min_time, args.repeat, setup=world.reset)
+
+    # Mechanics
+    agent = AIAgent("BenchBot", 10000, start_city)
+    timing = time_world(lambda: get_observation(agent, world.cities))
+    results.append(_result("get_observation", timing, n_cities))
+
+    actions = itertools.cycle(range(21))
+
+    def run_action():
+        agent.money = 10000
+        agent.current_city_name = start_city
+        execute_action(next(actions), agent, world.cities)
+
+    timing = time_world(run_action)
+    results.append(_result("execute_action", timing, n_cities))
+
+    # Rule-based planning
+    planner = AIAgent("BenchBot", 10000, start_city)
+    timing = time_world(
+        lambda: planner._find_best_trade(
+            world.cities[start_city], world.cities, only_local=False
+        )
+    )
+    results.append(_result("AIAgent._find_best_trade", timing, n_cities))
+
+    def take_turn():
+        planner.money = 10000
+        planner.inventory = {}
+        planner.travel_plan = None
+        planner.trade_plan = []
+        planner.current_city_name = start_city
+        planner.take_turn(world.cities)
+
+    timing = time_world(take_turn)
+    results.append(_result("AIAgent.take_turn", timing, n_cities))
+
+    # Training environment (works on a private copy, it rewrites the file)
+    env_path = world_path + ".env.json"
+    shutil.copy(world_path, env_path)
+    env = TradingEnv(env_path)
+    timing = time_call(env.reset, args.min_time, args.repeat)
+    results.append(_result("TradingEnv.reset", timing, n_cities))
+
+    def env_step():
+        _, _, terminated, truncated, _ = env.step(env.action_space.sample())
+        if terminated or truncated:
+            env.reset()
+
+    env.reset()
+    timing = time_call(env_step, args.min_time, args.repeat)
+    results.append(_result("TradingEnv.step", timing, n_cities))
+
+    # The economy update of a step: clamping, nrecity's update, rebuilding cities
+    env.reset()
+    timing = time_call(env._update_economy, args.min_time, args.repeat)
+    results.append(_result("TradingEnv._update_economy", timing, n_cities))
+    timing = time_call(env._load_cities, args.min_time, args.repeat)
+    results.append(_result("TradingEnv._load_cities", timing, n_cities))
+
+    return results
+
+
+def bench_sanitize(world_path: str, n_cities: int, args) -> list[dict]:
+    """Benchmarks clamping the whole world against clamping a few changed cells.
+
+    The second one should not depend on the world size.
+    """
+    with open(world_path) as f:
+        city_data_list = json.load(f)["after"]
+    step = max(len(city_data_list) // DIRTY_CELLS, 1)
+    cells = [(row, "gems") for row in range(0, len(city_data_list), step)][:DIRTY_CELLS]
+
+    timing = time_call(
+        lambda: sanitize_city_data(city_data_list), args.min_time, args.repeat
+    )
+    results = [_result("sanitize_city_data", timing, n_cities)]
+    timing = time_call(
+        lambda: sanitize_city_data(city_data_list, cells), args.min_time, args.repeat
+    )
+    results.append(_result(f"sanitize_city_data[{len(cells)} cells]", timing, n_cities))
+    return results
+
+
+def bench_bots(world: World, n_bots: int, args) -> list[dict]:
+    """Benchmarks the first BotManager turn of n_bots rule-based bots.
+
+    Every round starts new bots on a fresh copy of the world.
+    """
+    city_names = list(world.cities)
+    with tempfile.TemporaryDirectory() as state_dir:
+        managers = []
+
+        def setup():
+            world.reset()
+            manager = BotManager(BotStateProcessor(state_dir))
+            for i in range(n_bots):
+                manager.add_bot(
+                    AIAgent(f"bot{i}", 10000, city_names[i % len(city_names)])
+                )
+            managers[:] = [manager]
+
+        # A single turn of many bots already takes long enough to time
+        timing = time_call(
+            lambda: managers[0].run_all_turns(world.cities), 0, args.repeat, setup=setup
+        )
+    return [_result("BotManager.run_all_turns", timing, len(world.cities), n_bots)]
+
+
+def _print_results(results: list[dict]):
+    for r in results:
+        print(
+            f"{r['name']:<28} cities={r['cities']:<7} bots={r['bots']:<6}"
+            f" median={r['median_s']:.6f}s"
+        )
+
+
+def compare(results: list[dict], baseline_path: str, tolerance: float) -> list[dict]:
+    """Returns the results that are slower than the baseline by more than tolerance.
+
+    Args:
+        results (list[dict]): The current benchmark results.
+        baseline_path (str): Path of a JSON report written by this script.
+        tolerance (float): Allowed relative slowdown, e.g. 0.25 for 25%.
+
+    Returns:
+        list[dict]: One entry per regressed benchmark.
+    """
+    with open(baseline_path) as f:
+        baseline = {
+            (r["name"], r["cities"], r["bots"]): r for r in json.load(f)["results"]
+        }
+
+    regressions = []
+    for result in results:
+        previous = baseline.get((result["name"], result["cities"], result["bots"]))
+        if previous is None or previous["median_s"] <= 0:
+            continue
+
+        ratio = result["median_s"] / previous["median_s"]
+        if ratio > 1 + tolerance:
+            regressions.append(
+                {
+                    "name": result["name"],
+                    "cities": result["cities"],
+                    "bots": result["bots"],
+                    "baseline_s": previous["median_s"],
+                    "current_s": result["median_s"],
+                    "ratio": ratio,
+                }
+            )
+    return regressions
+
+
+def run_benchmarks():
+    """Runs the benchmark suite from the command line."""
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--cities", nargs="+", type=int, default=DEFAULT_CITIES, help="World sizes."
+    )
+    parser.add_argument(
+        "--bots", nargs="+", type=int, default=DEFAULT_BOTS, help="Bot counts."
+    )
+    parser.add_argument(
+        "--min-time", type=float, default=0.2, help="Minimum seconds per round."
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Rounds per benchmark.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of generated worlds.")
+    parser.add_argument("--output", default="bench_output.json", help="Report path.")
+    parser.add_argument("--compare", default=None, help="Baseline report to compare.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed relative slowdown before a benchmark counts as regressed.",
+    )
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir, open(os.devnull, "w") as devnull:
+        for n_cities in args.cities:
+            if n_cities == 38:
+                world_path = os.path.join(work_dir, "world_38.json")
+                shutil.copy(TEMPLATE_PATH, world_path)
+            else:
+                world_path = os.path.join(work_dir, f"world_{n_cities}.json")
+                generate_world(world_path, n_cities, seed=args.seed)
+            world = World(load_cities(world_path))
+
+            # Agents print every decision, keep the report readable
+            with contextlib.redirect_stdout(devnull):
+                world_results = bench_world(world_path, world, args)
+            world_results.extend(bench_sanitize(world_path, len(world.cities), args))
+            _print_results(world_results)
+            results.extend(world_results)
+
+            for n_bots in args.bots:
+                with contextlib.redirect_stdout(devnull):
+                    bot_results = bench_bots(world, n_bots, args)
+                _print_results(bot_results)
+                results.extend(bot_results)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {args.output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for r in regressions:
+            print(
+                f"REGRESSION {r['name']} cities={r['cities']} bots={r['bots']}: "
+                f"{r['baseline_s']:.6f}s -> {r['current_s']:.6f}s (x{r['ratio']:.2f})"
+            )
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.compare}.")
+
+
+if __name__ == "__main__":
+    run_benchmarks()
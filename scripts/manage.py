@@ -3,13 +3,25 @@
 import os
 import shutil
 from argparse import ArgumentParser
+from contextlib import ExitStack, nullcontext, redirect_stdout
+from time import perf_counter
 
-import matplotlib.pyplot as plt
-import pandas as pd
 from nrecity import CityProcessor, JsonManager
 
 from nre_ai.agent import AIAgent
+from nre_ai.history import HistoryWriter, plot_history
+from nre_ai.metrics import (
+    BANKRUPTCIES,
+    ECONOMY_UPDATES,
+    EXPORT_FORMATS,
+    REGISTRY,
+    TURN_LATENCY,
+    TextfileExporter,
+)
 from nre_ai.rl_agent import RLAgent
+from nre_ai.simulation import ScratchWorld
+from nre_ai.trajectory import TrajectoryWriter, TurnRecorder
+from nre_ai.worldgen import generate_world
 
 MODEL_PATH = "models/trading_bot_v1.zip"
 
@@ -22,8 +34,80 @@ def run_ai_simulation():
         action="store_true",
         help="Use Reinforcement Learning agents instead of rule-based agents.",
     )
+    parser.add_argument(
+        "--world",
+        default=None,
+        help="World JSON to start from instead of tests/test_city_data.json.",
+    )
+    parser.add_argument(
+        "--generate",
+        type=int,
+        default=None,
+        metavar="N_CITIES",
+        help="Start from a freshly generated world with N_CITIES cities.",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Seed of the generated world."
+    )
+    parser.add_argument(
+        "--metrics-dir",
+        default=None,
+        help="Directory to periodically write performance metrics to.",
+    )
+    parser.add_argument(
+        "--metrics-format",
+        choices=EXPORT_FORMATS,
+        default="prom",
+        help="Format of the metrics file.",
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=15.0,
+        help="Seconds between metrics file writes.",
+    )
+    parser.add_argument(
+        "--record-dir",
+        default=None,
+        help="Directory to stream (obs, action, reward, done) transitions to.",
+    )
+    parser.add_argument(
+        "--turns", type=int, default=5099, help="Number of turns to simulate."
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Run without per-turn output or reloads; the world file is only "
+        "written at checkpoints and at the end (nrecity still saves a scratch "
+        "copy on every economy update).",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=0,
+        metavar="TURNS",
+        help="In headless mode, write the world file every TURNS turns "
+        "(0: only at the end).",
+    )
+    parser.add_argument(
+        "--history-dir",
+        default=None,
+        help="Directory to stream per-turn metrics to as CSV chunks "
+        "(default: scripts/simulation_history).",
+    )
+    parser.add_argument(
+        "--no-plot",
+        action="store_true",
+        help="Skip plotting; plot later with python -m nre_ai.history.",
+    )
     args = parser.parse_args()
 
+    exporter = None
+    if args.metrics_dir:
+        exporter = TextfileExporter(
+            REGISTRY, args.metrics_dir, args.metrics_format, args.metrics_interval
+        )
+
     # 1. Initialization
     data_path = os.getenv("DATA_PATH", None)
     if not data_path:
@@ -36,121 +120,159 @@ def run_ai_simulation():
     template_path = os.path.join(project_root, "tests", "test_city_data.json")
     target_path = os.path.join(data_path, "miasta.json")
     plot_path = os.path.join(scripts_dir, "simulation_progress.png")
+    history_dir = args.history_dir or os.path.join(scripts_dir, "simulation_history")
 
     # Reset game data
-    if not os.path.exists(template_path):
-        raise FileNotFoundError(
-            f"Template file not found at {template_path}. "
-            "Please ensure the test data exists."
-        )
-
-    print(f"Resetting simulation data from {template_path}...")
-    shutil.copy(template_path, target_path)
-
-    # Initialize managers with the fresh file
-    json_manager = JsonManager(target_path)
-    processor = CityProcessor(json_manager)
-
-    initial_cities = processor.get_dict_of_cities("after")
-    initial_city_name = list(initial_cities.keys())[0] if initial_cities else None
-
-    if not initial_city_name:
-        print("Error: No cities found in data file.")
-        return
-
-    if args.use_rl and os.path.exists(MODEL_PATH):
-        print("Using RL Agent.")
-        agent = RLAgent(
-            name="Bot1", money=1000, initial_city=initial_city_name, model_path=MODEL_PATH
-        )
+    if args.generate:
+        print(f"Generating a world with {args.generate} cities (seed {args.seed})...")
+        generate_world(target_path, args.generate, seed=args.seed)
     else:
-        print("Using Rule-Based Agent.")
-        agent = AIAgent(name="Bot1", money=1000, initial_city=initial_city_name)
-
-    print(f"AI starts with {agent.money} money in {agent.current_city_name}.")
-
-    # Data collection for plotting
-    history = []
+        if args.world:
+            template_path = args.world
+        if not os.path.exists(template_path):
+            raise FileNotFoundError(
+                f"Template file not found at {template_path}. "
+                "Please ensure the test data exists."
+            )
+
+        print(f"Resetting simulation data from {template_path}...")
+        shutil.copy(template_path, target_path)
+
+    with ExitStack() as stack:
+        # Initialize managers with the fresh file
+        world = None
+        if args.headless:
+            # Saved and cleaned up on exit, also when a turn raises
+            world = stack.enter_context(ScratchWorld(target_path))
+            json_manager = world.json_manager
+            processor = world.processor
+            initial_cities = world.cities
+        else:
+            json_manager = JsonManager(target_path)
+            processor = CityProcessor(json_manager)
+            initial_cities = processor.get_dict_of_cities("after")
+
+        initial_city_name = list(initial_cities.keys())[0] if initial_cities else None
+
+        if not initial_city_name:
+            print("Error: No cities found in data file.")
+            return
+
+        if args.use_rl and os.path.exists(MODEL_PATH):
+            print("Using RL Agent.")
+            agent = RLAgent(
+                name="Bot1",
+                money=1000,
+                initial_city=initial_city_name,
+                model_path=MODEL_PATH,
+            )
+        else:
+            print("Using Rule-Based Agent.")
+            agent = AIAgent(name="Bot1", money=1000, initial_city=initial_city_name)
+
+        print(f"AI starts with {agent.money} money in {agent.current_city_name}.")
+
+        recorder = None
+        if args.record_dir:
+            recorder = TurnRecorder(
+                stack.enter_context(TrajectoryWriter(args.record_dir))
+            )
+
+        # Per-turn metrics are streamed to disk in bounded chunks
+        history = stack.enter_context(HistoryWriter(history_dir))
+
+        # The bots report every decision, keep headless runs quiet
+        devnull = stack.enter_context(open(os.devnull, "w")) if world else None
+        start_time = perf_counter()
+        turn = 0
+
+        # 2. Simulation Loop
+        for turn in range(1, args.turns + 1):
+            if world:
+                # No reload, the cities are rebuilt by the economy update
+                cities_state = world.cities
+            else:
+                print(f"\n--- Turn {turn} ---")
+
+                # Reload data at the start of the turn
+                json_manager()
+
+                # Get current state of the world
+                # ('after' and 'cities' are identical at this point)
+                cities_state = processor.get_dict_of_cities("after")
+
+            # AI takes its turn, modifying the city objects in `cities_state`
+            if recorder:
+                recorder.before_turn(agent, cities_state)
+            start = perf_counter()
+            with redirect_stdout(devnull) if devnull else nullcontext():
+                agent.take_turn(cities_state)
+            TURN_LATENCY.observe(perf_counter() - start)
+            if recorder:
+                recorder.after_turn(agent, cities_state)
+
+            # Record state
+            history.add(
+                turn,
+                agent.money,
+                sum(item["quantity"] for item in agent.inventory.values()),
+            )
+
+            if agent.is_bankrupt():
+                BANKRUPTCIES.inc()
+                print("AI has gone bankrupt! Simulation over.")
+                break
+
+            if world:
+                # Only the traded quantities go back, the file is written at checkpoints
+                world.update_economy()
+                ECONOMY_UPDATES.inc()
+                if args.checkpoint_every and turn % args.checkpoint_every == 0:
+                    world.checkpoint()
+            else:
+                # Update the 'after' data with the results of the AI's actions
+                processor.json_manager.data["after"] = [
+                    c.to_dict() for c in cities_state.values()
+                ]
+                print(
+                    f"Has {agent.money:.2f} money.\nIs currently in "
+                    f"{agent.current_city_name}.\nCurrently possesses"
+                    f" {agent.inventory}.\n"
+                )
+                # Run the world processor. It will:
+                # 1. Compare 'cities' (before AI) and 'after' (after AI).
+                # 2. Calculate market changes based on the diff.
+                # 3. Save the new state to both 'cities' and 'after' for the next turn.
+                processor.process_changes()
+                ECONOMY_UPDATES.inc()
+
+            if exporter:
+                exporter.maybe_export()
+
+            if not world:
+                print(f"End of turn {turn}. AI has {agent.money:.2f} money.")
+
+        elapsed = perf_counter() - start_time
+
+    if world:
+        print(f"World saved to {world.path}")
 
-    # 2. Simulation Loop
-    for turn in range(1, 5100):
-        print(f"\n--- Turn {turn} ---")
-
-        # Reload data at the start of the turn
-        json_manager()
-
-        # Get current state of the world
-        # ('after' and 'cities' are identical at this point)
-        cities_state = processor.get_dict_of_cities("after")
-
-        # AI takes its turn, modifying the city objects in `cities_state`
-        agent.take_turn(cities_state)
-
-        # Record state
-        history.append(
-            {
-                "Turn": turn,
-                "Money": agent.money,
-                "Inventory_Count": sum(
-                    item["quantity"] for item in agent.inventory.values()
-                ),
-            }
-        )
+    print("\n--- Simulation Finished ---")
+    print(f"Simulated {turn} turns in {elapsed:.2f}s.")
+    print(f"Final AI state: Money = {agent.money:.2f}, Inventory = {agent.inventory}")
 
-        if agent.is_bankrupt():
-            print("AI has gone bankrupt! Simulation over.")
-            break
-
-        # Update the 'after' data with the results of the AI's actions
-        processor.json_manager.data["after"] = [
-            c.to_dict() for c in cities_state.values()
-        ]
-        print(
-            f"Has {agent.money:.2f} money.\nIs currently in "
-            f"{agent.current_city_name}.\nCurrently possesses"
-            f" {agent.inventory}.\n"
-        )
-        # Run the world processor. It will:
-        # 1. Compare 'cities' (before AI) and 'after' (after AI).
-        # 2. Calculate market changes based on the diff.
-        # 3. Save the new state to both 'cities' and 'after' for the next turn.
-        processor.process_changes()
+    if exporter:
+        print(f"Metrics written to {exporter.export()}")
 
-        print(f"End of turn {turn}. AI has {agent.money:.2f} money.")
+    if recorder:
+        print(f"Transitions saved to {args.record_dir}")
 
-    print("\n--- Simulation Finished ---")
-    print(f"Final AI state: Money = {agent.money:.2f}, Inventory = {agent.inventory}")
+    print(f"Per-turn metrics saved to {history_dir}")
 
     # 3. Generate Plot
-    if history:
-        df = pd.DataFrame(history)
-
-        plt.figure(figsize=(10, 6))
-
-        # Plot Money
-        plt.subplot(2, 1, 1)
-        plt.plot(df["Turn"], df["Money"], marker="o", color="b", label="Money")
-        plt.title("Bot Progress Over Time")
-        plt.ylabel("Money")
-        plt.grid(True)
-        plt.legend()
-
-        # Plot Inventory Count
-        plt.subplot(2, 1, 2)
-        plt.plot(
-            df["Turn"],
-            df["Inventory_Count"],
-            marker="x",
-            color="r",
-            label="Inventory Items",
-        )
-        plt.xlabel("Turn")
-        plt.ylabel("Item Count")
-        plt.grid(True)
-        plt.legend()
-
-        plt.tight_layout()
-        plt.savefig(plot_path)
+    if turn and not args.no_plot:
+        # matplotlib is only imported here, long runs are downsampled
+        plot_history(history_dir, plot_path)
         print(f"Simulation progress graph saved to {plot_path}")
 
 
@@ -5,18 +5,25 @@ each and every change in cities data to simulate the city's economy.
 """
 
 import os
-import random
-from argparse import ArgumentParser
+from argparse import ArgumentParser, Namespace
 
+import numpy as np
 from nrecity import CityProcessor, DataManager, EventProcessor
 
 from .agent import AIAgent
 from .bot_state_processor import BotStateProcessor
 from .manager import BotManager
+from .market_diff import WorldFeed
+from .metrics import ECONOMY_UPDATES, EXPORT_FORMATS, REGISTRY
+from .order_book import OrderBook
+from .planner import PlanningAgent
+from .profiling import PhaseProfiler, measure_imports, write_report
 from .rl_agent import RLAgent
+from .trajectory import TrajectoryWriter, TurnRecorder
 
 PATH: str = os.environ["DATA_PATH"]
 MODEL_PATH = "models/trading_bot_v1.zip"
+STARTING_CITIES = ["Rybnik", "Aleksandria", "Porto", "Afryka"]
 
 
 def needed_managers(data_manager: DataManager, path: str) -> None:
@@ -25,6 +32,45 @@ def needed_managers(data_manager: DataManager, path: str) -> None:
     data_manager.create_manager(path + "pre_event_miasta.json")
 
 
+def load_or_create_bot(
+    bot_processor: BotStateProcessor,
+    bot_name: str,
+    rng: np.random.Generator,
+    model=None,
+    agent_cls: type[AIAgent] = AIAgent,
+) -> AIAgent:
+    """Loads a bot from its saved state or creates it in a random starting city.
+
+    Args:
+        bot_processor (BotStateProcessor): Where the bot states are stored.
+        bot_name (str): The unique name of the bot.
+        rng (np.random.Generator): Random stream used to pick the start city.
+        model: Loaded PPO model; if given, the bot is an RLAgent using it,
+            otherwise a rule-based agent_cls.
+        agent_cls (type[AIAgent]): Class of rule-based bots, e.g.
+            planner.PlanningAgent.
+
+    Returns:
+        AIAgent: The bot.
+    """
+    bot_data = bot_processor.load_bot_state(bot_name)
+
+    if model is not None:
+        if bot_data:
+            print(f"Loading existing RL bot: {bot_name}")
+            return RLAgent.from_dict(bot_data, MODEL_PATH, model=model)
+        print(f"Creating new RL bot: {bot_name}")
+        city = str(rng.choice(STARTING_CITIES))
+        return RLAgent(bot_name, 10000, city, MODEL_PATH, model=model)
+
+    if bot_data:
+        print(f"Loading existing bot: {bot_name}")
+        return agent_cls.from_dict(bot_data)
+    print(f"Creating new bot: {bot_name}")
+    city = str(rng.choice(STARTING_CITIES))
+    return agent_cls(bot_name, 10000, city)
+
+
 def main() -> None:
     """Main function that runs the simulation."""
     parser = ArgumentParser()
@@ -46,67 +92,195 @@ def main() -> None:
         action="store_true",
         help="Use Reinforcement Learning agents instead of rule-based agents.",
     )
+    parser.add_argument(
+        "--mcts-budget-ms",
+        type=float,
+        default=None,
+        help="Plan the rule-based bots with MCTS within this many ms per bot.",
+    )
+    parser.add_argument(
+        "--batch-trades",
+        action="store_true",
+        help="Clear the bots' trades together after their turns (order independent).",
+    )
+    parser.add_argument(
+        "--metrics-dir",
+        default=None,
+        help="Directory to write performance metrics to (e.g. node exporter textfiles).",
+    )
+    parser.add_argument(
+        "--metrics-format",
+        choices=EXPORT_FORMATS,
+        default="prom",
+        help="Format of the metrics file.",
+    )
+
+    parser.add_argument(
+        "-t",
+        "--turns",
+        type=int,
+        default=1,
+        help="Number of turns to run in this process.",
+    )
+    parser.add_argument(
+        "--persist-every",
+        type=int,
+        default=0,
+        help="Save the bots every N turns (default: only after the last turn).",
+    )
+    parser.add_argument(
+        "--record-dir",
+        default=None,
+        help="Directory to append the bots' (obs, action, reward, done) transitions to.",
+    )
+
+    parser.add_argument(
+        "--profile",
+        default=None,
+        metavar="REPORT",
+        help="Write per-phase wall and CPU times to this JSON report.",
+    )
+    parser.add_argument(
+        "--profile-cprofile",
+        default=None,
+        metavar="PSTATS",
+        help="With --profile, also dump cProfile stats of the run to this file.",
+    )
+    parser.add_argument(
+        "--profile-imports",
+        action="store_true",
+        help="With --profile, also measure import costs with -X importtime.",
+    )
 
     print("Processing arguments...")
 
     args = parser.parse_args()
 
+    profiler = PhaseProfiler()
+    if not args.profile:
+        run(args, profiler)
+        return
+
+    cprofile = None
+    if args.profile_cprofile:
+        # Imported here, cProfile is only needed for profiled runs
+        import cProfile
+
+        cprofile = cProfile.Profile()
+        cprofile.enable()
+    try:
+        run(args, profiler)
+    finally:
+        if cprofile:
+            cprofile.disable()
+            cprofile.dump_stats(args.profile_cprofile)
+
+    imports = measure_imports() if args.profile_imports else None
+    extra = {"turns": args.turns, "use_rl": args.use_rl, "skip": args.skip}
+    report_path = write_report(
+        args.profile, profiler, imports, args.profile_cprofile, extra
+    )
+    print(f"Profile written to {report_path}")
+
+
+def run(args: Namespace, profiler: PhaseProfiler) -> None:
+    """Runs the turns requested by the parsed command line arguments.
+
+    Args:
+        args (Namespace): Arguments parsed by main().
+        profiler (PhaseProfiler): Records the time of every phase.
+    """
     print("Adding managers...")
 
-    data_manager = DataManager()
-    needed_managers(data_manager, PATH)
+    with profiler.phase("needed_managers"):
+        data_manager = DataManager()
+        needed_managers(data_manager, PATH)
 
     print("Processing...")
 
-    city_processor = CityProcessor(data_manager.get_manager("miasta"))
-    event_processor = EventProcessor(reset=args.reset)
+    with profiler.phase("processors"):
+        json_manager = data_manager.get_manager("miasta")
+        city_processor = CityProcessor(json_manager)
+        event_processor = EventProcessor(reset=args.reset)
 
+    bot_manager = None
+    writer = None
+    feed = None
     if args.ai is not None:
         print("Processing AI's...")
-        bot_processor = BotStateProcessor(PATH)
-        bot_manager = BotManager(bot_processor)
+        with profiler.phase("load_bots"):
+            bot_processor = BotStateProcessor(PATH)
+            bot_manager = BotManager(
+                bot_processor, order_book=OrderBook() if args.batch_trades else None
+            )
 
-        # Handle args.ai being a list (default) or a string (command line arg)
-        ai_arg = args.ai
-        if isinstance(ai_arg, list):
-            ai_arg = ai_arg[0]
-        num_bots = int(ai_arg)
+            # Handle args.ai being a list (default) or a string (command line arg)
+            ai_arg = args.ai
+            if isinstance(ai_arg, list):
+                ai_arg = ai_arg[0]
+            num_bots = int(ai_arg)
 
-        for x in range(num_bots):
-            bot_name = "bot" + str(x)
-            bot_data = bot_processor.load_bot_state(bot_name)
+            # One random stream per bot, adding bots does not change the others
+            seed_sequence = np.random.SeedSequence(args.seed[0] if args.seed else None)
+            bot_rngs = [np.random.default_rng(s) for s in seed_sequence.spawn(num_bots)]
 
+            model = None
             if args.use_rl and os.path.exists(MODEL_PATH):
-                if bot_data:
-                    print(f"Loading existing RL bot: {bot_name}")
-                    bot = RLAgent.from_dict(bot_data, MODEL_PATH)
-                else:
-                    print(f"Creating new RL bot: {bot_name}")
-                    city: str = random.choice(
-                        ["Rybnik", "Aleksandria", "Porto", "Afryka"]
-                    )
-                    bot = RLAgent(bot_name, 10000, city, MODEL_PATH)
-            else:
-                if bot_data:
-                    print(f"Loading existing bot: {bot_name}")
-                    bot = AIAgent.from_dict(bot_data)
-                else:
-                    print(f"Creating new bot: {bot_name}")
-                    city: str = random.choice(
-                        ["Rybnik", "Aleksandria", "Porto", "Afryka"]
-                    )
-                    bot = AIAgent(bot_name, 10000, city)
-
-            bot_manager.add_bot(bot)
-
-        bot_manager.run_all_turns(city_processor.get_dict_of_cities("after"))
-
-    print("Applying changes...")
-    if not args.skip:
-        city_processor.process_changes()
-
-    print("Choosing events...")
-    if not args.skip_events:
-        event_processor.run()
+                # Loaded once, shared by every RL bot
+                model = RLAgent.load_model(MODEL_PATH)
+
+            agent_cls = AIAgent if args.mcts_budget_ms is None else PlanningAgent
+            for x in range(num_bots):
+                bot = load_or_create_bot(
+                    bot_processor, "bot" + str(x), bot_rngs[x], model, agent_cls
+                )
+                if isinstance(bot, PlanningAgent):
+                    bot.planner.budget_ms = args.mcts_budget_ms
+                bot_manager.add_bot(bot)
+
+            if args.record_dir:
+                writer = TrajectoryWriter(args.record_dir)
+                bot_manager.add_hook(TurnRecorder(writer))
+
+            # Moves MARKETS and ROUTES to every new world by its diff, only
+            # for bots that plan with them
+            if any(bot.uses_world_index for bot in bot_manager.bots):
+                feed = WorldFeed()
+
+    for turn in range(1, args.turns + 1):
+        if args.turns > 1:
+            print(f"Turn {turn}/{args.turns}")
+        last_turn = turn == args.turns
+        persist = last_turn or (args.persist_every > 0 and turn % args.persist_every == 0)
+
+        if bot_manager is not None:
+            # The world after the last economy update and events
+            cities = city_processor.get_dict_of_cities("after")
+            if feed is not None:
+                with profiler.phase("market_diff"):
+                    feed.push(cities)
+            with profiler.phase("run_all_turns"):
+                bot_manager.run_all_turns(cities, save=persist)
+
+        print("Applying changes...")
+        if not args.skip:
+            with profiler.phase("process_changes"):
+                city_processor.process_changes()
+                ECONOMY_UPDATES.inc()
+
+        print("Choosing events...")
+        if not args.skip_events:
+            with profiler.phase("events"):
+                event_processor.run()
+                if not last_turn:
+                    # Events edit the world file, the next turn must see them
+                    json_manager()
+
+    if writer:
+        writer.close()
+
+    if args.metrics_dir:
+        metrics_path = REGISTRY.write_textfile(args.metrics_dir, args.metrics_format)
+        print(f"Metrics written to {metrics_path}")
 
     print("Done!")
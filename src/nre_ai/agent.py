@@ -1,8 +1,16 @@
 """Base simple bots."""
 
+from collections.abc import Callable
+
 from nrecity import City
 from nrecity import factory as nrecity_factory_map
 
+from nre_ai.market_index import MARKETS
+from nre_ai.mechanics import buy_action, sell_action, travel_action
+from nre_ai.metrics import PLAN_CACHE_HITS, REPLANS, TRADES, TRAVELS
+from nre_ai.order_book import OrderBook
+from nre_ai.routing import ROUTES, RouteTable
+
 # Constants
 ITEM_WEIGHTS = {
     "gems": 1.0,
@@ -12,11 +20,61 @@ ITEM_WEIGHTS = {
     "relics": 10.0,
 }
 MAX_WEIGHT = 1000.0
+# Trades planned ahead, and how far (relative) a tracked price or fee may move
+# before the plan is recomputed
+PLAN_HORIZON = 3
+PLAN_TOLERANCE = 0.1
+# Best markets per held commodity considered beyond the neighbors
+MARKET_CANDIDATES = 5
+
+
+class TradeLeg:
+    """One planned trade: buy item in origin, sell it in destination."""
+
+    __slots__ = ("buy_price", "destination", "fee", "item", "origin", "sell_price")
+
+    def __init__(
+        self,
+        origin: str,
+        item: str,
+        destination: str,
+        buy_price: float,
+        sell_price: float,
+        fee: float,
+    ):
+        """Initializes the leg with the values it was planned with.
+
+        Args:
+            origin (str): City to buy in.
+            item (str): Commodity.
+            destination (str): Neighbor of origin to sell in.
+            buy_price (float): Price of item in origin.
+            sell_price (float): Estimated sell price in destination.
+            fee (float): Fee of destination.
+        """
+        self.origin = origin
+        self.item = item
+        self.destination = destination
+        self.buy_price = buy_price
+        self.sell_price = sell_price
+        self.fee = fee
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TradeLeg":
+        """Creates a leg from to_dict output."""
+        return cls(**data)
+
+    def to_dict(self) -> dict:
+        """Exports the leg to a JSON compatible dictionary."""
+        return {name: getattr(self, name) for name in self.__slots__}
 
 
 class AIAgent:
     """Represents the bot."""
 
+    # Plans with MARKETS and ROUTES, which run() then moves along the worlds
+    uses_world_index = True
+
     def __init__(
         self,
         name: str,
@@ -38,7 +96,19 @@ class AIAgent:
         self.inventory = {}
         self.current_city_name = initial_city
         self.travel_plan = None
+        # Cached trades of the next turns, revalidated instead of searched
+        self.trade_plan: list[TradeLeg] = []
+        self.plan_horizon = PLAN_HORIZON
+        self.plan_tolerance = PLAN_TOLERANCE
+        # TradingEnv action indices of the decisions taken in the last turn
+        self.turn_actions: list[int] = []
+        self.last_action: int | None = None
+        # Called with (bot, action) before every decision takes effect, e.g. by
+        # trajectory.TurnRecorder to observe the state the action was chosen in
+        self.action_hook: Callable[[AIAgent, int], None] | None = None
         self.factory_map = factory_map if factory_map is not None else nrecity_factory_map
+        # If set, trades are submitted to it instead of executed (see order_book)
+        self.order_book: OrderBook | None = None
 
     @classmethod
     def from_dict(cls, data: dict) -> "AIAgent":
@@ -54,6 +124,7 @@ class AIAgent:
         agent = cls(name=data["name"], money=data["zloto"], initial_city=initial_city)
 
         agent.inventory = data.get("inventory_full", {})
+        agent.trade_plan = [TradeLeg.from_dict(leg) for leg in data.get("trade_plan", [])]
 
         return agent
 
@@ -71,6 +142,7 @@ class AIAgent:
                 item: details["quantity"] for item, details in self.inventory.items()
             },
             "inventory_full": self.inventory,
+            "trade_plan": [leg.to_dict() for leg in self.trade_plan],
         }
 
     def _get_item_weight(self, item_name: str) -> float:
@@ -92,14 +164,20 @@ class AIAgent:
 
     def take_turn(self, cities: dict[str, City]):
         """Bot takes a turn, decides on actions."""
+        self.turn_actions = []
+
         # 1. Execute Travel
         if self.travel_plan:
             destination_name = self.travel_plan[0]
             if destination_name in cities:
                 fee = cities[destination_name].fee
                 if self.money >= fee:
+                    self._record_action(
+                        travel_action(cities[self.current_city_name], destination_name)
+                    )
                     self.money -= fee
                     self.current_city_name = destination_name
+                    TRAVELS.inc()
                     print(
                         f"Bot traveled to {self.current_city_name},"
                         f" paid {fee} fee. Money: {self.money}"
@@ -126,31 +204,56 @@ class AIAgent:
         else:
             self._plan_and_buy_empty_inventory(current_city, cities)
 
+        self.last_action = self.turn_actions[-1] if self.turn_actions else None
+
+    def _record_action(self, action: int | None):
+        """Remembers a decision as a TradingEnv action index.
+
+        Called before the decision changes the bot or the city.
+        """
+        if action is not None:
+            if self.action_hook is not None:
+                self.action_hook(self, action)
+            self.turn_actions.append(action)
+
+    def _should_sell(self, city: City, item_name: str) -> bool:
+        """Checks if a held commodity is worth selling in the city."""
+        if item_name not in city.commodities or not city.commodities[item_name]:
+            return False
+
+        details = city.commodities[item_name]
+        market_price = details["price"]
+        avg_buy_price = self.inventory[item_name]["avg_buy_price"]
+
+        # Scarcity check
+        regular_quantity = details.get("regular_quantity", 100)
+        city_quantity = details["quantity"]
+        is_scarce = city_quantity < 0.1 * regular_quantity
+
+        # Sell condition
+        return (market_price > avg_buy_price * 1.1) or is_scarce
+
     def _sell_commodities(self, city: City):
         """Sells commodities in the current city if profitable or high demand."""
         commodities_to_sell = list(self.inventory.keys())
         for item_name in commodities_to_sell:
-            if item_name not in city.commodities or not city.commodities[item_name]:
-                continue
-
-            details = city.commodities[item_name]
-            market_price = details["price"]
-            avg_buy_price = self.inventory[item_name]["avg_buy_price"]
-
-            # Scarcity check
-            regular_quantity = details.get("regular_quantity", 100)
-            city_quantity = details["quantity"]
-            is_scarce = city_quantity < 0.1 * regular_quantity
-
-            # Sell condition
-            if (market_price > avg_buy_price * 1.1) or is_scarce:
+            if self._should_sell(city, item_name):
+                details = city.commodities[item_name]
+                market_price = details["price"]
                 quantity_to_sell = self.inventory[item_name]["quantity"]
+                self._record_action(sell_action(item_name))
+
+                if self.order_book is not None:
+                    self.order_book.sell(self, city, item_name, quantity_to_sell)
+                    continue
 
                 if details["quantity"] is None:
                     details["quantity"] = 0
 
                 self.money += quantity_to_sell * market_price
                 details["quantity"] += quantity_to_sell
+                TRADES.inc()
+                MARKETS.touch(city, item_name)
 
                 print(
                     f"Bot sold {quantity_to_sell} of {item_name} in "
@@ -160,8 +263,14 @@ class AIAgent:
 
                 del self.inventory[item_name]
 
-    def _plan_with_inventory(self, current_city: City, cities: dict[str, City]):
-        """Plans travel when holding inventory."""
+    def _best_sell_destination(
+        self, current_city: City, cities: dict[str, City]
+    ) -> tuple[str | None, float]:
+        """Finds the neighbor where selling the inventory pays the most.
+
+        Returns:
+            tuple[str | None, float]: The destination and its estimated profit.
+        """
         best_profit = float("-inf")
         best_destination = None
 
@@ -193,21 +302,144 @@ class AIAgent:
                 best_profit = total_potential_profit
                 best_destination = neighbor_name
 
+        return best_destination, best_profit
+
+    def _plan_with_inventory(self, current_city: City, cities: dict[str, City]):
+        """Plans travel when holding inventory."""
+        best_destination, best_profit = self._best_sell_destination(current_city, cities)
+
         if best_destination and best_profit > 0:
             self.travel_plan = (best_destination, None)
             print(
                 f"Bot plans to travel to {best_destination} to sell inventory. "
                 f"Est profit: {best_profit}"
             )
+            return
+
+        # No neighbor pays, look further along the cheapest routes
+        routes = ROUTES.table(cities)
+        best_market, best_profit = self._best_remote_market(cities, routes)
+        if best_market and best_profit > 0:
+            next_hop = routes.next_hop(self.current_city_name, best_market)
+            self.travel_plan = (next_hop, None)
+            print(
+                f"Bot plans to travel via {next_hop} to {best_market} to sell "
+                f"inventory. Est profit: {best_profit}"
+            )
         else:
             self._fallback_travel(current_city, cities)
 
+    def _best_remote_market(
+        self, cities: dict[str, City], routes: RouteTable
+    ) -> tuple[str | None, float]:
+        """Finds the city where selling the inventory pays the most after the route fees.
+
+        Only the best reachable markets of every held commodity, read from the
+        market index, are compared.
+
+        Args:
+            cities (dict[str, City]): The world.
+            routes (RouteTable): Its cheapest routes.
+
+        Returns:
+            tuple[str | None, float]: The market and its estimated profit.
+        """
+        markets = MARKETS.view(cities)
+        candidates = {
+            name
+            for item_name in self.inventory
+            for name, _ in markets.best_sell(
+                item_name,
+                MARKET_CANDIDATES,
+                self.current_city_name,
+                routes,
+                budget=self.money,
+            )
+        }
+        best_profit = float("-inf")
+        best_market = None
+
+        for name in sorted(candidates):
+            commodities = cities[name].commodities
+            profit = -routes.distance(self.current_city_name, name, self.money)
+            for item_name, inv_details in self.inventory.items():
+                if item_name in commodities and commodities[item_name]:
+                    profit += (
+                        commodities[item_name]["price"] - inv_details["avg_buy_price"]
+                    ) * inv_details["quantity"]
+
+            if profit > best_profit:
+                best_profit = profit
+                best_market = name
+
+        return best_market, best_profit
+
+    def _estimate_sell_price(self, neighbor_details: dict, buy_price: float) -> float:
+        """Estimates the price a commodity will sell for in a neighbor."""
+        # Scarcity Heuristic
+        regular_price = neighbor_details.get("regular_price", buy_price)
+        regular_quantity = neighbor_details.get("regular_quantity", 100)
+        neighbor_quantity = neighbor_details.get("quantity", 0)
+        current_neighbor_price = neighbor_details.get("price", 0)
+
+        if neighbor_quantity < 0.1 * regular_quantity:
+            est_sell_price = regular_price * 1.5
+        else:
+            est_sell_price = regular_price * 0.8
+
+        # Update: Set est_sell_price = max(est_sell_price, current_neighbor_price)
+        return max(est_sell_price, current_neighbor_price)
+
+    def _trade_count(
+        self,
+        item_name: str,
+        details: dict,
+        fee: float,
+        current_weight: float,
+        money: float | None = None,
+    ) -> int:
+        """Returns how many units of a commodity the bot can buy and carry.
+
+        money defaults to the bot's money; planned trades pass the projected one.
+        """
+        if money is None:
+            money = self.money
+
+        # Constraints
+        # Money: reserve fee AND a small buffer.
+        buffer = 10
+        available_money = money - fee - buffer
+        if available_money <= 0:
+            return 0
+
+        max_count_money = int(available_money / details["price"])
+
+        # Weight
+        available_weight = MAX_WEIGHT - current_weight
+        if available_weight <= 0:
+            return 0
+        max_count_weight = int(available_weight / self._get_item_weight(item_name))
+
+        # Supply
+        max_count_supply = details["quantity"]
+
+        return max(0, min(max_count_money, max_count_weight, max_count_supply))
+
     def _find_best_trade(
-        self, current_city: City, cities: dict[str, City], only_local: bool
+        self,
+        current_city: City,
+        cities: dict[str, City],
+        only_local: bool,
+        money: float | None = None,
+        current_weight: float | None = None,
     ):
-        """Finds the best trade available in the current city."""
+        """Finds the best trade available in current_city.
+
+        money and current_weight default to the bot's own.
+        """
         best_trade = None  # (profit, item_name, destination, count, buy_price)
-        current_weight = self._calculate_current_weight()
+        if current_weight is None:
+            current_weight = self._calculate_current_weight()
 
         for item_name, details in current_city.commodities.items():
             if not details or details["quantity"] <= 0:
@@ -221,54 +453,22 @@ class AIAgent:
                 continue
 
             buy_price = details["price"]
-            item_weight = self._get_item_weight(item_name)
 
             # Simulate Trade with neighbors
             for neighbor_name in current_city.connections:
-                if neighbor_name not in cities or neighbor_name == self.current_city_name:
+                if neighbor_name not in cities or neighbor_name == current_city.name:
                     continue
 
                 neighbor_city = cities[neighbor_name]
                 fee = neighbor_city.fee
 
-                # Scarcity Heuristic
                 neighbor_details = neighbor_city.commodities.get(item_name)
                 if not neighbor_details:
                     continue
 
-                regular_price = neighbor_details.get("regular_price", buy_price)
-                regular_quantity = neighbor_details.get("regular_quantity", 100)
-                neighbor_quantity = neighbor_details.get("quantity", 0)
-                current_neighbor_price = neighbor_details.get("price", 0)
-
-                if neighbor_quantity < 0.1 * regular_quantity:
-                    est_sell_price = regular_price * 1.5
-                else:
-                    est_sell_price = regular_price * 0.8
-
-                # Update: Set est_sell_price = max(est_sell_price, current_neighbor_price)
-                est_sell_price = max(est_sell_price, current_neighbor_price)
-
-                # Constraints
-                # Money: reserve fee AND a small buffer.
-                buffer = 10
-                available_money = self.money - fee - buffer
-                if available_money <= 0:
-                    continue
-
-                max_count_money = int(available_money / buy_price)
-
-                # Weight
-                available_weight = MAX_WEIGHT - current_weight
-                if available_weight <= 0:
-                    continue
-                max_count_weight = int(available_weight / item_weight)
-
-                # Supply
-                max_count_supply = details["quantity"]
-
-                count = max(0, min(max_count_money, max_count_weight, max_count_supply))
+                est_sell_price = self._estimate_sell_price(neighbor_details, buy_price)
 
+                count = self._trade_count(item_name, details, fee, current_weight, money)
                 if count <= 0:
                     continue
 
@@ -284,28 +484,158 @@ class AIAgent:
                     )
         return best_trade
 
-    def _plan_and_buy_empty_inventory(self, current_city: City, cities: dict[str, City]):
-        """Plans trade and buys goods when inventory is empty."""
+    def _choose_trade(
+        self,
+        current_city: City,
+        cities: dict[str, City],
+        money: float | None = None,
+        current_weight: float | None = None,
+    ):
+        """Finds the trade to make with an empty inventory, None if unprofitable.
+
+        money and current_weight default to the bot's own.
+        """
         # First Pass: Prioritize high-margin trades (local production)
-        best_trade = self._find_best_trade(current_city, cities, only_local=True)
+        best_trade = self._find_best_trade(
+            current_city, cities, True, money, current_weight
+        )
 
         # Second Pass: If no valid trade is found, consider all commodities
         if not best_trade or best_trade[0] <= 0:
-            best_trade = self._find_best_trade(current_city, cities, only_local=False)
+            best_trade = self._find_best_trade(
+                current_city, cities, False, money, current_weight
+            )
 
         if best_trade and best_trade[0] > 0:
+            return best_trade
+        return None
+
+    def _is_close(self, value: float, expected: float) -> bool:
+        """Checks if a tracked value is within plan_tolerance of its plan."""
+        return abs(value - expected) <= self.plan_tolerance * max(abs(expected), 1.0)
+
+    def _leg_is_valid(self, leg: TradeLeg, cities: dict[str, City]) -> bool:
+        """Checks if the prices and fee of a planned trade are still close."""
+        if leg.origin not in cities or leg.destination not in cities:
+            return False
+        details = cities[leg.origin].commodities.get(leg.item)
+        destination = cities[leg.destination]
+        neighbor_details = destination.commodities.get(leg.item)
+        if not details or not neighbor_details:
+            return False
+        return (
+            self._is_close(details["price"], leg.buy_price)
+            and self._is_close(
+                self._estimate_sell_price(neighbor_details, details["price"]),
+                leg.sell_price,
+            )
+            and self._is_close(destination.fee, leg.fee)
+        )
+
+    def _cached_trade(self, current_city: City, cities: dict[str, City]):
+        """Returns the next planned trade if the plan still holds, else None.
+
+        The whole remaining route is revalidated, an O(route length) check;
+        a plan that does not start here or has drifted is dropped.
+        """
+        if not self.trade_plan:
+            return None
+        leg = self.trade_plan[0]
+        if leg.origin != current_city.name or not all(
+            self._leg_is_valid(planned, cities) for planned in self.trade_plan
+        ):
+            self.trade_plan = []
+            return None
+
+        details = current_city.commodities[leg.item]
+        fee = cities[leg.destination].fee
+        count = self._trade_count(
+            leg.item, details, fee, self._calculate_current_weight()
+        )
+        if count <= 0 or details["quantity"] <= 0:
+            self.trade_plan = []
+            return None
+
+        buy_price = details["price"]
+        sell_price = self._estimate_sell_price(
+            cities[leg.destination].commodities[leg.item], buy_price
+        )
+        profit = (sell_price - buy_price) * count - fee
+        if profit <= 0:
+            self.trade_plan = []
+            return None
+        return (profit, leg.item, leg.destination, count, buy_price)
+
+    def _leg(self, trade: tuple, origin: City, cities: dict[str, City]) -> TradeLeg:
+        """Returns the TradeLeg of a trade tuple found in origin."""
+        _, item_name, destination, _, buy_price = trade
+        neighbor_details = cities[destination].commodities[item_name]
+        return TradeLeg(
+            origin.name,
+            item_name,
+            destination,
+            buy_price,
+            self._estimate_sell_price(neighbor_details, buy_price),
+            cities[destination].fee,
+        )
+
+    def _plan_route(self, trade: tuple, cities: dict[str, City]):
+        """Plans the trades after trade, from its destination onwards.
+
+        Every leg is planned with the money the earlier legs are expected to
+        end with; their goods are sold on arrival, so the weight stays the
+        current one.
+        """
+        self.trade_plan = []
+        money = self.money + trade[0]
+        current_weight = self._calculate_current_weight()
+        city_name = trade[2]
+        for _ in range(self.plan_horizon - 1):
+            if city_name not in cities:
+                break
+            city = cities[city_name]
+            next_trade = self._choose_trade(city, cities, money, current_weight)
+            if not next_trade:
+                break
+            self.trade_plan.append(self._leg(next_trade, city, cities))
+            money += next_trade[0]
+            city_name = next_trade[2]
+
+    def _plan_and_buy_empty_inventory(self, current_city: City, cities: dict[str, City]):
+        """Plans trade and buys goods when inventory is empty.
+
+        The next leg of the cached plan is used while its route still holds;
+        otherwise the trade is searched and the following legs planned.
+        """
+        best_trade = self._cached_trade(current_city, cities)
+        if best_trade:
+            self.trade_plan = self.trade_plan[1:]
+            PLAN_CACHE_HITS.inc()
+        else:
+            best_trade = self._choose_trade(current_city, cities)
+            if best_trade:
+                self._plan_route(best_trade, cities)
+                REPLANS.inc()
+
+        if best_trade:
             profit, item_name, destination, count, buy_price = best_trade
 
             # Execute Buy
-            self.money -= count * buy_price
-            current_city.commodities[item_name]["quantity"] -= count
+            self._record_action(buy_action(item_name))
+            if self.order_book is not None:
+                self.order_book.buy(self, current_city, item_name, count)
+            else:
+                self.money -= count * buy_price
+                current_city.commodities[item_name]["quantity"] -= count
+                TRADES.inc()
+                MARKETS.touch(current_city, item_name)
 
-            if item_name not in self.inventory:
-                self.inventory[item_name] = {"quantity": 0, "avg_buy_price": 0}
+                if item_name not in self.inventory:
+                    self.inventory[item_name] = {"quantity": 0, "avg_buy_price": 0}
 
-            # Update inventory
-            self.inventory[item_name]["quantity"] = count
-            self.inventory[item_name]["avg_buy_price"] = buy_price
+                # Update inventory
+                self.inventory[item_name]["quantity"] = count
+                self.inventory[item_name]["avg_buy_price"] = buy_price
 
             print(
                 f"Bot bought {count} of {item_name} for {buy_price} each. "
@@ -319,8 +649,8 @@ class AIAgent:
         else:
             self._fallback_travel(current_city, cities)
 
-    def _fallback_travel(self, current_city: City, cities: dict[str, City]):
-        """Sets travel plan to the cheapest neighbor."""
+    def _cheapest_neighbor(self, current_city: City, cities: dict[str, City]):
+        """Returns the connected city with the lowest fee, None if there is none."""
         best_neighbor = None
         min_fee = float("inf")
 
@@ -331,6 +661,12 @@ class AIAgent:
                     min_fee = fee
                     best_neighbor = neighbor_name
 
+        return best_neighbor
+
+    def _fallback_travel(self, current_city: City, cities: dict[str, City]):
+        """Sets travel plan to the cheapest neighbor."""
+        best_neighbor = self._cheapest_neighbor(current_city, cities)
+
         if best_neighbor:
             self.travel_plan = (best_neighbor, None)
             print(f"Bot fallback: plans to travel to {best_neighbor} (lowest fee).")
@@ -0,0 +1,370 @@
+"""Resident turn daemon that keeps the world, the bots and the model warm.
+
+`nre-ai` is a fresh process per game turn: it re-imports the stack, rebuilds
+the managers, reloads every bot and the PPO model and only then spends a few
+milliseconds deciding. The daemon does the setup once and serves turns over
+HTTP on a local UNIX socket (or a localhost port):
+
+- POST /turn runs one turn (body: optional JSON with 'skip' and
+  'skip_events', like the CLI flags) and returns the bots' states, what was
+  reloaded and per-phase timings.
+- GET /status returns the bots and the number of turns served.
+- POST /shutdown stops the daemon.
+
+Before a turn only the files changed by someone else since the daemon last
+read or wrote them (world, bot states, model) are reloaded.
+
+The socket is created with mode 0600, by default in a directory only the
+user can access (see default_socket_path), so other local users can neither
+run turns nor stop the daemon.
+
+Example (the daemon prints its socket path on startup):
+    curl --unix-socket SOCKET_PATH -X POST http://localhost/turn
+"""
+
+import json
+import os
+import socketserver
+import stat
+import tempfile
+import traceback
+from argparse import ArgumentParser
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from time import perf_counter
+
+import numpy as np
+from nrecity import CityProcessor, DataManager, EventProcessor
+
+from nre_ai import MODEL_PATH, PATH, load_or_create_bot, needed_managers
+from nre_ai.agent import AIAgent
+from nre_ai.bot_state_processor import BotStateProcessor
+from nre_ai.manager import BotManager
+from nre_ai.metrics import ECONOMY_UPDATES
+from nre_ai.rl_agent import RLAgent
+from nre_ai.world_cache import private_dir
+
+SOCKET_NAME = "nre-ai.sock"
+
+
+def default_socket_path() -> str:
+    """Returns the socket path in a directory private to the user.
+
+    The directory is created in $XDG_RUNTIME_DIR, or in the temporary
+    directory if it is not set, with mode 0700.
+
+    Raises:
+        PermissionError: If the directory exists but is not a directory owned
+            by the user and closed to everyone else.
+    """
+    parent = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    directory = private_dir(os.path.join(parent, f"nre-ai-{os.getuid()}"))
+    return os.path.join(directory, SOCKET_NAME)
+
+
+def remove_stale_socket(socket_path: str):
+    """Removes the socket left at socket_path by an earlier daemon.
+
+    Raises:
+        FileExistsError: If something other than a socket is at the path.
+    """
+    try:
+        info = os.lstat(socket_path)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(info.st_mode):
+        raise FileExistsError(f"{socket_path} exists and is not a socket.")
+    os.remove(socket_path)
+
+
+def file_signature(path: str) -> tuple[int, int] | None:
+    """Returns (mtime_ns, size) of path, None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class TurnService:
+    """In-memory state of the game between turns."""
+
+    def __init__(
+        self,
+        data_path: str = PATH,
+        num_bots: int = 2,
+        use_rl: bool = False,
+        model_path: str = MODEL_PATH,
+        seed: int | None = None,
+        reset: bool = False,
+    ):
+        """Loads the world, the bots and the model.
+
+        Args:
+            data_path (str): Directory with the world and bot state files.
+            num_bots (int): Number of bots (bot0, bot1, ...).
+            use_rl (bool): Use RLAgent bots if the model exists.
+            model_path (str): Path of the PPO model.
+            seed (int | None): Seed of the start cities of new bots.
+            reset (bool): Passed to EventProcessor.
+        """
+        self.data_path = data_path
+        self.model_path = model_path
+        self.turns = 0
+
+        data_manager = DataManager()
+        needed_managers(data_manager, data_path)
+        self.json_manager = data_manager.get_manager("miasta")
+        self.world_path = data_path + "miasta.json"
+        self.city_processor = CityProcessor(self.json_manager)
+        self.event_processor = EventProcessor(reset=reset)
+
+        self.model = None
+        self._model_signature = None
+        if use_rl and os.path.exists(model_path):
+            self.model = RLAgent.load_model(model_path)
+            self._model_signature = file_signature(model_path)
+
+        self.bot_processor = BotStateProcessor(data_path)
+        self.bot_manager = BotManager(self.bot_processor)
+        seed_sequence = np.random.SeedSequence(seed)
+        for name, child in zip(
+            (f"bot{x}" for x in range(num_bots)),
+            seed_sequence.spawn(num_bots),
+            strict=True,
+        ):
+            bot = load_or_create_bot(
+                self.bot_processor, name, np.random.default_rng(child), self.model
+            )
+            self.bot_manager.add_bot(bot)
+
+        self._world_signature = file_signature(self.world_path)
+        self._bot_signatures = self._current_bot_signatures()
+
+    def _bot_path(self, bot: AIAgent) -> str:
+        return self.bot_processor._get_bot_file_path(bot.name)
+
+    def _current_bot_signatures(self) -> dict[str, tuple[int, int] | None]:
+        return {
+            bot.name: file_signature(self._bot_path(bot)) for bot in self.bot_manager.bots
+        }
+
+    def reload_changed(self) -> dict:
+        """Reloads the files modified outside the daemon.
+
+        Returns:
+            dict: 'world' and 'model' flags and the names of reloaded 'bots'.
+        """
+        reloaded = {"world": False, "model": False, "bots": []}
+
+        if file_signature(self.world_path) != self._world_signature:
+            self.json_manager()
+            self._world_signature = file_signature(self.world_path)
+            reloaded["world"] = True
+
+        if self.model is not None:
+            signature = file_signature(self.model_path)
+            if signature is not None and signature != self._model_signature:
+                self.model = RLAgent.load_model(self.model_path)
+                self._model_signature = signature
+                for bot in self.bot_manager.bots:
+                    if isinstance(bot, RLAgent):
+                        bot.model = self.model
+                reloaded["model"] = True
+
+        bots = self.bot_manager.bots
+        for index, bot in enumerate(bots):
+            signature = file_signature(self._bot_path(bot))
+            if signature is None or signature == self._bot_signatures.get(bot.name):
+                continue
+            data = self.bot_processor.load_bot_state(bot.name)
+            if isinstance(bot, RLAgent):
+                bots[index] = RLAgent.from_dict(data, self.model_path, model=self.model)
+            else:
+                bots[index] = AIAgent.from_dict(data)
+            self._bot_signatures[bot.name] = signature
+            reloaded["bots"].append(bot.name)
+
+        return reloaded
+
+    def run_turn(self, skip: bool = False, skip_events: bool = False) -> dict:
+        """Runs one turn like `nre-ai` does.
+
+        Args:
+            skip (bool): Skip the economy update.
+            skip_events (bool): Skip the events.
+
+        Returns:
+            dict: Turn number, bot states, reloaded files, timings (s) and the
+                signature of the world right after the turn wrote it (None when
+                the turn did not write it).
+        """
+        timings = {}
+        start = perf_counter()
+
+        reloaded = self.reload_changed()
+        timings["reload"] = perf_counter() - start
+
+        phase = perf_counter()
+        self.bot_manager.run_all_turns(self.city_processor.get_dict_of_cities("after"))
+        # The bots' own saves must not look like outside changes
+        self._bot_signatures = self._current_bot_signatures()
+        timings["bots"] = perf_counter() - phase
+
+        phase = perf_counter()
+        if not skip:
+            self.city_processor.process_changes()
+            ECONOMY_UPDATES.inc()
+            self._world_signature = file_signature(self.world_path)
+        timings["economy"] = perf_counter() - phase
+
+        # Events edit the world file themselves, so it is reloaded next turn
+        phase = perf_counter()
+        if not skip_events:
+            self.event_processor.run()
+        timings["events"] = perf_counter() - phase
+        # Taken before anyone else can save, so later saves still look new
+        written = None if skip and skip_events else file_signature(self.world_path)
+
+        timings["total"] = perf_counter() - start
+        self.turns += 1
+        return {
+            "turn": self.turns,
+            "bots": self.bot_states(),
+            "reloaded": reloaded,
+            "timings": timings,
+            "world_signature": written,
+        }
+
+    def bot_states(self) -> list[dict]:
+        """Returns the exported state of every bot."""
+        return [bot.to_dict() for bot in self.bot_manager.bots]
+
+
+class TurnRequestHandler(BaseHTTPRequestHandler):
+    """Serves the TurnService of the server."""
+
+    def address_string(self) -> str:
+        """Returns the client address; UNIX socket clients have none."""
+        return self.client_address[0] if self.client_address else "local"
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        body = json.loads(self.rfile.read(length))
+        if not isinstance(body, dict):
+            raise TypeError("the body must be a JSON object")
+        return body
+
+    def do_GET(self):
+        """Handles GET /status."""
+        if self.path != "/status":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        service = self.server.service
+        self._send_json(200, {"turns": service.turns, "bots": service.bot_states()})
+
+    def do_POST(self):
+        """Handles POST /turn and POST /shutdown."""
+        if self.path == "/shutdown":
+            self._send_json(200, {"status": "stopping"})
+            self.server.stop_requested = True
+            return
+        if self.path != "/turn":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        try:
+            options = self._read_json()
+        except (ValueError, TypeError) as e:
+            self._send_json(400, {"error": f"Invalid JSON body: {e}"})
+            return
+        try:
+            result = self.server.service.run_turn(
+                skip=bool(options.get("skip", False)),
+                skip_events=bool(options.get("skip_events", False)),
+            )
+        except Exception as e:  # noqa: BLE001
+            # The daemon keeps serving, the client gets the error
+            traceback.print_exc()
+            self._send_json(500, {"error": f"Turn failed: {e!r}"})
+            return
+        self._send_json(200, result)
+
+
+class UnixHTTPServer(socketserver.UnixStreamServer):
+    """HTTPServer listening on a UNIX socket."""
+
+    allow_reuse_address = True
+
+    def server_bind(self):
+        """Binds the socket and makes it accessible to the user only."""
+        super().server_bind()
+        os.chmod(self.server_address, 0o600)
+
+
+def serve(service: TurnService, socket_path: str | None = None, port: int | None = None):
+    """Serves turns until POST /shutdown.
+
+    Requests are handled one at a time, so turns never overlap.
+
+    Args:
+        service (TurnService): The warm game state.
+        socket_path (str | None): UNIX socket to listen on; defaults to
+            default_socket_path().
+        port (int | None): Localhost port to listen on instead.
+    """
+    if port is not None:
+        server = HTTPServer(("127.0.0.1", port), TurnRequestHandler)
+        address = f"http://127.0.0.1:{port}"
+    else:
+        socket_path = socket_path or default_socket_path()
+        remove_stale_socket(socket_path)
+        server = UnixHTTPServer(socket_path, TurnRequestHandler)
+        address = f"unix:{socket_path}"
+
+    server.service = service
+    server.stop_requested = False
+    print(f"nre-ai daemon listening on {address}")
+    try:
+        while not server.stop_requested:
+            server.handle_request()
+    finally:
+        server.server_close()
+        if port is None:
+            remove_stale_socket(socket_path)
+
+
+def main():
+    """Starts the daemon from the command line."""
+    parser = ArgumentParser(description="Serve nre-ai turns from a warm process.")
+    parser.add_argument("--socket", default=None, help="UNIX socket path.")
+    parser.add_argument(
+        "--port", type=int, default=None, help="Listen on localhost:PORT instead."
+    )
+    parser.add_argument("-a", "--ai", type=int, default=2, help="Number of bots.")
+    parser.add_argument(
+        "--use-rl",
+        action="store_true",
+        help="Use Reinforcement Learning agents instead of rule-based agents.",
+    )
+    parser.add_argument("--seed", type=int, default=None, help="Seed of new bots.")
+    parser.add_argument("-r", "--reset", action="store_true", help="Reset the cities")
+    args = parser.parse_args()
+
+    service = TurnService(
+        num_bots=args.ai, use_rl=args.use_rl, seed=args.seed, reset=args.reset
+    )
+    serve(service, socket_path=args.socket, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""Parallel evaluation of a PPO checkpoint or the rule-based AIAgent.
+
+Seeded episodes are split over a process pool. Every worker steps several
+TradingEnv copies side by side, each on its own copy of the world, and asks
+the policy for all their actions in one batched predict call. The summary
+(mean, median and confidence interval of the final net worth, bankruptcy
+rate, steps per second) is written as JSON, so model promotion can be
+automated.
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import torch as th
+from stable_baselines3 import PPO
+
+from nre_ai.imitation import expert_action
+from nre_ai.mechanics import calculate_net_worth
+from nre_ai.scenario_bank import build_scenario_bank
+from nre_ai.trading_env import TradingEnv
+
+RULE_BASED_POLICY = "ai"
+# Two-sided 95% normal quantile
+CI_Z = 1.96
+
+
+def _make_env(
+    world_path: str, private_path: str, max_steps: int, scenario_bank_path: str | None
+) -> TradingEnv:
+    """Creates an environment on a fresh private copy of the world."""
+    shutil.copy2(world_path, private_path)
+    env = TradingEnv(private_path, scenario_bank_path)
+    env.max_steps = max_steps
+    return env
+
+
+def _predict(model: PPO | None, envs: list[TradingEnv], obs: list) -> list[int]:
+    """Returns the action of every environment."""
+    if model is None:
+        return [expert_action(env.agent, env.cities) for env in envs]
+    actions, _ = model.predict(np.stack(obs), deterministic=True)
+    return [int(action) for action in actions]
+
+
+def run_episodes(
+    policy: str,
+    world_path: str,
+    seeds: list[int],
+    n_envs: int = 8,
+    max_steps: int = 1000,
+    scenario_bank_path: str | None = None,
+) -> list[dict]:
+    """Plays one episode per seed and returns their results.
+
+    Episodes are reproducible: with a scenario bank the seed picks the
+    starting scenario, without one every episode starts from a pristine copy
+    of the world (so it does not inherit the economy of earlier episodes).
+
+    Args:
+        policy (str): Path of a PPO checkpoint or RULE_BASED_POLICY.
+        world_path (str): World JSON to play on; never modified.
+        seeds (list[int]): Reset seed of every episode.
+        n_envs (int): Environments stepped side by side.
+        max_steps (int): Step limit of an episode.
+        scenario_bank_path (str | None): Optional scenario bank for the world,
+            so every seed starts from a different scenario.
+
+    Returns:
+        list[dict]: 'seed', 'net_worth', 'steps' and 'bankrupt' of every
+            episode.
+    """
+    th.set_num_threads(1)
+    model = None if policy == RULE_BASED_POLICY else PPO.load(policy)
+    pending = list(reversed(seeds))
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+
+        def start(slot: int, env: TradingEnv | None) -> tuple:
+            """Starts the next episode in a slot, on a fresh env if needed."""
+            if env is None or scenario_bank_path is None:
+                private_path = os.path.join(tmp_dir, f"world_{slot}.json")
+                env = _make_env(world_path, private_path, max_steps, scenario_bank_path)
+            seed = pending.pop()
+            obs, _ = env.reset(seed=seed)
+            return slot, env, seed, obs
+
+        # Every slot holds (slot, env, seed, obs); finished slots are refilled
+        slots = [start(slot, None) for slot in range(min(n_envs, len(seeds)))]
+
+        while slots:
+            actions = _predict(
+                model, [slot[1] for slot in slots], [slot[3] for slot in slots]
+            )
+            next_slots = []
+            for (slot, env, seed, _), action in zip(slots, actions, strict=True):
+                obs, _, terminated, truncated, _ = env.step(action)
+                if not (terminated or truncated):
+                    next_slots.append((slot, env, seed, obs))
+                    continue
+
+                results.append(
+                    {
+                        "seed": seed,
+                        "net_worth": calculate_net_worth(env.agent, env.cities),
+                        "steps": env.current_step,
+                        # Out of money, or stranded with nothing to sell
+                        "bankrupt": bool(terminated),
+                    }
+                )
+                if pending:
+                    next_slots.append(start(slot, env))
+            slots = next_slots
+    return results
+
+
+def summarize(results: list[dict], elapsed: float) -> dict:
+    """Aggregates episode results.
+
+    Args:
+        results (list[dict]): Output of run_episodes.
+        elapsed (float): Wall time of the evaluation in seconds.
+
+    Returns:
+        dict: Episode count, net worth statistics (mean, median, std and a
+            95% confidence interval of the mean), bankruptcy rate and
+            steps per second.
+    """
+    net_worth = np.array([result["net_worth"] for result in results], dtype=float)
+    steps = sum(result["steps"] for result in results)
+    n = len(net_worth)
+    mean = float(net_worth.mean()) if n else 0.0
+    std = float(net_worth.std(ddof=1)) if n > 1 else 0.0
+    half_width = CI_Z * std / float(np.sqrt(n)) if n else 0.0
+    return {
+        "episodes": n,
+        "net_worth": {
+            "mean": mean,
+            "median": float(np.median(net_worth)) if n else 0.0,
+            "std": std,
+            "ci95": [mean - half_width, mean + half_width],
+        },
+        "bankruptcy_rate": (
+            sum(result["bankrupt"] for result in results) / n if n else 0.0
+        ),
+        "steps": steps,
+        "steps_per_second": steps / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def evaluate(
+    policy: str,
+    world_path: str,
+    n_episodes: int = 200,
+    n_workers: int | None = None,
+    n_envs: int = 8,
+    max_steps: int = 1000,
+    seed: int = 0,
+    scenario_bank_path: str | None = None,
+) -> dict:
+    """Evaluates a policy over n_episodes seeded episodes in parallel.
+
+    Without a scenario bank, one with n_episodes scenarios is generated from
+    seed for the evaluation, so the episodes start from different but
+    reproducible worlds.
+
+    Args:
+        policy (str): Path of a PPO checkpoint or RULE_BASED_POLICY.
+        world_path (str): World JSON to play on.
+        n_episodes (int): Number of episodes; seeds are seed..seed+n-1.
+        n_workers (int | None): Worker processes; defaults to the CPU count.
+        n_envs (int): Environments stepped side by side in every worker.
+        max_steps (int): Step limit of an episode.
+        seed (int): First episode seed.
+        scenario_bank_path (str | None): Scenario bank for the world.
+
+    Returns:
+        dict: The summary (see summarize) plus the evaluated policy, world
+            and per-episode results.
+    """
+    seeds = list(range(seed, seed + n_episodes))
+    n_workers = max(min(n_workers or os.cpu_count() or 1, n_episodes), 1)
+    chunks = [seeds[i::n_workers] for i in range(n_workers)]
+
+    start = time.perf_counter()
+    with (
+        tempfile.TemporaryDirectory() as tmp_dir,
+        ProcessPoolExecutor(max_workers=n_workers) as pool,
+    ):
+        if scenario_bank_path is None and n_episodes > 0:
+            scenario_bank_path = build_scenario_bank(
+                world_path, os.path.join(tmp_dir, "scenarios.npy"), n_episodes, seed
+            )
+        futures = [
+            pool.submit(
+                run_episodes,
+                policy,
+                world_path,
+                chunk,
+                n_envs,
+                max_steps,
+                scenario_bank_path,
+            )
+            for chunk in chunks
+            if chunk
+        ]
+        results = [result for future in futures for result in future.result()]
+    elapsed = time.perf_counter() - start
+
+    results.sort(key=lambda result: result["seed"])
+    return {
+        "policy": policy,
+        "world": world_path,
+        **summarize(results, elapsed),
+        "results": results,
+    }
+
+
+def main():
+    """Evaluates a policy from the command line."""
+    parser = ArgumentParser(description="Evaluate a PPO checkpoint or AIAgent.")
+    parser.add_argument(
+        "policy", help=f"PPO checkpoint (.zip) or '{RULE_BASED_POLICY}' for AIAgent."
+    )
+    parser.add_argument("world", help="World JSON to play on (copied per env).")
+    parser.add_argument("-n", "--episodes", type=int, default=200)
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Worker processes (default: CPUs)."
+    )
+    parser.add_argument(
+        "--envs", type=int, default=8, help="Environments stepped per worker."
+    )
+    parser.add_argument("--max-steps", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0, help="First episode seed.")
+    parser.add_argument(
+        "--scenario-bank",
+        default=None,
+        help="Scenario bank for the world (default: one generated from --seed).",
+    )
+    parser.add_argument(
+        "--output", default=None, help="JSON output path (default: stdout)."
+    )
+    args = parser.parse_args()
+
+    report = evaluate(
+        args.policy,
+        args.world,
+        n_episodes=args.episodes,
+        n_workers=args.workers,
+        n_envs=args.envs,
+        max_steps=args.max_steps,
+        seed=args.seed,
+        scenario_bank_path=args.scenario_bank,
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(
+            f"Mean net worth {report['net_worth']['mean']:.2f}, bankruptcy rate "
+            f"{report['bankruptcy_rate']:.1%}; report saved to {args.output}"
+        )
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""Streaming per-turn history of a simulation in chunked CSV columns.
+
+HistoryWriter buffers rows in fixed-size column arrays and flushes every full
+buffer to its own CSV chunk, so memory stays bounded however long the run
+is. The rows of the current chunk are also appended to its file every
+flush_interval seconds, so a running (or killed) simulation can be inspected
+up to its last few seconds. `manifest.json` lists the chunks with their row
+counts.
+
+Plotting is a separate step: plot_history reads the chunks back with a
+stride so at most max_points rows are loaded, and imports matplotlib only
+when called.
+"""
+
+import json
+import os
+import time
+from argparse import ArgumentParser
+from typing import Self
+
+import numpy as np
+
+MANIFEST_NAME = "manifest.json"
+DEFAULT_COLUMNS = ("Turn", "Money", "Inventory_Count")
+DEFAULT_FLUSH_INTERVAL = 30.0
+
+
+class HistoryWriter:
+    """Writes rows of named float columns to chunked CSV files."""
+
+    def __init__(
+        self,
+        directory: str,
+        columns: tuple[str, ...] = DEFAULT_COLUMNS,
+        chunk_size: int = 65536,
+        flush_interval: float | None = DEFAULT_FLUSH_INTERVAL,
+    ):
+        """Initializes the writer.
+
+        Chunks of an earlier run in the directory are removed.
+
+        Args:
+            directory (str): Output directory, created if missing.
+            columns (tuple[str, ...]): Column names.
+            chunk_size (int): Rows per chunk; bounds the memory used.
+            flush_interval (float | None): Seconds between flushes of a
+                partial chunk; None flushes only full chunks and on close.
+        """
+        self.directory = directory
+        self.columns = tuple(columns)
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+
+        for entry in read_manifest(directory)["chunks"]:
+            path = os.path.join(directory, entry["file"])
+            if os.path.exists(path):
+                os.remove(path)
+
+        self.chunks: list[dict] = []
+        self._buffer = np.empty((chunk_size, len(self.columns)), dtype=np.float64)
+        self._size = 0
+        # Rows of the current chunk already in its file
+        self._written = 0
+        self._last_flush = time.monotonic()
+        self._write_manifest()
+
+    def add(self, *values: float):
+        """Appends one row, values in column order."""
+        self._buffer[self._size] = values
+        self._size += 1
+        if self._size == self.chunk_size or (
+            self.flush_interval is not None
+            and time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self):
+        """Appends the rows buffered since the last flush to the current chunk.
+
+        A full chunk is closed, the next rows start a new one.
+        """
+        self._last_flush = time.monotonic()
+        if self._size == self._written:
+            return
+
+        if self._written:
+            name = self.chunks[-1]["file"]
+        else:
+            name = f"chunk_{len(self.chunks):06d}.csv"
+            self.chunks.append({"file": name, "rows": 0})
+        with open(os.path.join(self.directory, name), "a" if self._written else "w") as f:
+            np.savetxt(
+                f,
+                self._buffer[self._written : self._size],
+                delimiter=",",
+                fmt="%.10g",
+                header="" if self._written else ",".join(self.columns),
+                comments="",
+            )
+        self.chunks[-1]["rows"] = self._size
+        self._write_manifest()
+
+        self._written = self._size
+        if self._size == self.chunk_size:
+            self._size = self._written = 0
+
+    def _write_manifest(self):
+        path = os.path.join(self.directory, MANIFEST_NAME)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"columns": list(self.columns), "chunks": self.chunks}, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def close(self):
+        """Flushes the remaining rows."""
+        self.flush()
+
+    def __enter__(self) -> Self:
+        """Returns the writer."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Closes the writer."""
+        self.close()
+
+
+def read_manifest(directory: str) -> dict:
+    """Returns the manifest of a history directory (no chunks if missing)."""
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"columns": [], "chunks": []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def read_history(directory: str, max_points: int | None = None) -> dict[str, np.ndarray]:
+    """Reads a history back, downsampled to at most max_points rows.
+
+    Every stride-th row is kept and chunks are read one at a time, so only the
+    kept rows are held in memory.
+
+    Args:
+        directory (str): Directory written by HistoryWriter.
+        max_points (int | None): Row limit; None reads every row.
+
+    Returns:
+        dict[str, np.ndarray]: Column name to values.
+    """
+    manifest = read_manifest(directory)
+    columns = manifest["columns"]
+    total = sum(entry["rows"] for entry in manifest["chunks"])
+    stride = 1
+    if max_points and total > max_points:
+        stride = -(-total // max_points)
+
+    parts = []
+    offset = 0
+    for entry in manifest["chunks"]:
+        data = np.loadtxt(
+            os.path.join(directory, entry["file"]),
+            delimiter=",",
+            skiprows=1,
+            ndmin=2,
+        )
+        # Keep the rows whose global index is a multiple of stride
+        parts.append(data[(-offset) % stride :: stride])
+        offset += entry["rows"]
+
+    if not parts:
+        return {column: np.empty(0) for column in columns}
+    table = np.concatenate(parts)
+    return {column: table[:, i] for i, column in enumerate(columns)}
+
+
+def plot_history(directory: str, output_path: str, max_points: int = 5000) -> str:
+    """Plots the money and inventory of a simulation history.
+
+    Args:
+        directory (str): Directory written by HistoryWriter.
+        output_path (str): Path of the image.
+        max_points (int): Rows plotted at most.
+
+    Returns:
+        str: The image path.
+    """
+    # Imported here so simulations never pay for matplotlib
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    history = read_history(directory, max_points)
+    marker = {"marker": "o"} if len(history["Turn"]) <= 200 else {}
+
+    plt.figure(figsize=(10, 6))
+
+    # Plot Money
+    plt.subplot(2, 1, 1)
+    plt.plot(history["Turn"], history["Money"], color="b", label="Money", **marker)
+    plt.title("Bot Progress Over Time")
+    plt.ylabel("Money")
+    plt.grid(True)
+    plt.legend()
+
+    # Plot Inventory Count
+    plt.subplot(2, 1, 2)
+    plt.plot(
+        history["Turn"],
+        history["Inventory_Count"],
+        color="r",
+        label="Inventory Items",
+        **({"marker": "x"} if marker else {}),
+    )
+    plt.xlabel("Turn")
+    plt.ylabel("Item Count")
+    plt.grid(True)
+    plt.legend()
+
+    plt.tight_layout()
+    plt.savefig(output_path)
+    plt.close()
+    return output_path
+
+
+def main():
+    """Plots a history directory from the command line."""
+    parser = ArgumentParser(description="Plot a simulation history.")
+    parser.add_argument("directory", help="Directory written by HistoryWriter.")
+    parser.add_argument("output", help="Path of the image to write.")
+    parser.add_argument("--max-points", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"Plot saved to {plot_history(args.directory, args.output, args.max_points)}")
+
+
+if __name__ == "__main__":
+    main()
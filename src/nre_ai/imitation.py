@@ -0,0 +1,232 @@
+"""Behavior-cloning warm start for PPO from the rule-based AIAgent.
+
+The rule-based bot is replayed inside TradingEnv: at every step expert_action
+translates the decision it would take (sell, buy, travel to neighbor i) into
+a TradingEnv action index. Demonstrations are collected in parallel, one
+private copy of every world per worker, and written with TrajectoryWriter.
+pretrain_policy then fits the PPO policy network to them with a negative
+log-likelihood loss before RL fine-tuning starts.
+"""
+
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import torch as th
+from nrecity import City
+from stable_baselines3.common.base_class import BaseAlgorithm
+
+from nre_ai.agent import AIAgent
+from nre_ai.mechanics import SELL_ALL_ACTION, buy_action, sell_action, travel_action
+from nre_ai.trading_env import TradingEnv
+from nre_ai.trajectory import NO_ACTION, TrajectoryRecorder, TrajectoryWriter, iter_shards
+
+
+def expert_action(agent: AIAgent, cities: dict[str, City]) -> int:
+    """Returns the TradingEnv action the rule-based bot would take next.
+
+    TradingEnv trades in batches, so a buy decision is repeated until the bot
+    has bought as much as its planned trade allows, then the bot travels. The
+    pending trip is kept in agent.travel_plan, as AIAgent.take_turn does.
+
+    Args:
+        agent (AIAgent): The bot acting in the environment.
+        cities (dict[str, City]): Current state of the world.
+
+    Returns:
+        int: Action index; SELL_ALL_ACTION if the bot has nowhere to go.
+    """
+    current_city = cities[agent.current_city_name]
+
+    # 1. Finish the planned trade, then travel
+    if agent.travel_plan:
+        destination = agent.travel_plan[0]
+        trade = agent._choose_trade(current_city, cities)
+        if trade and trade[1] in agent.inventory and trade[2] == destination:
+            action = buy_action(trade[1])
+            if action is not None:
+                return action
+
+        agent.travel_plan = None
+        action = travel_action(current_city, destination)
+        if action is not None:
+            return action
+
+    # 2. Sell
+    for item_name in agent.inventory:
+        if agent._should_sell(current_city, item_name):
+            action = sell_action(item_name)
+            if action is not None:
+                return action
+
+    # 3. Plan & Buy
+    has_inventory = any(item["quantity"] > 0 for item in agent.inventory.values())
+    if has_inventory:
+        destination, profit = agent._best_sell_destination(current_city, cities)
+        if not (destination and profit > 0):
+            destination = agent._cheapest_neighbor(current_city, cities)
+    else:
+        trade = agent._choose_trade(current_city, cities)
+        action = buy_action(trade[1]) if trade else None
+        if action is not None:
+            agent.travel_plan = (trade[2], None)
+            return action
+        destination = agent._cheapest_neighbor(current_city, cities)
+
+    action = travel_action(current_city, destination) if destination else None
+    return SELL_ALL_ACTION if action is None else action
+
+
+def _collect_worker(
+    world_path: str,
+    directory: str,
+    n_episodes: int,
+    max_steps: int,
+    seed: int,
+    scenario_bank_path: str | None = None,
+) -> int:
+    """Records n_episodes expert episodes on a private copy of world_path."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Economy updates write the world file back, so never share it
+        private_path = os.path.join(tmp_dir, os.path.basename(world_path))
+        shutil.copy2(world_path, private_path)
+
+        env = TradingEnv(private_path, scenario_bank_path)
+        env.max_steps = max_steps
+        recorder = TrajectoryRecorder(env, TrajectoryWriter(directory))
+
+        n_steps = 0
+        for episode in range(n_episodes):
+            recorder.reset(seed=seed + episode)
+            done = False
+            while not done:
+                action = expert_action(env.agent, env.cities)
+                _, _, terminated, truncated, _ = recorder.step(action)
+                done = terminated or truncated
+                n_steps += 1
+        recorder.close()
+    return n_steps
+
+
+def collect_demonstrations(
+    world_paths: list[str],
+    directory: str,
+    episodes_per_world: int = 10,
+    max_steps: int = 1000,
+    n_workers: int | None = None,
+    seed: int = 0,
+    scenario_bank_path: str | None = None,
+) -> int:
+    """Records expert episodes on many worlds in parallel.
+
+    Every world is handled by its own worker process writing to its own
+    subdirectory of directory, so workers never share files.
+
+    Args:
+        world_paths (list[str]): World JSON files to play on.
+        directory (str): Output directory of the demonstrations.
+        episodes_per_world (int): Episodes recorded on every world.
+        max_steps (int): Step limit of an episode.
+        n_workers (int | None): Worker processes; defaults to the CPU count.
+            With 1 worker the episodes are recorded in this process.
+        seed (int): Seed of the first episode.
+        scenario_bank_path (str | None): Scenario bank of the worlds (see
+            nre_ai.scenario_bank); every episode then starts from a sampled
+            scenario.
+
+    Returns:
+        int: Number of recorded transitions.
+    """
+    tasks = [
+        (
+            world_path,
+            os.path.join(directory, f"world_{index:04d}"),
+            episodes_per_world,
+            max_steps,
+            seed + index * episodes_per_world,
+            scenario_bank_path,
+        )
+        for index, world_path in enumerate(world_paths)
+    ]
+    if n_workers == 1:
+        return sum(_collect_worker(*task) for task in tasks)
+
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        futures = [pool.submit(_collect_worker, *task) for task in tasks]
+        return sum(future.result() for future in futures)
+
+
+def iter_demonstrations(directory: str):
+    """Yields (obs, actions) arrays of every shard below directory.
+
+    Transitions without a known action (NO_ACTION) are skipped.
+    """
+    for root, _, files in sorted(os.walk(directory)):
+        if "manifest.json" not in files:
+            continue
+        for shard in iter_shards(root):
+            known = shard["actions"] != NO_ACTION
+            yield shard["obs"][known], shard["actions"][known]
+
+
+def pretrain_policy(
+    model: BaseAlgorithm,
+    directory: str,
+    epochs: int = 5,
+    batch_size: int = 256,
+    learning_rate: float = 1e-3,
+    seed: int = 0,
+) -> list[float]:
+    """Fits the policy of model to the demonstrations in directory.
+
+    Shards are streamed one at a time and shuffled within the shard, so the
+    dataset never has to fit in memory.
+
+    Args:
+        model (BaseAlgorithm): A stable-baselines3 model with a discrete
+            action space (e.g. PPO).
+        directory (str): Directory filled by collect_demonstrations.
+        epochs (int): Passes over the dataset.
+        batch_size (int): Transitions per gradient step.
+        learning_rate (float): Adam learning rate.
+        seed (int): Seed of the shuffling.
+
+    Returns:
+        list[float]: Mean negative log-likelihood of every epoch.
+
+    Raises:
+        ValueError: If directory contains no demonstrations.
+    """
+    policy = model.policy
+    optimizer = th.optim.Adam(policy.parameters(), lr=learning_rate)
+    rng = np.random.default_rng(seed)
+
+    policy.set_training_mode(True)
+    losses = []
+    for _ in range(epochs):
+        total_loss = 0.0
+        total_size = 0
+        for obs, actions in iter_demonstrations(directory):
+            order = rng.permutation(len(actions))
+            for start in range(0, len(order), batch_size):
+                batch = order[start : start + batch_size]
+                obs_tensor = th.as_tensor(obs[batch], device=policy.device)
+                action_tensor = th.as_tensor(actions[batch], device=policy.device)
+
+                distribution = policy.get_distribution(obs_tensor)
+                loss = -distribution.log_prob(action_tensor).mean()
+
+                optimizer.zero_grad()
+                loss.backward()
+                optimizer.step()
+
+                total_loss += loss.item() * len(batch)
+                total_size += len(batch)
+
+        if total_size == 0:
+            raise ValueError(f"No demonstrations found in {directory}.")
+        losses.append(total_loss / total_size)
+    policy.set_training_mode(False)
+    return losses
@@ -1,22 +1,39 @@
 """Manager for handling multiple AI agents and their persistence."""
 
+from time import perf_counter
+
 from nrecity import City
 
 from nre_ai.agent import AIAgent
 from nre_ai.bot_state_processor import BotStateProcessor
+from nre_ai.metrics import BANKRUPTCIES, SAVE_LATENCY, TURN_LATENCY
+from nre_ai.order_book import OrderBook
 
 
 class BotManager:
     """Responsible for running multiple AI agents and saving their states."""
 
-    def __init__(self, processor: BotStateProcessor):
+    def __init__(
+        self,
+        processor: BotStateProcessor,
+        hooks: list | None = None,
+        order_book: OrderBook | None = None,
+    ):
         """Initializes the BotManager.
 
         Args:
             processor (BotStateProcessor): The processor for saving state.
+            hooks (list | None): Turn hooks, objects with `before_turn(bot,
+                cities)` and `after_turn(bot, cities)` methods called around
+                every bot turn (e.g. trajectory.TurnRecorder).
+            order_book (OrderBook | None): If given, the bots submit their
+                trades to it and they are cleared together after the last
+                turn, so the bot order does not matter.
         """
         self.processor = processor
         self.bots: list[AIAgent] = []
+        self.hooks: list = hooks if hooks is not None else []
+        self.order_book = order_book
 
     def add_bot(self, bot: AIAgent):
         """Registers a bot with the manager.
@@ -24,9 +41,18 @@ class BotManager:
         Args:
             bot (AIAgent): The AI agent instance to add.
         """
+        bot.order_book = self.order_book
         self.bots.append(bot)
 
-    def run_all_turns(self, cities: dict[str, City]):
+    def add_hook(self, hook):
+        """Registers a turn hook.
+
+        Args:
+            hook: Object with `before_turn` and `after_turn` methods.
+        """
+        self.hooks.append(hook)
+
+    def run_all_turns(self, cities: dict[str, City], save: bool = True):
         """Runs a single turn for all registered agents and saves their states.
 
         For each bot:
@@ -34,15 +60,56 @@ class BotManager:
         2. The agent's state is converted to the game-compatible format.
         3. The state is saved to disk.
 
+        With an order book, the trades are cleared after the last bot's turn;
+        the after_turn hooks, the bankruptcy checks and the saves wait for the
+        clearing, so no bot is judged while its money is held in escrow.
+
         Args:
             cities (dict[str, City]): The current state of all cities.
+            save (bool): Save the states; when False, the bots are kept in
+                memory only until the next save_all().
         """
+        was_bankrupt = []
         for bot in self.bots:
+            was_bankrupt.append(bot.is_bankrupt())
+            for hook in self.hooks:
+                hook.before_turn(bot, cities)
+
             # 1. Agent thinks and acts
+            start = perf_counter()
             bot.take_turn(cities)
+            TURN_LATENCY.observe(perf_counter() - start)
+
+            if self.order_book is None:
+                self._finish_turn(bot, cities, was_bankrupt[-1])
+                if save:
+                    self._save(bot)
+
+        if self.order_book is not None:
+            self.order_book.clear()
+            for bot, bankrupt in zip(self.bots, was_bankrupt, strict=True):
+                self._finish_turn(bot, cities, bankrupt)
+            if save:
+                self.save_all()
+
+    def _finish_turn(self, bot: AIAgent, cities: dict[str, City], was_bankrupt: bool):
+        """Runs the after_turn hooks and counts a new bankruptcy of the bot."""
+        for hook in self.hooks:
+            hook.after_turn(bot, cities)
+
+        if not was_bankrupt and bot.is_bankrupt():
+            BANKRUPTCIES.inc()
+
+    def save_all(self):
+        """Saves the states of all registered agents."""
+        for bot in self.bots:
+            self._save(bot)
 
-            # 2. Convert state for export
-            bot_data = bot.to_dict()
+    def _save(self, bot: AIAgent):
+        # 2. Convert state for export
+        bot_data = bot.to_dict()
 
-            # 3. Save state to disk
-            self.processor.save_bot_state(bot_data)
+        # 3. Save state to disk
+        start = perf_counter()
+        self.processor.save_bot_state(bot_data)
+        SAVE_LATENCY.observe(perf_counter() - start)
@@ -0,0 +1,289 @@
+"""Vectorized market deltas between snapshots of the world.
+
+The world file holds the cities before ("cities") and after ("after") the
+last economy update, and every turn the bots get a freshly parsed "after".
+Instead of having every consumer rescan all cities and commodities, a
+MarketSnapshot packs the prices, quantities and fees into arrays, diff()
+compares two snapshots with a few array operations, and the resulting
+MarketDelta lists only the changed cells and fees.
+
+MarketDiffStream diffs every pushed snapshot against the previous one and
+hands the delta to its subscribers, e.g. MARKETS.on_delta (market_index) and
+ROUTES.on_delta (routing), which then update only what changed. WorldFeed
+wires them up for the world the bots play: push it the cities after every
+economy update.
+
+Example:
+    feed = WorldFeed()
+    feed.push(city_processor.get_dict_of_cities("after"))
+"""
+
+import math
+from collections.abc import Callable, Iterable, Iterator, Mapping
+
+import numpy as np
+from nrecity import City
+
+from nre_ai.market_index import MARKETS, MarketIndex
+from nre_ai.mechanics import COMMODITIES
+from nre_ai.routing import ROUTES, RouteCache
+
+
+def _differs(old: np.ndarray, new: np.ndarray) -> np.ndarray:
+    """Compares element-wise, a missing (NaN) value equals only another one."""
+    return ~((old == new) | (np.isnan(old) & np.isnan(new)))
+
+
+class MarketSnapshot:
+    """Prices, quantities and fees of a world as (city, commodity) arrays.
+
+    Missing commodities are NaN. The connections of every city are kept as a
+    hash, only to be compared with snapshots of the same process.
+    """
+
+    def __init__(
+        self, rows: Iterable[tuple[str, float, Mapping, Iterable]], items=COMMODITIES
+    ):
+        """Packs the world.
+
+        Args:
+            rows (Iterable[tuple[str, float, Mapping, Iterable]]): (name, fee,
+                commodities, connections) of every city.
+            items: Commodities to track, the column order.
+        """
+        rows = list(rows)
+        self.items = list(items)
+        self.names = [name for name, _, _, _ in rows]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.fee = np.array([fee for _, fee, _, _ in rows], dtype=np.float64)
+        self.connections = np.array(
+            [hash(tuple(connections)) for _, _, _, connections in rows], dtype=np.int64
+        )
+
+        shape = (len(rows), len(self.items))
+        self.price = np.full(shape, np.nan)
+        self.quantity = np.full(shape, np.nan)
+        self.regular_quantity = np.full(shape, np.nan)
+        for row, (_, _, commodities, _) in enumerate(rows):
+            for column, item in enumerate(self.items):
+                details = commodities.get(item)
+                if details:
+                    self.price[row, column] = details["price"]
+                    self.quantity[row, column] = details["quantity"] or 0
+                    self.regular_quantity[row, column] = details.get(
+                        "regular_quantity", np.nan
+                    )
+
+    @classmethod
+    def from_cities(cls, cities: Mapping[str, City]) -> "MarketSnapshot":
+        """Packs a dict of City objects."""
+        return cls(
+            (name, city.fee, city.commodities, city.connections)
+            for name, city in cities.items()
+        )
+
+    @classmethod
+    def from_city_data(cls, city_data_list: list[dict]) -> "MarketSnapshot":
+        """Packs a section ("cities" or "after") of the world file."""
+        return cls(
+            (
+                data["name"],
+                data.get("fee", 0),
+                data.get("commodities", {}),
+                data.get("connections", ()),
+            )
+            for data in city_data_list
+        )
+
+    def __len__(self) -> int:
+        """Returns the number of cities."""
+        return len(self.names)
+
+
+class MarketDelta:
+    """The cells and fees that changed between two snapshots."""
+
+    def __init__(self, old: MarketSnapshot, new: MarketSnapshot):
+        """Diffs old against new.
+
+        Cities only in new count as added with all their cells changed;
+        cities only in old are listed in removed.
+
+        Raises:
+            ValueError: If the snapshots track different commodities.
+        """
+        if old.names and old.items != new.items:
+            raise ValueError("The snapshots track different commodities.")
+        self.items = new.items
+        self.names = new.names
+        position = np.array(
+            [old.index.get(name, -1) for name in new.names], dtype=np.int64
+        )
+        present = position >= 0
+
+        def aligned(values: np.ndarray) -> np.ndarray:
+            out = np.full((len(new), *values.shape[1:]), np.nan)
+            out[present] = values[position[present]]
+            return out
+
+        old_price = aligned(old.price)
+        old_quantity = aligned(old.quantity)
+        changed = (
+            _differs(old_price, new.price)
+            | _differs(old_quantity, new.quantity)
+            | _differs(aligned(old.regular_quantity), new.regular_quantity)
+        )
+        self.rows, self.columns = np.nonzero(changed)
+        self.old_price = old_price[self.rows, self.columns]
+        self.price = new.price[self.rows, self.columns]
+        self.old_quantity = old_quantity[self.rows, self.columns]
+        self.quantity = new.quantity[self.rows, self.columns]
+        self.regular_quantity = new.regular_quantity[self.rows, self.columns]
+
+        old_fee = aligned(old.fee)
+        self.fee_rows = np.flatnonzero(present & _differs(old_fee, new.fee))
+        self.old_fee = old_fee[self.fee_rows]
+        self.fee = new.fee[self.fee_rows]
+
+        old_connections = np.zeros(len(new), dtype=np.int64)
+        old_connections[present] = old.connections[position[present]]
+        self.connection_rows = np.flatnonzero(
+            present & (old_connections != new.connections)
+        )
+
+        self.added = [
+            name for name, found in zip(new.names, present, strict=True) if not found
+        ]
+        self.removed = [name for name in old.names if name not in new.index]
+
+    def __len__(self) -> int:
+        """Returns the number of changed cells."""
+        return len(self.rows)
+
+    @property
+    def graph_changed(self) -> bool:
+        """Checks if a fee or connections changed or a city was added or removed."""
+        return bool(
+            self.fee_rows.size or self.connection_rows.size or self.added or self.removed
+        )
+
+    def cells(
+        self,
+    ) -> Iterator[tuple[str, str, float | None, float | None, float | None]]:
+        """Iterates over the changed cells.
+
+        Yields:
+            tuple: (city, item, price, quantity, regular_quantity) of the new
+                snapshot; the values are None if the commodity is gone.
+        """
+        for row, column, price, quantity, regular_quantity in zip(
+            self.rows.tolist(),
+            self.columns.tolist(),
+            self.price.tolist(),
+            self.quantity.tolist(),
+            self.regular_quantity.tolist(),
+            strict=True,
+        ):
+            missing = math.isnan(price)
+            yield (
+                self.names[row],
+                self.items[column],
+                None if missing else price,
+                None if missing else quantity,
+                None if math.isnan(regular_quantity) else regular_quantity,
+            )
+
+    def fees(self) -> Iterator[tuple[str, float, float]]:
+        """Iterates over the (city, old fee, new fee) of the changed fees."""
+        for row, old_fee, fee in zip(
+            self.fee_rows.tolist(), self.old_fee.tolist(), self.fee.tolist(), strict=True
+        ):
+            yield self.names[row], old_fee, fee
+
+
+def diff(old: MarketSnapshot, new: MarketSnapshot) -> MarketDelta:
+    """Returns the changes from old to new."""
+    return MarketDelta(old, new)
+
+
+def diff_sections(data: dict) -> MarketDelta:
+    """Returns the changes of the last economy update in a world file's data."""
+    return diff(
+        MarketSnapshot.from_city_data(data["cities"]),
+        MarketSnapshot.from_city_data(data["after"]),
+    )
+
+
+class MarketDiffStream:
+    """Diffs consecutive snapshots and sends the deltas to subscribers."""
+
+    def __init__(self):
+        """Initializes the stream; the first push diffs against an empty world."""
+        self.snapshot = MarketSnapshot([])
+        self._subscribers: list[Callable[[MarketDelta], None]] = []
+
+    def subscribe(self, callback: Callable[[MarketDelta], None]):
+        """Calls callback with every delta."""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[MarketDelta], None]):
+        """Stops calling callback."""
+        self._subscribers.remove(callback)
+
+    def push(self, snapshot: MarketSnapshot) -> MarketDelta:
+        """Diffs snapshot against the previous one and notifies the subscribers.
+
+        Args:
+            snapshot (MarketSnapshot): The current world.
+
+        Returns:
+            MarketDelta: The changes.
+        """
+        delta = diff(self.snapshot, snapshot)
+        self.snapshot = snapshot
+        for callback in self._subscribers:
+            callback(delta)
+        return delta
+
+
+class WorldFeed:
+    """Keeps a market index and a route cache on the world the bots play.
+
+    Both subscribe to a MarketDiffStream; every pushed world is diffed against
+    the previous one, and they adopt it instead of diffing or hashing it again.
+    """
+
+    def __init__(self, index: MarketIndex = MARKETS, routes: RouteCache = ROUTES):
+        """Subscribes index and routes.
+
+        Args:
+            index (MarketIndex): Defaults to MARKETS.
+            routes (RouteCache): Defaults to ROUTES.
+        """
+        self.index = index
+        self.routes = routes
+        self.stream = MarketDiffStream()
+        self.stream.subscribe(index.on_delta)
+        self.stream.subscribe(routes.on_delta)
+        self.cities: Mapping[str, City] | None = None
+
+    def push(
+        self, cities: Mapping[str, City], snapshot: MarketSnapshot | None = None
+    ) -> MarketDelta:
+        """Moves the subscribers to cities, e.g. after an economy update.
+
+        Args:
+            cities (Mapping[str, City]): The new world.
+            snapshot (MarketSnapshot | None): Its snapshot, if already packed
+                (e.g. from the world file data the cities were built from).
+
+        Returns:
+            MarketDelta: The changes since the last push.
+        """
+        if snapshot is None:
+            snapshot = MarketSnapshot.from_cities(cities)
+        delta = self.stream.push(snapshot)
+        self.index.adopt(cities, self.cities)
+        self.routes.adopt(cities, self.cities)
+        self.cities = cities
+        return delta
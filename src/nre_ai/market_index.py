@@ -0,0 +1,289 @@
+"""Per-commodity market index of the world.
+
+Finding where to buy or sell a commodity used to mean scanning the
+`commodities` of every city. MarketIndex keeps, for every commodity, heaps of
+the cities ordered by price (both ways) and by scarcity (quantity /
+regular_quantity), so the best markets are popped from their tops instead.
+
+The index follows the world incrementally. A changed cell pushes its new
+entries in O(log n) and leaves the old ones in place; queries drop the stale
+entries they pop, and a heap is rebuilt once it holds more than twice as many
+entries as cells. A query costs O((k + skipped) log n) for the k markets it
+returns and the stale, unreachable or sold-out ones it passes.
+
+Trades report the cells they change with touch() (the mechanics and AIAgent
+do it for MARKETS); economy ticks and events rewrite the world outside the
+bots, so view() diffs a new cities dict against the indexed values and moves
+only the cells that changed, or the index subscribes to a
+market_diff.MarketDiffStream that does the diff.
+"""
+
+from collections.abc import Mapping
+from heapq import heapify, heappop, heappush
+
+from nrecity import City
+
+from nre_ai.routing import RouteTable
+
+# Default of the agent's scarcity heuristic
+DEFAULT_REGULAR_QUANTITY = 100
+# Heap order -> (index in the cell values, sign of the heap key)
+ORDERS = {"cheapest": (0, 1), "dearest": (0, -1), "scarcest": (2, 1)}
+# Stale entries a heap may hold besides twice its cells before it is rebuilt
+COMPACT_SLACK = 64
+
+
+def _values(
+    price: float, quantity: float | None, regular_quantity: float | None
+) -> tuple[float, float, float]:
+    """Returns the indexed (price, quantity, scarcity) of a cell."""
+    quantity = quantity or 0
+    return price, quantity, quantity / (regular_quantity or DEFAULT_REGULAR_QUANTITY)
+
+
+class MarketIndex:
+    """Cities sorted by price and by scarcity for every commodity."""
+
+    def __init__(self, cities: Mapping[str, City] | None = None):
+        """Initializes the index.
+
+        Args:
+            cities (Mapping[str, City] | None): The world to index; empty
+                until view() is called if None.
+        """
+        self._cities: Mapping[str, City] | None = None
+        # item -> city -> (price, quantity, scarcity)
+        self._cells: dict[str, dict[str, tuple[float, float, float]]] = {}
+        # order -> item -> heap of (sign * value, city), see ORDERS
+        self._heaps: dict[str, dict[str, list[tuple[float, str]]]] = {
+            order: {} for order in ORDERS
+        }
+        # Cells changed with touch() since the last view() or adopt()
+        self._touched: set[tuple[str, str]] = set()
+        self.updates = 0
+        if cities is not None:
+            self.view(cities)
+
+    def view(self, cities: Mapping[str, City]) -> "MarketIndex":
+        """Follows cities and returns the index.
+
+        The same dict is trusted to report its trades with touch(); a new one
+        (the world after an economy tick) is diffed against the index.
+
+        Args:
+            cities (Mapping[str, City]): The current world.
+
+        Returns:
+            MarketIndex: self.
+        """
+        if cities is self._cities:
+            return self
+
+        seen = set()
+        for name, city in cities.items():
+            for item, details in city.commodities.items():
+                if details:
+                    seen.add((name, item))
+                    self._update(name, item, details)
+        indexed = {(name, item) for item, cells in self._cells.items() for name in cells}
+        for name, item in indexed - seen:
+            self._remove(name, item)
+        self._cities = cities
+        self._touched.clear()
+        return self
+
+    def on_delta(self, delta):
+        """Applies a market_diff.MarketDelta of the indexed world.
+
+        Subscribe it to a MarketDiffStream and call adopt() with the new
+        cities instead of view(), which would diff them again.
+        """
+        for city in delta.removed:
+            for item in list(self._cells):
+                self._remove(city, item)
+        for city, item, price, quantity, regular_quantity in delta.cells():
+            if price is None:
+                self._remove(city, item)
+            else:
+                self._set(city, item, _values(price, quantity, regular_quantity))
+
+    def adopt(
+        self, cities: Mapping[str, City], previous: Mapping[str, City] | None = None
+    ):
+        """Follows cities without diffing them (see on_delta).
+
+        Args:
+            cities (Mapping[str, City]): The world the delta was diffed to.
+            previous (Mapping[str, City] | None): The world it was diffed
+                from. If the index followed another one, the delta did not
+                apply and cities is diffed with view() instead.
+        """
+        if self._cities is not previous:
+            self.view(cities)
+            return
+        # Traded since the snapshot the delta was diffed from
+        for name, item in self._touched:
+            city = cities.get(name)
+            details = city.commodities.get(item) if city is not None else None
+            if details:
+                self._update(name, item, details)
+            else:
+                self._remove(name, item)
+        self._touched.clear()
+        self._cities = cities
+
+    def touch(self, city: City, item: str):
+        """Updates the cell of a city of the indexed world after a trade.
+
+        Cities of other worlds (forks, training environments) are ignored.
+        """
+        if self._cities is None or self._cities.get(city.name) is not city:
+            return
+        self._touched.add((city.name, item))
+        details = city.commodities.get(item)
+        if details:
+            self._update(city.name, item, details)
+        else:
+            self._remove(city.name, item)
+
+    def best_sell(
+        self,
+        item: str,
+        k: int = 1,
+        origin: str | None = None,
+        routes: RouteTable | None = None,
+        budget: float = float("inf"),
+    ) -> list[tuple[str, float]]:
+        """Returns the k markets paying the most for item.
+
+        Args:
+            item (str): The commodity.
+            k (int): Number of markets.
+            origin (str | None): The city of the bot; excluded, and the start
+                of the routes if routes is given.
+            routes (RouteTable | None): Cheapest routes; if given (with
+                origin), only markets reachable within budget are returned.
+            budget (float): The most the route fees may cost.
+
+        Returns:
+            list[tuple[str, float]]: (city, price), highest price first.
+        """
+        return self._top("dearest", item, k, origin, routes, budget)
+
+    def best_buy(
+        self,
+        item: str,
+        k: int = 1,
+        origin: str | None = None,
+        routes: RouteTable | None = None,
+        budget: float = float("inf"),
+    ) -> list[tuple[str, float]]:
+        """Returns the k cheapest markets with item in stock.
+
+        Arguments as in best_sell.
+
+        Returns:
+            list[tuple[str, float]]: (city, price), lowest price first.
+        """
+        return self._top("cheapest", item, k, origin, routes, budget, in_stock=True)
+
+    def scarcest(
+        self,
+        item: str,
+        k: int = 1,
+        origin: str | None = None,
+        routes: RouteTable | None = None,
+        budget: float = float("inf"),
+    ) -> list[tuple[str, float]]:
+        """Returns the k markets with the least item relative to their regular stock.
+
+        Arguments as in best_sell.
+
+        Returns:
+            list[tuple[str, float]]: (city, quantity / regular_quantity),
+                scarcest first.
+        """
+        return self._top("scarcest", item, k, origin, routes, budget)
+
+    def _top(
+        self,
+        order: str,
+        item: str,
+        k: int,
+        origin: str | None,
+        routes: RouteTable | None,
+        budget: float,
+        in_stock: bool = False,
+    ) -> list[tuple[str, float]]:
+        """Returns the first k cells of a heap that are not origin and within reach.
+
+        Stale and duplicate entries popped on the way are dropped, the current
+        ones are pushed back.
+        """
+        heap = self._heaps[order].get(item)
+        if not heap:
+            return []
+        cells = self._cells.get(item, {})
+        index, sign = ORDERS[order]
+
+        top = []
+        kept = []
+        seen = set()
+        try:
+            while heap and len(top) < k:
+                key, name = heappop(heap)
+                values = cells.get(name)
+                if values is None or sign * values[index] != key or name in seen:
+                    continue
+                seen.add(name)
+                kept.append((key, name))
+                if name == origin or (in_stock and values[1] <= 0):
+                    continue
+                if routes is not None and routes.distance(origin, name, budget) > budget:
+                    continue
+                top.append((name, sign * key))
+        finally:
+            for entry in kept:
+                heappush(heap, entry)
+        return top
+
+    def _update(self, city: str, item: str, details: Mapping):
+        """Moves a cell to the positions of its current details."""
+        self._set(
+            city,
+            item,
+            _values(
+                details["price"], details["quantity"], details.get("regular_quantity")
+            ),
+        )
+
+    def _set(self, city: str, item: str, values: tuple[float, float, float]):
+        """Pushes the entries of a cell with new values; the old ones go stale."""
+        cells = self._cells.setdefault(item, {})
+        if cells.get(city) == values:
+            return
+        cells[city] = values
+        for order, (index, sign) in ORDERS.items():
+            heap = self._heaps[order].setdefault(item, [])
+            heappush(heap, (sign * values[index], city))
+            if len(heap) > 2 * len(cells) + COMPACT_SLACK:
+                self._compact(order, item)
+        self.updates += 1
+
+    def _remove(self, city: str, item: str):
+        """Drops a cell that is no longer traded; its entries go stale."""
+        cells = self._cells.get(item)
+        if cells is not None:
+            cells.pop(city, None)
+
+    def _compact(self, order: str, item: str):
+        """Rebuilds a heap from the current cells, without stale entries."""
+        index, sign = ORDERS[order]
+        heap = [
+            (sign * values[index], city) for city, values in self._cells[item].items()
+        ]
+        heapify(heap)
+        self._heaps[order][item] = heap
+
+
+MARKETS = MarketIndex()
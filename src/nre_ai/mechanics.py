@@ -1,15 +1,57 @@
 """Shared mechanics for RL agent and environment."""
 
+from collections.abc import Iterable
+
 import numpy as np
 from nrecity import City
 
+from nre_ai.market_index import MARKETS
+from nre_ai.metrics import TRADES, TRAVELS
+
 # Constants
 MAX_MONEY = 1000000.0
 MAX_INVENTORY_QTY = 1000.0
+# Units traded by a buy or sell action
+TRADE_QUANTITY = 10
 MAX_PRICE = 1000.0
 MAX_FEE = 1000.0
 COMMODITIES = ["metal", "gems", "food", "fuel", "relics"]
 
+# Action layout: 0-4 buy, 5-9 sell, 10 sell all, 11-20 travel to neighbor 0-9
+NUM_NEIGHBORS = 10
+SELL_ACTION_OFFSET = len(COMMODITIES)
+SELL_ALL_ACTION = 2 * len(COMMODITIES)
+TRAVEL_ACTION_OFFSET = SELL_ALL_ACTION + 1
+
+
+def buy_action(item_name: str) -> int | None:
+    """Returns the action index that buys item_name, None if it has none."""
+    if item_name not in COMMODITIES:
+        return None
+    return COMMODITIES.index(item_name)
+
+
+def sell_action(item_name: str) -> int | None:
+    """Returns the action index that sells item_name, None if it has none."""
+    if item_name not in COMMODITIES:
+        return None
+    return SELL_ACTION_OFFSET + COMMODITIES.index(item_name)
+
+
+def travel_action(city: City, destination: str) -> int | None:
+    """Returns the action index that travels from city to destination.
+
+    Returns:
+        int | None: The action, or None if destination is not one of the
+            first NUM_NEIGHBORS connections of city.
+    """
+    if destination not in city.connections:
+        return None
+    neighbor_idx = city.connections.index(destination)
+    if neighbor_idx >= NUM_NEIGHBORS:
+        return None
+    return TRAVEL_ACTION_OFFSET + neighbor_idx
+
 
 def get_observation(agent, cities: dict[str, City]) -> np.ndarray:
     """Constructs the observation vector."""
@@ -61,7 +103,12 @@ def get_observation(agent, cities: dict[str, City]) -> np.ndarray:
 
 
 def execute_action(
-    action: int, agent, cities: dict[str, City], verbose: bool = False
+    action: int,
+    agent,
+    cities: dict[str, City],
+    verbose: bool = False,
+    record: bool = True,
+    book=None,
 ) -> bool:
     """Executes the given action.
 
@@ -70,6 +117,12 @@ def execute_action(
         agent: The agent instance.
         cities (dict[str, City]): The map of cities.
         verbose (bool): Whether to print action details.
+        record (bool): Whether to count trades and travels in the metrics
+            and report trades to the market index; disabled for hypothetical
+            actions (see world_fork).
+        book (OrderBook | None): If given, buys and sells are submitted to
+            the book, to be cleared with the other bots' trades (see
+            order_book); travels are executed as usual.
 
     Returns:
         bool: True if the action resulted in travel, False otherwise.
@@ -80,23 +133,38 @@ def execute_action(
     if action < 5:  # Buy
         item_idx = action
         item_name = COMMODITIES[item_idx]
-        _execute_buy(agent, item_name, current_city_obj, verbose)
+        if book is not None:
+            book.buy(agent, current_city_obj, item_name, TRADE_QUANTITY)
+        else:
+            _execute_buy(agent, item_name, current_city_obj, verbose, record)
     elif action < 10:  # Sell
         item_idx = action - 5
         item_name = COMMODITIES[item_idx]
-        _execute_sell(agent, item_name, current_city_obj, verbose)
+        if book is not None:
+            book.sell(agent, current_city_obj, item_name, TRADE_QUANTITY)
+        else:
+            _execute_sell(agent, item_name, current_city_obj, verbose, record)
     elif action == 10:  # Sell All
-        _execute_sell_all(agent, current_city_obj, verbose)
+        if book is not None:
+            for item_name in list(agent.inventory):
+                book.sell(
+                    agent,
+                    current_city_obj,
+                    item_name,
+                    agent.inventory[item_name]["quantity"],
+                )
+        else:
+            _execute_sell_all(agent, current_city_obj, verbose, record)
     else:  # Travel
         neighbor_idx = action - 11
         did_travel = _execute_travel(
-            agent, neighbor_idx, current_city_obj, cities, verbose
+            agent, neighbor_idx, current_city_obj, cities, verbose, record
         )
 
     return did_travel
 
 
-def _execute_buy(agent, item_name: str, city: City, verbose: bool):
+def _execute_buy(agent, item_name: str, city: City, verbose: bool, record: bool):
     if item_name not in city.commodities or not city.commodities[item_name]:
         return
 
@@ -107,7 +175,7 @@ def _execute_buy(agent, item_name: str, city: City, verbose: bool):
     if available_qty <= 0:
         return
 
-    amount_to_buy = 10
+    amount_to_buy = TRADE_QUANTITY
     max_can_afford = int(agent.money // price)
     amount_to_buy = min(amount_to_buy, max_can_afford, available_qty)
 
@@ -127,11 +195,14 @@ def _execute_buy(agent, item_name: str, city: City, verbose: bool):
         agent.inventory[item_name]["avg_buy_price"] = new_total_cost / new_qty
 
         details["quantity"] -= amount_to_buy
+        if record:
+            TRADES.inc()
+            MARKETS.touch(city, item_name)
         if verbose:
             print(f"{agent.name} bought {amount_to_buy} {item_name} for {cost}")
 
 
-def _execute_sell(agent, item_name: str, city: City, verbose: bool):
+def _execute_sell(agent, item_name: str, city: City, verbose: bool, record: bool):
     if item_name not in agent.inventory:
         return
 
@@ -143,7 +214,7 @@ def _execute_sell(agent, item_name: str, city: City, verbose: bool):
         return
 
     price = city.commodities[item_name]["price"]
-    amount_to_sell = min(10, qty)
+    amount_to_sell = min(TRADE_QUANTITY, qty)
 
     revenue = amount_to_sell * price
     agent.money += revenue
@@ -162,11 +233,14 @@ def _execute_sell(agent, item_name: str, city: City, verbose: bool):
     if city.commodities[item_name]["quantity"] > MAX_INVENTORY_QTY:
         city.commodities[item_name]["quantity"] = int(MAX_INVENTORY_QTY)
 
+    if record:
+        TRADES.inc()
+        MARKETS.touch(city, item_name)
     if verbose:
         print(f"{agent.name} sold {amount_to_sell} {item_name} for {revenue}")
 
 
-def _execute_sell_all(agent, city: City, verbose: bool):
+def _execute_sell_all(agent, city: City, verbose: bool, record: bool):
     items = list(agent.inventory.keys())
     for item in items:
         if item not in city.commodities or not city.commodities[item]:
@@ -185,6 +259,9 @@ def _execute_sell_all(agent, city: City, verbose: bool):
         if city.commodities[item]["quantity"] > MAX_INVENTORY_QTY:
             city.commodities[item]["quantity"] = int(MAX_INVENTORY_QTY)
 
+        if record:
+            TRADES.inc()
+            MARKETS.touch(city, item)
         if verbose:
             print(f"{agent.name} sold all {qty} {item} for {revenue}")
 
@@ -194,7 +271,12 @@ def _execute_sell_all(agent, city: City, verbose: bool):
 
 
 def _execute_travel(
-    agent, neighbor_idx: int, city: City, cities: dict[str, City], verbose: bool
+    agent,
+    neighbor_idx: int,
+    city: City,
+    cities: dict[str, City],
+    verbose: bool,
+    record: bool,
 ) -> bool:
     neighbors = city.connections
     if neighbor_idx >= len(neighbors):
@@ -210,6 +292,8 @@ def _execute_travel(
     if agent.money >= fee:
         agent.money -= fee
         agent.current_city_name = target_city_name
+        if record:
+            TRAVELS.inc()
         if verbose:
             print(f"{agent.name} traveled to {target_city_name} (fee: {fee})")
         return True
@@ -232,28 +316,101 @@ def calculate_net_worth(agent, cities: dict[str, City]) -> float:
     return value
 
 
-def sanitize_city_data(city_data_list: list[dict]):
+def sanitize_city_data(
+    city_data_list: list[dict], cells: Iterable[tuple[int, str]] | None = None
+):
     """Clamps prices and quantities in the raw city data to prevent overflows.
 
     Args:
         city_data_list (list[dict]): The list of city dictionaries from JsonManager.
+        cells (Iterable[tuple[int, str]] | None): (index in city_data_list,
+            commodity) of the cells to clamp, e.g. the ones written since the
+            last clamp, so the cost does not grow with the map; every cell if
+            None.
     """
-    for city_data in city_data_list:
-        if "commodities" not in city_data:
+    if cells is None:
+        for city_data in city_data_list:
+            for details in city_data.get("commodities", {}).values():
+                if details:
+                    _clamp_details(details)
+        return
+
+    for row, item_name in cells:
+        details = city_data_list[row].get("commodities", {}).get(item_name)
+        if details:
+            _clamp_details(details)
+
+
+def _clamp_details(details: dict):
+    # Clamp Price
+    if details.get("price", 0) > MAX_PRICE:
+        details["price"] = int(MAX_PRICE)
+    if details.get("regular_price", 0) > MAX_PRICE:
+        details["regular_price"] = int(MAX_PRICE)
+
+    # Clamp Quantity
+    if details.get("quantity", 0) > MAX_INVENTORY_QTY:
+        details["quantity"] = int(MAX_INVENTORY_QTY)
+    if details.get("regular_quantity", 0) > MAX_INVENTORY_QTY:
+        details["regular_quantity"] = int(MAX_INVENTORY_QTY)
+
+
+def traded_commodities(action: int, agent) -> list[str]:
+    """Returns the commodities of the agent's city that action may change.
+
+    Call it before executing the action ('sell all' empties the inventory).
+    """
+    if action < SELL_ACTION_OFFSET:
+        return [COMMODITIES[action]]
+    if action < SELL_ALL_ACTION:
+        return [COMMODITIES[action - SELL_ACTION_OFFSET]]
+    if action == SELL_ALL_ACTION:
+        return list(agent.inventory)
+    return []
+
+
+def sync_city_quantities(
+    cities: dict[str, City],
+    city_data_list: list[dict],
+    cells: Iterable[tuple[int, str]] | None = None,
+):
+    """Copies commodity quantities from City objects back to the raw city data.
+
+    Trading only changes quantities, so this is enough to hand the bots' turns
+    to the economy update without serializing every city with to_dict().
+
+    Args:
+        cities (dict[str, City]): The cities the bots traded in.
+        city_data_list (list[dict]): The list of city dictionaries from JsonManager.
+        cells (Iterable[tuple[int, str]] | None): (index in city_data_list,
+            commodity) of the cells traded in; every cell if None.
+    """
+    if cells is not None:
+        for row, item in cells:
+            city_data = city_data_list[row]
+            city_obj = cities.get(city_data["name"])
+            if city_obj is None:
+                continue
+            details = city_obj.commodities.get(item)
+            target_details = city_data["commodities"].get(item)
+            if details is not None and target_details is not None:
+                target_details["quantity"] = details["quantity"]
+        return
+
+    city_map = {city_data["name"]: city_data for city_data in city_data_list}
+    for city_name, city_obj in cities.items():
+        city_data = city_map.get(city_name)
+        if city_data is None:
             continue
 
-        for item_name, details in city_data["commodities"].items():
-            if not details:
+        target_commodities = city_data["commodities"]
+        for item, details in city_obj.commodities.items():
+            # Details can be None (see the City definition)
+            if details is None:
+                continue
+
+            target_details = target_commodities.get(item)
+            if target_details is None:
                 continue
 
-            # Clamp Price
-            if details.get("price", 0) > MAX_PRICE:
-                details["price"] = int(MAX_PRICE)
-            if details.get("regular_price", 0) > MAX_PRICE:
-                details["regular_price"] = int(MAX_PRICE)
-
-            # Clamp Quantity
-            if details.get("quantity", 0) > MAX_INVENTORY_QTY:
-                details["quantity"] = int(MAX_INVENTORY_QTY)
-            if details.get("regular_quantity", 0) > MAX_INVENTORY_QTY:
-                details["regular_quantity"] = int(MAX_INVENTORY_QTY)
+            target_details["quantity"] = details["quantity"]
@@ -0,0 +1,252 @@
+"""In-process metrics registry with Prometheus/JSON textfile export.
+
+Recording is meant to be called from hot loops: counters and histograms only
+mutate slots that were allocated when the metric was registered, and there are
+no locks because metrics are recorded and exported from the same thread.
+"""
+
+import json
+import os
+import time
+from bisect import bisect_left
+
+# Upper bounds (in seconds) of the latency histogram buckets
+DEFAULT_LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+EXPORT_FORMATS = ("prom", "json")
+TEXTFILE_NAME = "nre_ai"
+
+
+class Counter:
+    """Monotonically increasing value."""
+
+    __slots__ = ("help", "name", "value")
+
+    def __init__(self, name: str, help: str):
+        """Initializes the counter.
+
+        Args:
+            name (str): Metric name, e.g. 'nre_ai_trades_total'.
+            help (str): Description written to the export.
+        """
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        """Increases the counter by amount."""
+        self.value += amount
+
+
+class Histogram:
+    """Distribution of observed values in fixed buckets."""
+
+    __slots__ = ("bounds", "count", "counts", "help", "name", "sum")
+
+    def __init__(self, name: str, help: str, buckets: tuple = DEFAULT_LATENCY_BUCKETS):
+        """Initializes the histogram.
+
+        Args:
+            name (str): Metric name, e.g. 'nre_ai_turn_latency_seconds'.
+            help (str): Description written to the export.
+            buckets (tuple): Sorted upper bounds of the buckets. An implicit
+                '+Inf' bucket is always added.
+        """
+        self.name = name
+        self.help = help
+        self.bounds = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """Records a single value."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Holds named metrics and renders them for export."""
+
+    def __init__(self):
+        """Initializes an empty registry."""
+        self._metrics: dict[str, Counter | Histogram] = {}
+
+    def counter(self, name: str, help: str) -> Counter:
+        """Returns the counter with the given name, creating it if needed."""
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = Counter(name, help)
+        return metric
+
+    def histogram(
+        self, name: str, help: str, buckets: tuple = DEFAULT_LATENCY_BUCKETS
+    ) -> Histogram:
+        """Returns the histogram with the given name, creating it if needed."""
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = Histogram(name, help, buckets)
+        return metric
+
+    def reset(self):
+        """Zeroes every registered metric."""
+        for metric in self._metrics.values():
+            if isinstance(metric, Counter):
+                metric.value = 0
+            else:
+                metric.counts = [0] * len(metric.counts)
+                metric.sum = 0.0
+                metric.count = 0
+
+    def to_dict(self) -> dict:
+        """Returns a JSON-serializable snapshot of all metrics."""
+        snapshot = {}
+        for name, metric in self._metrics.items():
+            if isinstance(metric, Counter):
+                snapshot[name] = {"type": "counter", "value": metric.value}
+            else:
+                snapshot[name] = {
+                    "type": "histogram",
+                    "buckets": dict(
+                        zip(
+                            [*map(str, metric.bounds), "+Inf"],
+                            metric.counts,
+                            strict=True,
+                        )
+                    ),
+                    "sum": metric.sum,
+                    "count": metric.count,
+                }
+        return snapshot
+
+    def to_prometheus(self) -> str:
+        """Renders all metrics in the Prometheus text exposition format."""
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f"# HELP {name} {metric.help}")
+            if isinstance(metric, Counter):
+                lines.append(f"# TYPE {name} counter")
+                lines.append(f"{name} {metric.value}")
+                continue
+
+            lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, count in zip(metric.bounds, metric.counts, strict=False):
+                cumulative += count
+                lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{le="+Inf"}} {metric.count}')
+            lines.append(f"{name}_sum {metric.sum}")
+            lines.append(f"{name}_count {metric.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, directory: str, fmt: str = "prom") -> str:
+        """Atomically writes the metrics to a file in directory.
+
+        The file is written under a temporary name and then renamed, so a
+        collector (e.g. node exporter's textfile collector) never reads a
+        partial file.
+
+        Args:
+            directory (str): Target directory, created if missing.
+            fmt (str): Either 'prom' or 'json'.
+
+        Returns:
+            str: Path of the written file.
+
+        Raises:
+            ValueError: If fmt is not a supported format.
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported metrics format '{fmt}'.")
+
+        os.makedirs(directory, exist_ok=True)
+        file_path = os.path.join(directory, f"{TEXTFILE_NAME}.{fmt}")
+        tmp_path = f"{file_path}.{os.getpid()}.tmp"
+
+        with open(tmp_path, "w") as f:
+            if fmt == "prom":
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, file_path)
+        return file_path
+
+
+class TextfileExporter:
+    """Periodically writes a registry to a directory."""
+
+    def __init__(
+        self,
+        registry: "MetricsRegistry",
+        directory: str,
+        fmt: str = "prom",
+        interval: float = 15.0,
+    ):
+        """Initializes the exporter.
+
+        Args:
+            registry (MetricsRegistry): The registry to export.
+            directory (str): Directory the textfile is written to.
+            fmt (str): Either 'prom' or 'json'.
+            interval (float): Minimum number of seconds between writes.
+        """
+        self.registry = registry
+        self.directory = directory
+        self.fmt = fmt
+        self.interval = interval
+        self._last_export = float("-inf")
+
+    def maybe_export(self) -> bool:
+        """Writes the metrics if at least `interval` seconds have passed.
+
+        Returns:
+            bool: True if the file was written.
+        """
+        now = time.monotonic()
+        if now - self._last_export < self.interval:
+            return False
+        self.export()
+        return True
+
+    def export(self) -> str:
+        """Writes the metrics unconditionally."""
+        self._last_export = time.monotonic()
+        return self.registry.write_textfile(self.directory, self.fmt)
+
+
+# Default registry and the metrics recorded across the package
+REGISTRY = MetricsRegistry()
+TRADES = REGISTRY.counter("nre_ai_trades_total", "Buy and sell transactions by bots.")
+TRAVELS = REGISTRY.counter("nre_ai_travels_total", "Completed bot travels.")
+BANKRUPTCIES = REGISTRY.counter("nre_ai_bankruptcies_total", "Bots that went bankrupt.")
+PLAN_CACHE_HITS = REGISTRY.counter(
+    "nre_ai_plan_cache_hits_total", "Bot trades taken from a still valid cached plan."
+)
+REPLANS = REGISTRY.counter("nre_ai_replans_total", "Bot trades searched from scratch.")
+ECONOMY_UPDATES = REGISTRY.counter(
+    "nre_ai_economy_updates_total", "City economy updates (process_changes)."
+)
+TURN_LATENCY = REGISTRY.histogram(
+    "nre_ai_turn_latency_seconds", "Wall time of a single bot turn."
+)
+SAVE_LATENCY = REGISTRY.histogram(
+    "nre_ai_save_latency_seconds", "Wall time of saving a single bot state."
+)
+REACTION_LATENCY = REGISTRY.histogram(
+    "nre_ai_reaction_latency_seconds",
+    "Time from detecting a game save to the end of the turn it triggered.",
+)
@@ -0,0 +1,271 @@
+"""Parallel Monte Carlo comparison of agent types.
+
+Every (agent type, world, seed) combination is one headless simulation on a
+private scratch copy of the world, run in a process pool. Each run draws
+from its own stream spawned from one numpy SeedSequence, so results do not
+depend on the number of workers or on the order runs are scheduled in. The
+final net worths are aggregated into distribution statistics per agent type
+and per (agent type, world).
+"""
+
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+
+import numpy as np
+
+from nre_ai.agent import AIAgent
+from nre_ai.mechanics import calculate_net_worth
+from nre_ai.simulation import ScratchWorld
+
+AGENT_TYPES = ("ai", "rl")
+DEFAULT_MODEL_PATH = "models/trading_bot_v1.zip"
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Loaded PPO models of this worker process, keyed by path
+_models: dict = {}
+
+
+def _create_agent(
+    agent_type: str, start_city: str, money: float, model_path: str
+) -> AIAgent:
+    """Creates a bot of agent_type; PPO models are loaded once per process."""
+    if agent_type == "ai":
+        return AIAgent(name="Bot1", money=money, initial_city=start_city)
+
+    # Imported here, rule-based runs never load stable-baselines3
+    from stable_baselines3 import PPO
+
+    from nre_ai.rl_agent import RLAgent
+
+    if model_path not in _models:
+        _models[model_path] = PPO.load(model_path)
+    return RLAgent(
+        name="Bot1",
+        money=money,
+        initial_city=start_city,
+        model_path=model_path,
+        model=_models[model_path],
+    )
+
+
+def run_simulation(
+    agent_type: str,
+    world_path: str,
+    seed_sequence: np.random.SeedSequence,
+    turns: int = 500,
+    money: float = 1000.0,
+    model_path: str = DEFAULT_MODEL_PATH,
+) -> dict:
+    """Runs one headless simulation on a private copy of world_path.
+
+    The start city is drawn from seed_sequence, which also seeds the `random`
+    module the economy update uses in this process.
+
+    Args:
+        agent_type (str): 'ai' for AIAgent or 'rl' for RLAgent.
+        world_path (str): World JSON; never modified.
+        seed_sequence (np.random.SeedSequence): Random stream of the run.
+        turns (int): Turn limit.
+        money (float): Starting money.
+        model_path (str): PPO model of 'rl' agents.
+
+    Returns:
+        dict: The run parameters (stream is the index of seed_sequence among
+            its siblings) with its final net worth, money, number of
+            turns played and whether the bot went bankrupt.
+    """
+    rng = np.random.default_rng(seed_sequence)
+    random.seed(int(seed_sequence.generate_state(1)[0]))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        private_path = os.path.join(tmp_dir, os.path.basename(world_path))
+        shutil.copy2(world_path, private_path)
+
+        with ScratchWorld(private_path) as world:
+            names = [name for name, city in world.cities.items() if city.connections]
+            start_city = str(rng.choice(names or list(world.cities)))
+            agent = _create_agent(agent_type, start_city, money, model_path)
+
+            played = 0
+            # The bots report every decision
+            with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+                for _ in range(turns):
+                    agent.take_turn(world.cities)
+                    played += 1
+                    if agent.is_bankrupt():
+                        break
+                    world.update_economy()
+
+            net_worth = calculate_net_worth(agent, world.cities)
+
+    return {
+        "agent": agent_type,
+        "world": world_path,
+        "stream": seed_sequence.spawn_key[-1],
+        "start_city": start_city,
+        "turns": played,
+        "money": agent.money,
+        "net_worth": net_worth,
+        "bankrupt": agent.is_bankrupt(),
+    }
+
+
+def distribution(values: list[float]) -> dict:
+    """Returns count, mean, std, min, max and percentiles of values."""
+    array = np.asarray(values, dtype=float)
+    if not array.size:
+        return {"count": 0}
+    stats = {
+        "count": int(array.size),
+        "mean": float(array.mean()),
+        "std": float(array.std(ddof=1)) if array.size > 1 else 0.0,
+        "min": float(array.min()),
+        "max": float(array.max()),
+    }
+    for q, value in zip(PERCENTILES, np.percentile(array, PERCENTILES), strict=True):
+        stats[f"p{q}"] = float(value)
+    return stats
+
+
+def aggregate(results: list[dict]) -> dict:
+    """Aggregates run results per agent type and per (agent type, world).
+
+    Returns:
+        dict: 'agents' maps every agent type, 'worlds' every 'agent|world'
+            pair, to the net worth distribution, bankruptcy rate and mean
+            number of turns played.
+    """
+    groups: dict[str, dict[str, list[dict]]] = {"agents": {}, "worlds": {}}
+    for result in results:
+        groups["agents"].setdefault(result["agent"], []).append(result)
+        key = f"{result['agent']}|{result['world']}"
+        groups["worlds"].setdefault(key, []).append(result)
+
+    return {
+        level: {
+            key: {
+                "net_worth": distribution([run["net_worth"] for run in runs]),
+                "bankruptcy_rate": sum(run["bankrupt"] for run in runs) / len(runs),
+                "mean_turns": float(np.mean([run["turns"] for run in runs])),
+            }
+            for key, runs in sorted(grouped.items())
+        }
+        for level, grouped in groups.items()
+    }
+
+
+def compare(
+    agent_types: list[str],
+    world_paths: list[str],
+    n_seeds: int,
+    turns: int = 500,
+    money: float = 1000.0,
+    model_path: str = DEFAULT_MODEL_PATH,
+    n_workers: int | None = None,
+    seed: int = 0,
+) -> dict:
+    """Runs every (agent type, world, seed) combination in a process pool.
+
+    Run i draws from the i-th child of SeedSequence(seed). The seed index,
+    not the agent type, selects the child, so every agent type plays the same
+    start cities and economies on a given world.
+
+    Args:
+        agent_types (list[str]): Agent types to compare (see AGENT_TYPES).
+        world_paths (list[str]): World JSON files.
+        n_seeds (int): Runs per agent type and world.
+        turns (int): Turn limit of a run.
+        money (float): Starting money.
+        model_path (str): PPO model of 'rl' agents.
+        n_workers (int | None): Worker processes; defaults to the CPU count.
+        seed (int): Root seed.
+
+    Returns:
+        dict: The aggregate (see aggregate) and the results of every run.
+
+    Raises:
+        ValueError: If an agent type is unknown.
+    """
+    for agent_type in agent_types:
+        if agent_type not in AGENT_TYPES:
+            raise ValueError(f"Unknown agent type '{agent_type}'.")
+
+    root = np.random.SeedSequence(seed)
+    streams = root.spawn(len(world_paths) * n_seeds)
+
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        futures = [
+            pool.submit(
+                run_simulation,
+                agent_type,
+                world_path,
+                streams[w * n_seeds + s],
+                turns,
+                money,
+                model_path,
+            )
+            for agent_type in agent_types
+            for w, world_path in enumerate(world_paths)
+            for s in range(n_seeds)
+        ]
+        results = [future.result() for future in futures]
+
+    return {"seed": seed, "summary": aggregate(results), "runs": results}
+
+
+def main():
+    """Runs a comparison from the command line."""
+    parser = ArgumentParser(description="Monte Carlo comparison of agent types.")
+    parser.add_argument("worlds", nargs="+", help="World JSON files.")
+    parser.add_argument(
+        "--agents", nargs="+", choices=AGENT_TYPES, default=list(AGENT_TYPES)
+    )
+    parser.add_argument("-n", "--seeds", type=int, default=32, help="Runs per pair.")
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--money", type=float, default=1000.0)
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Worker processes (default: CPUs)."
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Root seed.")
+    parser.add_argument(
+        "--output", default=None, help="JSON output path (default: stdout)."
+    )
+    args = parser.parse_args()
+
+    report = compare(
+        args.agents,
+        args.worlds,
+        args.seeds,
+        turns=args.turns,
+        money=args.money,
+        model_path=args.model,
+        n_workers=args.workers,
+        seed=args.seed,
+    )
+    if not args.output:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    for agent_type, stats in report["summary"]["agents"].items():
+        net_worth = stats["net_worth"]
+        print(
+            f"{agent_type}: mean net worth {net_worth['mean']:.2f} "
+            f"(p5 {net_worth['p5']:.2f}, p95 {net_worth['p95']:.2f}), "
+            f"bankruptcy rate {stats['bankruptcy_rate']:.1%}"
+        )
+    print(f"Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
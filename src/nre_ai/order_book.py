@@ -0,0 +1,283 @@
+"""Batched, order-independent clearing of the bots' trades.
+
+Trading inline lets the first bot of the list empty a city's stock before the
+next one looks at it. With an OrderBook, the bots submit their buys and sells
+during their turns and the book clears every (city, commodity) market at once
+after the last turn, so the outcome does not depend on the order of the bots.
+
+Submitting puts the goods in escrow: a sell takes the goods out of the
+inventory and a buy takes the money out of the wallet at the price of the
+moment, so the rest of the turn is planned with what the bot will have.
+Clearing then:
+
+1. Sells everything sold to the cities (cities take any quantity).
+2. Fills the buys of every market from its stock after the sells. When the
+   demand exceeds the stock, every order gets its pro-rata share rounded
+   down, and the units left by the rounding go to the largest remainders
+   (ties broken by bot name). Unfilled units are refunded.
+
+All markets are cleared together with numpy arithmetic. Buys are ordered and
+filled in whole units; stock and sells keep their fractions, and a fraction
+of the stock that no whole unit can be filled from stays in the city.
+"""
+
+import numpy as np
+from nrecity import City
+
+from nre_ai.market_index import MARKETS
+from nre_ai.mechanics import MAX_INVENTORY_QTY, MAX_MONEY
+from nre_ai.metrics import TRADES
+
+
+class Fill:
+    """The outcome of one order."""
+
+    __slots__ = ("agent", "city", "item", "price", "quantity", "requested")
+
+    def __init__(
+        self,
+        agent,
+        city: str,
+        item: str,
+        price: float,
+        requested: float,
+        quantity: float,
+    ):
+        """Initializes the fill.
+
+        Args:
+            agent: The bot.
+            city (str): The market city.
+            item (str): Commodity.
+            price (float): Price per unit.
+            requested (float): Units ordered; negative for a sell.
+            quantity (float): Units traded; negative for a sell.
+        """
+        self.agent = agent
+        self.city = city
+        self.item = item
+        self.price = price
+        self.requested = requested
+        self.quantity = quantity
+
+
+class OrderBook:
+    """Collects the trades of a turn and clears them together."""
+
+    def __init__(self):
+        """Initializes an empty book."""
+        self._reset()
+
+    def _reset(self):
+        """Drops every order."""
+        self._index: dict[tuple[str, str], int] = {}
+        # (city, item) of every market
+        self._markets: list[tuple[City, str]] = []
+        self._agents: list = []
+        self._market: list[int] = []
+        self._quantity: list[float] = []
+        self._price: list[float] = []
+
+    def __len__(self) -> int:
+        """Returns the number of pending orders."""
+        return len(self._quantity)
+
+    def buy(self, agent, city: City, item: str, quantity: int) -> int:
+        """Orders quantity units of item, paying for them in escrow.
+
+        Args:
+            agent: The bot.
+            city (City): The city the bot is in.
+            item (str): Commodity.
+            quantity (int): Units wanted; cut to what the bot can afford.
+
+        Returns:
+            int: Units ordered.
+        """
+        details = city.commodities.get(item)
+        if not details or details["price"] <= 0:
+            return 0
+        price = details["price"]
+        quantity = min(int(quantity), int(agent.money // price))
+        if quantity <= 0:
+            return 0
+
+        agent.money -= quantity * price
+        self._add(agent, city, item, quantity, price)
+        return quantity
+
+    def sell(self, agent, city: City, item: str, quantity: float) -> float:
+        """Orders a sale of quantity units of item, taking them from the inventory.
+
+        Args:
+            agent: The bot.
+            city (City): The city the bot is in.
+            item (str): Commodity.
+            quantity (float): Units to sell; cut to what the bot holds.
+
+        Returns:
+            float: Units ordered.
+        """
+        details = city.commodities.get(item)
+        held = agent.inventory.get(item)
+        if not details or not held:
+            return 0
+        quantity = min(quantity, held["quantity"])
+        if quantity <= 0:
+            return 0
+
+        held["quantity"] -= quantity
+        if held["quantity"] <= 0:
+            del agent.inventory[item]
+        self._add(agent, city, item, -quantity, details["price"])
+        return quantity
+
+    def clear(self) -> list[Fill]:
+        """Clears every market and applies the fills to the bots and cities.
+
+        Returns:
+            list[Fill]: One fill per order, in submission order.
+        """
+        if not self._quantity:
+            return []
+
+        market = np.array(self._market, dtype=np.int64)
+        quantity = np.array(self._quantity, dtype=np.float64)
+        n_markets = len(self._markets)
+        is_buy = quantity > 0
+
+        stock = np.array(
+            [
+                max(city.commodities[item]["quantity"] or 0, 0)
+                for city, item in self._markets
+            ],
+            dtype=np.float64,
+        )
+        sold = np.bincount(
+            market, weights=np.where(is_buy, 0, -quantity), minlength=n_markets
+        )
+        supply = stock + sold
+        demand = np.bincount(
+            market, weights=np.where(is_buy, quantity, 0), minlength=n_markets
+        )
+
+        # Sells are always filled, buys in whole units
+        filled = np.where(is_buy, 0, quantity)
+        buys = np.flatnonzero(is_buy)
+        if buys.size:
+            filled[buys] = self._allocate(
+                market[buys],
+                quantity[buys].astype(np.int64),
+                np.floor(supply).astype(np.int64),
+                demand.astype(np.int64),
+                buys,
+            )
+
+        bought = np.bincount(
+            market, weights=np.where(is_buy, filled, 0), minlength=n_markets
+        )
+        fills = self._apply(filled, supply - bought)
+        self._reset()
+        return fills
+
+    def _add(self, agent, city: City, item: str, quantity: float, price: float):
+        """Stores an order; quantity is negative for a sell."""
+        key = (city.name, item)
+        market = self._index.get(key)
+        if market is None:
+            market = len(self._markets)
+            self._index[key] = market
+            self._markets.append((city, item))
+        self._agents.append(agent)
+        self._market.append(market)
+        self._quantity.append(quantity)
+        self._price.append(price)
+
+    def _allocate(
+        self,
+        market: np.ndarray,
+        wanted: np.ndarray,
+        supply: np.ndarray,
+        demand: np.ndarray,
+        orders: np.ndarray,
+    ) -> np.ndarray:
+        """Splits the supply of every market between its buy orders.
+
+        Args:
+            market (np.ndarray): Market of every buy order.
+            wanted (np.ndarray): Units of every buy order.
+            supply (np.ndarray): Whole units available per market.
+            demand (np.ndarray): Units ordered per market.
+            orders (np.ndarray): Index of every buy order in the book.
+
+        Returns:
+            np.ndarray: Units filled per buy order.
+        """
+        short = demand[market] > supply[market]
+        share_supply = np.where(short, supply[market], demand[market])
+        share_demand = np.maximum(demand[market], 1)
+        filled = wanted * share_supply // share_demand
+        remainder = wanted * share_supply % share_demand
+
+        leftover = np.minimum(supply, demand) - np.bincount(
+            market, weights=filled, minlength=len(supply)
+        ).astype(np.int64)
+
+        # Largest remainders first, ties by bot name then submission order
+        names = np.array([self._agents[i].name for i in orders])
+        order = np.lexsort((orders, names, -remainder, market))
+        sorted_market = market[order]
+        rank = np.arange(order.size) - np.searchsorted(sorted_market, sorted_market)
+        bonus = np.zeros_like(filled)
+        bonus[order] = rank < leftover[sorted_market]
+        return filled + bonus
+
+    def _apply(self, filled: np.ndarray, remaining: np.ndarray) -> list[Fill]:
+        """Moves the goods and money and returns the fills.
+
+        Args:
+            filled (np.ndarray): Units traded per order, negative for sells.
+            remaining (np.ndarray): Stock left per market.
+
+        Returns:
+            list[Fill]: One fill per order.
+        """
+        for (city, item), quantity in zip(self._markets, remaining.tolist(), strict=True):
+            details = city.commodities[item]
+            if not isinstance(details["quantity"], float) and quantity.is_integer():
+                # Integer stock stays integer
+                quantity = int(quantity)
+            details["quantity"] = min(quantity, int(MAX_INVENTORY_QTY))
+            MARKETS.touch(city, item)
+
+        fills = []
+        for agent, market, requested, quantity, price in zip(
+            self._agents,
+            self._market,
+            self._quantity,
+            filled.tolist(),
+            self._price,
+            strict=True,
+        ):
+            city, item = self._markets[market]
+            # Buys fill whole units, sells are filled as requested
+            quantity = int(quantity) if requested > 0 else requested
+            if requested > 0:
+                if quantity > 0:
+                    held = agent.inventory.setdefault(
+                        item, {"quantity": 0, "avg_buy_price": 0}
+                    )
+                    total_cost = (
+                        held["quantity"] * held["avg_buy_price"] + quantity * price
+                    )
+                    held["quantity"] += quantity
+                    held["avg_buy_price"] = total_cost / held["quantity"]
+                # Refund of the unfilled units
+                agent.money += (requested - quantity) * price
+            else:
+                agent.money = min(agent.money - quantity * price, MAX_MONEY)
+
+            if quantity:
+                TRADES.inc()
+            fills.append(Fill(agent, city.name, item, price, requested, quantity))
+        return fills
@@ -0,0 +1,283 @@
+"""Anytime Monte Carlo tree search planner for the bots.
+
+AIAgent looks one hop ahead. PlanningAgent instead searches sequences of
+TradingEnv actions (buy, sell, travel) with MCTS and plays the most visited
+branch up to and including its first travel, which ends the turn.
+
+The search is open loop: nodes store actions and statistics, not states, and
+every iteration replays its path from the bot's real state on a fresh
+WorldFork, so only the cells touched by the replay are ever copied. The
+economy model is the mechanics themselves on the fork; trades move
+quantities, prices stay at their current values over the short horizon.
+
+The planner is anytime: it iterates until its millisecond budget runs out and
+answers with whatever it has. When the bot played the branch the planner
+chose, the subtree below it becomes the next root, so the statistics gathered
+for later turns are not thrown away.
+"""
+
+import math
+import random
+from time import perf_counter
+
+from nrecity import City
+
+from nre_ai.agent import AIAgent
+from nre_ai.mechanics import (
+    COMMODITIES,
+    NUM_NEIGHBORS,
+    TRAVEL_ACTION_OFFSET,
+    buy_action,
+    calculate_net_worth,
+    execute_action,
+    sell_action,
+)
+from nre_ai.world_fork import SimulatedAgent, WorldFork
+
+DEFAULT_BUDGET_MS = 20.0
+
+
+def legal_actions(agent, cities: dict[str, City]) -> list[int]:
+    """Returns the actions that change something for agent in its city.
+
+    Buys of affordable commodities in stock, sells of held commodities the
+    city trades and travels to affordable neighbors; 'sell all' is left out,
+    it is a sequence of sells.
+    """
+    city = cities[agent.current_city_name]
+    actions = []
+    for item in COMMODITIES:
+        details = city.commodities.get(item)
+        if not details:
+            continue
+        if details["quantity"] > 0 and 0 < details["price"] <= agent.money:
+            actions.append(buy_action(item))
+        if item in agent.inventory:
+            actions.append(sell_action(item))
+
+    for neighbor_idx, name in enumerate(city.connections[:NUM_NEIGHBORS]):
+        if (
+            name in cities
+            and name != agent.current_city_name
+            and cities[name].fee <= agent.money
+        ):
+            actions.append(TRAVEL_ACTION_OFFSET + neighbor_idx)
+    return actions
+
+
+def is_travel(action: int) -> bool:
+    """Checks if action is a travel action."""
+    return action >= TRAVEL_ACTION_OFFSET
+
+
+class Node:
+    """A node of the search tree, reached by playing action from its parent."""
+
+    __slots__ = ("action", "children", "parent", "total", "visits")
+
+    def __init__(self, action: int | None = None, parent: "Node | None" = None):
+        """Initializes an unvisited node."""
+        self.action = action
+        self.parent = parent
+        self.children: dict[int, Node] = {}
+        self.visits = 0
+        self.total = 0.0
+
+    def uct(self, child: "Node", exploration: float) -> float:
+        """Returns the UCT score of a child of this node."""
+        if child.visits == 0:
+            return math.inf
+        exploit = child.total / child.visits
+        return exploit + exploration * math.sqrt(math.log(self.visits) / child.visits)
+
+    def best_child(self) -> "Node | None":
+        """Returns the most visited child, None for a leaf."""
+        if not self.children:
+            return None
+        return max(self.children.values(), key=lambda child: child.visits)
+
+
+class MCTSPlanner:
+    """Plans the actions of one bot with a per-turn time budget."""
+
+    def __init__(
+        self,
+        budget_ms: float = DEFAULT_BUDGET_MS,
+        max_depth: int = 8,
+        rollout_depth: int = 4,
+        exploration: float = 1.4,
+        seed: int | None = None,
+    ):
+        """Initializes the planner.
+
+        Args:
+            budget_ms (float): Hard wall-time limit of a search.
+            max_depth (int): Actions in the tree below the root.
+            rollout_depth (int): Random actions played below a new node.
+            exploration (float): UCT exploration constant.
+            seed (int | None): Seed of the rollout policy.
+        """
+        self.budget_ms = budget_ms
+        self.max_depth = max_depth
+        self.rollout_depth = rollout_depth
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.root = Node()
+        self._expected_city: str | None = None
+        self.iterations = 0
+        self.reused = False
+
+    def plan(self, agent, cities: dict[str, City]) -> list[int]:
+        """Searches until the budget runs out and returns the turn's actions.
+
+        Args:
+            agent: The bot; only read.
+            cities (dict[str, City]): The world; only read.
+
+        Returns:
+            list[int]: The most visited branch up to and including its first
+                travel; empty if the bot has nothing to do.
+        """
+        deadline = perf_counter() + self.budget_ms / 1000
+        self.reused = (
+            self._expected_city == agent.current_city_name and self.root.visits > 0
+        )
+        if not self.reused:
+            self.reset()
+
+        start_value = max(calculate_net_worth(agent, cities), 1.0)
+        self.iterations = 0
+        while True:
+            self._iterate(agent, cities, start_value)
+            self.iterations += 1
+            if perf_counter() >= deadline:
+                break
+
+        actions = []
+        node = self.root
+        while (node := node.best_child()) is not None:
+            actions.append(node.action)
+            if is_travel(node.action):
+                break
+        return actions
+
+    def reset(self):
+        """Drops the tree; the next search starts from scratch."""
+        self.root = Node()
+        self._expected_city = None
+
+    def advance(self, actions: list[int], agent):
+        """Moves the root below the played actions for the next turn.
+
+        Args:
+            actions (list[int]): The actions the bot played.
+            agent: The bot after playing them.
+        """
+        node = self.root
+        for action in actions:
+            node = node.children.get(action)
+            if node is None:
+                self.reset()
+                return
+        node.parent = None
+        node.action = None
+        self.root = node
+        self._expected_city = agent.current_city_name
+
+    def _iterate(self, agent, cities: dict[str, City], start_value: float):
+        """Runs one selection, expansion, rollout and backup."""
+        world = WorldFork(cities)
+        state = SimulatedAgent.from_agent(agent)
+        node = self.root
+        depth = 0
+
+        # Selection: descend while every legal action has been tried
+        while depth < self.max_depth:
+            actions = legal_actions(state, world)
+            if not actions:
+                break
+            untried = [action for action in actions if action not in node.children]
+            if untried:
+                # Expansion
+                action = self.rng.choice(untried)
+                child = Node(action, node)
+                node.children[action] = child
+                execute_action(action, state, world, record=False)
+                node = child
+                depth += 1
+                break
+            parent = node
+            node = max(
+                (node.children[action] for action in actions),
+                key=lambda child: parent.uct(child, self.exploration),
+            )
+            execute_action(node.action, state, world, record=False)
+            depth += 1
+
+        # Rollout
+        for _ in range(self.rollout_depth):
+            actions = legal_actions(state, world)
+            if not actions:
+                break
+            execute_action(self.rng.choice(actions), state, world, record=False)
+
+        reward = calculate_net_worth(state, world) / start_value - 1.0
+        while node is not None:
+            node.visits += 1
+            node.total += reward
+            node = node.parent
+
+
+class PlanningAgent(AIAgent):
+    """AIAgent that plays the actions chosen by an MCTSPlanner."""
+
+    uses_world_index = False
+
+    def __init__(
+        self,
+        name: str,
+        money: int,
+        initial_city: str,
+        factory_map: dict | None = None,
+        planner: MCTSPlanner | None = None,
+    ):
+        """Initializes the bot.
+
+        Args:
+            name (str): The unique name of the bot.
+            money (int): Initial amount of money.
+            initial_city (str): The name of the starting city.
+            factory_map (dict | None): See AIAgent.
+            planner (MCTSPlanner | None): The planner; defaults to one with
+                DEFAULT_BUDGET_MS.
+        """
+        super().__init__(name, money, initial_city, factory_map)
+        self.planner = planner if planner is not None else MCTSPlanner()
+
+    def _trade_state(self) -> tuple:
+        """Returns what an executed or submitted action changes."""
+        held = sum(details["quantity"] for details in self.inventory.values())
+        return self.current_city_name, self.money, held
+
+    def take_turn(self, cities: dict[str, City]):
+        """Plans within the budget and plays the planned actions."""
+        self.turn_actions = []
+
+        actions = self.planner.plan(self, cities)
+        played = []
+        for action in actions:
+            before = self._trade_state()
+            self._record_action(action)
+            execute_action(action, self, cities, verbose=True, book=self.order_book)
+            if self._trade_state() == before:
+                # The world differs from the plan, replan next turn
+                self.turn_actions.pop()
+                break
+            played.append(action)
+
+        if played:
+            self.planner.advance(played, self)
+        else:
+            self.planner.reset()
+            print(f"{self.name} found nothing to do in {self.current_city_name}.")
+        self.last_action = self.turn_actions[-1] if self.turn_actions else None
@@ -0,0 +1,162 @@
+"""Per-phase profiling of the nre-ai entry point.
+
+PhaseProfiler accumulates the wall and CPU time of named phases (managers,
+bot loading, bot turns, economy update, events...). It is cheap enough to stay
+on in every run; `nre-ai --profile report.json` writes what it measured as a
+JSON report, optionally with a cProfile dump and the import costs of the
+package measured with `python -X importtime` in a subprocess, so reports of
+different releases can be compared.
+"""
+
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+from collections.abc import Iterator
+from contextlib import contextmanager
+from importlib.metadata import PackageNotFoundError, version
+from time import perf_counter, process_time
+
+REPORT_VERSION = 1
+
+# "import time:       123 |        456 | package.module"
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+class PhaseProfiler:
+    """Accumulates wall and CPU time per named phase."""
+
+    def __init__(self):
+        """Starts the profiler clock."""
+        self.phases: dict[str, dict[str, float]] = {}
+        self._wall_start = perf_counter()
+        self._cpu_start = process_time()
+
+    def add(self, name: str, wall: float, cpu: float):
+        """Records one call of phase name measured elsewhere."""
+        stats = self.phases.setdefault(name, {"calls": 0, "wall": 0.0, "cpu": 0.0})
+        stats["calls"] += 1
+        stats["wall"] += wall
+        stats["cpu"] += cpu
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Times the enclosed block as one call of phase name."""
+        wall = perf_counter()
+        cpu = process_time()
+        try:
+            yield
+        finally:
+            self.add(name, perf_counter() - wall, process_time() - cpu)
+
+    def report(self) -> dict:
+        """Returns the phases, in first-call order, and the total times (s)."""
+        return {
+            "phases": self.phases,
+            "total": {
+                "wall": perf_counter() - self._wall_start,
+                "cpu": process_time() - self._cpu_start,
+            },
+        }
+
+
+def parse_importtime(stderr: str) -> list[dict]:
+    """Parses the `-X importtime` output into per-module costs.
+
+    Returns:
+        list[dict]: 'module', 'self_us', 'cumulative_us' and nesting 'depth'
+            of every import, sorted by cumulative time, most expensive first.
+    """
+    imports = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            imports.append(
+                {
+                    "module": match.group(4),
+                    "self_us": int(match.group(1)),
+                    "cumulative_us": int(match.group(2)),
+                    "depth": (len(match.group(3)) - 1) // 2,
+                }
+            )
+    imports.sort(key=lambda entry: entry["cumulative_us"], reverse=True)
+    return imports
+
+
+def measure_imports(module: str = "nre_ai", top: int = 50) -> dict:
+    """Measures the import cost of module in a fresh interpreter.
+
+    Args:
+        module (str): Module to import.
+        top (int): Number of most expensive imports kept in the report.
+
+    Returns:
+        dict: Total wall time of the import (s) and the top imports.
+
+    Raises:
+        RuntimeError: If the import fails.
+    """
+    start = perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=os.environ.copy(),
+        check=False,
+    )
+    elapsed = perf_counter() - start
+    if process.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{process.stderr[-2000:]}")
+
+    imports = parse_importtime(process.stderr)
+    top_level = [entry for entry in imports if entry["module"] == module]
+    return {
+        "module": module,
+        "process_wall": elapsed,
+        "cumulative_us": top_level[0]["cumulative_us"] if top_level else None,
+        "top": imports[:top],
+    }
+
+
+def write_report(
+    path: str,
+    profiler: PhaseProfiler,
+    imports: dict | None = None,
+    cprofile_path: str | None = None,
+    extra: dict | None = None,
+) -> str:
+    """Writes the profiling report as JSON.
+
+    Args:
+        path (str): Report path.
+        profiler (PhaseProfiler): The measured phases.
+        imports (dict | None): Output of measure_imports.
+        cprofile_path (str | None): Path of the cProfile dump, if any.
+        extra (dict | None): Run parameters to store with the report.
+
+    Returns:
+        str: The report path.
+    """
+    try:
+        package_version = version("nre-ai")
+    except PackageNotFoundError:
+        package_version = None
+
+    report = {
+        "report_version": REPORT_VERSION,
+        "nre_ai_version": package_version,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        **(extra or {}),
+        **profiler.report(),
+        "imports": imports,
+        "cprofile": cprofile_path,
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
@@ -10,16 +10,56 @@ from nre_ai.mechanics import execute_action, get_observation
 class RLAgent(AIAgent):
     """RL-based Agent that wraps the rule-based AIAgent structure."""
 
-    def __init__(self, name: str, money: int, initial_city: str, model_path: str):
+    uses_world_index = False
+
+    def __init__(
+        self,
+        name: str,
+        money: int,
+        initial_city: str,
+        model_path: str,
+        model: PPO | None = None,
+    ):
+        """Initializes the agent.
+
+        Args:
+            name (str): The unique name of the bot.
+            money (int): Initial amount of money.
+            initial_city (str): The name of the starting city.
+            model_path (str): Path of the PPO model.
+            model (PPO | None): The already loaded model, shared by bots using
+                the same model_path. If None, the model is loaded from
+                model_path.
+        """
         super().__init__(name, money, initial_city)
-        self.model = PPO.load(model_path)
+        self.model = model if model is not None else self.load_model(model_path)
         self.model_path = model_path
 
+    @staticmethod
+    def load_model(model_path: str) -> PPO:
+        """Loads a PPO model to share between bots (see __init__)."""
+        return PPO.load(model_path)
+
     @classmethod
-    def from_dict(cls, data: dict) -> "RLAgent":
-        """Creates an RL agent instance from a dictionary state."""
+    def from_dict(
+        cls, data: dict, model_path: str | None = None, model: PPO | None = None
+    ) -> "RLAgent":
+        """Creates an RL agent instance from a dictionary state.
+
+        Args:
+            data (dict): The dictionary containing bot state.
+            model_path (str | None): Model used if the state has no
+                'model_path' (e.g. a bot saved by the rule-based AIAgent).
+            model (PPO | None): The already loaded model, see __init__.
+
+        Returns:
+            RLAgent: The restored bot.
+
+        Raises:
+            ValueError: If no model path is known.
+        """
         initial_city = data["current_city"]
-        model_path = data.get("model_path")
+        model_path = data.get("model_path") or model_path
         if not model_path:
             raise ValueError("RLAgent requires 'model_path' in the data dictionary.")
 
@@ -28,6 +68,7 @@ class RLAgent(AIAgent):
             money=data["zloto"],
             initial_city=initial_city,
             model_path=model_path,
+            model=model,
         )
         agent.inventory = data.get("inventory_full", {})
         return agent
@@ -47,4 +88,8 @@ class RLAgent(AIAgent):
         action, _states = self.model.predict(obs, deterministic=True)
 
         # 3. Execute Action
-        execute_action(action, self, cities, verbose=True)
+        self.last_action = int(action)
+        if self.order_book is not None:
+            execute_action(action, self, cities, verbose=True, book=self.order_book)
+        else:
+            execute_action(action, self, cities, verbose=True)
@@ -0,0 +1,329 @@
+"""Cheapest routes over the travel fees.
+
+Traveling to a city costs that city's `fee`, so the cheapest route between two
+cities is a shortest path in the directed graph of `connections` weighted by
+the fee of the destination. RouteTable routes lazily: the first question
+about an origin runs one Dijkstra search from it, stopped at the fee budget
+of the question, and the (sparse) result is kept for the next questions. The
+rows of the least recently used origins are dropped, so memory stays bounded
+on maps of any size. RouteTable.build() routes every pair up front; it holds
+dense n x n matrices and is only meant for small maps.
+
+RouteCache keeps the table of the current graph version (city names,
+connections and fees) and starts a new one when one of them changes, so
+planners can ask ROUTES.table(cities) every turn and pay for routing only
+after the fees moved. Like market_index, the same cities dict is trusted to
+keep its graph and only a new one is hashed, unless it is adopted after a
+market_diff.MarketDelta. Code that changes fees or connections in place must
+call ROUTES.invalidate().
+"""
+
+import heapq
+import math
+import os
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from nrecity import City
+
+# Maps with more cities are routed in a process pool by RouteTable.build
+PARALLEL_MIN_CITIES = 512
+# Largest map RouteTable.build routes all pairs of (two n x n matrices)
+ALL_PAIRS_MAX_CITIES = 2048
+# Origins whose routes a RouteTable keeps
+ROW_CACHE_SIZE = 1024
+NO_HOP = -1
+
+# Graph of the worker process, set by _init_worker
+_graph: tuple[list[list[int]], list[float]] | None = None
+
+
+def graph_version(cities: Mapping[str, City]) -> int:
+    """Returns a hash of the city names, connections and fees."""
+    return hash(
+        tuple(
+            (name, float(city.fee), tuple(city.connections))
+            for name, city in cities.items()
+        )
+    )
+
+
+def _adjacency(
+    cities: Mapping[str, City],
+) -> tuple[list[str], list[list[int]], list[float]]:
+    """Returns the city names, neighbor indices and fees of the graph."""
+    names = list(cities)
+    index = {name: i for i, name in enumerate(names)}
+    adjacency = [
+        [index[neighbor] for neighbor in city.connections if neighbor in index]
+        for city in cities.values()
+    ]
+    fees = [float(city.fee) for city in cities.values()]
+    return names, adjacency, fees
+
+
+def _search(
+    source: int, adjacency: list[list[int]], fees: list[float], budget: float
+) -> tuple[dict[int, float], dict[int, int]]:
+    """Runs Dijkstra from source over the routes costing at most budget.
+
+    Returns:
+        tuple[dict[int, float], dict[int, int]]: Route cost and index of the
+            first hop of every city reached; the costs are exact, since every
+            prefix of a route within budget is within budget too.
+    """
+    dist = {source: 0.0}
+    first = {}
+    heap = [(0.0, source)]
+    while heap:
+        cost, city = heapq.heappop(heap)
+        if cost > dist[city]:
+            continue
+        for neighbor in adjacency[city]:
+            new_cost = cost + fees[neighbor]
+            if new_cost <= budget and new_cost < dist.get(neighbor, math.inf):
+                dist[neighbor] = new_cost
+                first[neighbor] = neighbor if city == source else first[city]
+                heapq.heappush(heap, (new_cost, neighbor))
+    return dist, first
+
+
+def dijkstra(
+    source: int,
+    adjacency: list[list[int]],
+    fees: list[float],
+    budget: float = math.inf,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Finds the cheapest routes from source to every city.
+
+    Args:
+        source (int): Index of the start city.
+        adjacency (list[list[int]]): Neighbor indices of every city.
+        fees (list[float]): Fee of every city, the cost of entering it.
+        budget (float): Routes costing more are not followed.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Route cost (inf if unreachable within
+            budget) and index of the first hop (NO_HOP for the source and
+            unreachable cities) for every destination.
+    """
+    n = len(adjacency)
+    dist, first = _search(source, adjacency, fees, budget)
+    cost = np.full(n, math.inf)
+    cost[list(dist)] = list(dist.values())
+    hops = np.full(n, NO_HOP, dtype=np.int32)
+    hops[list(first)] = list(first.values())
+    return cost, hops
+
+
+def _init_worker(adjacency: list[list[int]], fees: list[float]):
+    """Receives the graph once per worker process."""
+    global _graph
+    _graph = (adjacency, fees)
+
+
+def _route_sources(sources: list[int]) -> tuple[list[int], np.ndarray, np.ndarray]:
+    """Runs Dijkstra from every source on the worker's graph."""
+    adjacency, fees = _graph
+    rows = [dijkstra(source, adjacency, fees) for source in sources]
+    return sources, np.stack([row[0] for row in rows]), np.stack([row[1] for row in rows])
+
+
+class RouteTable:
+    """Cost and first hop of the cheapest routes, searched per origin on demand."""
+
+    def __init__(
+        self,
+        cities: Mapping[str, City],
+        max_rows: int = ROW_CACHE_SIZE,
+    ):
+        """Reads the graph of cities; nothing is routed yet.
+
+        Args:
+            cities (Mapping[str, City]): The world.
+            max_rows (int): Origins whose routes are kept.
+        """
+        self.names, self._adjacency, self._fees = _adjacency(cities)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.max_rows = max_rows
+        # origin -> (costs, first hops, budget the search was stopped at)
+        self._rows: OrderedDict[int, tuple[dict, dict, float]] = OrderedDict()
+        self.searches = 0
+
+    @classmethod
+    def build(
+        cls, cities: Mapping[str, City], n_workers: int | None = None
+    ) -> "RouteTable":
+        """Routes every pair of cities up front.
+
+        Args:
+            cities (Mapping[str, City]): The world.
+            n_workers (int | None): Worker processes; defaults to the CPU
+                count for maps of at least PARALLEL_MIN_CITIES cities and to
+                routing in this process for smaller ones.
+
+        Returns:
+            RouteTable: The table, with the routes of every origin kept.
+
+        Raises:
+            ValueError: If the map has more than ALL_PAIRS_MAX_CITIES cities.
+        """
+        table = cls(cities, max_rows=max(len(cities), 1))
+        n = len(table.names)
+        if n > ALL_PAIRS_MAX_CITIES:
+            raise ValueError(
+                f"{n} cities are too many to route all pairs of "
+                f"(at most {ALL_PAIRS_MAX_CITIES}); route lazily instead."
+            )
+
+        if (n_workers is None and n < PARALLEL_MIN_CITIES) or n_workers == 1:
+            for source in range(n):
+                table._route(source, math.inf)
+            return table
+
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            initializer=_init_worker,
+            initargs=(table._adjacency, table._fees),
+        ) as pool:
+            n_chunks = (n_workers or os.cpu_count() or 1) * 4
+            chunks = [list(range(n))[i::n_chunks] for i in range(n_chunks)]
+            for sources, rows, hops in pool.map(_route_sources, [c for c in chunks if c]):
+                for source, row, hop in zip(sources, rows, hops, strict=True):
+                    reached = np.flatnonzero(np.isfinite(row)).tolist()
+                    hopped = np.flatnonzero(hop != NO_HOP).tolist()
+                    table._rows[source] = (
+                        dict(zip(reached, row[reached].tolist(), strict=True)),
+                        dict(zip(hopped, hop[hopped].tolist(), strict=True)),
+                        math.inf,
+                    )
+        return table
+
+    def _route(self, source: int, budget: float) -> tuple[dict, dict, float]:
+        """Returns the routes of source, searched again if budget goes further."""
+        row = self._rows.get(source)
+        if row is not None and row[2] >= budget:
+            self._rows.move_to_end(source)
+            return row
+        dist, first = _search(source, self._adjacency, self._fees, budget)
+        self.searches += 1
+        row = self._rows[source] = (dist, first, budget)
+        self._rows.move_to_end(source)
+        while len(self._rows) > self.max_rows:
+            self._rows.popitem(last=False)
+        return row
+
+    def _reached(self, origin: str, destination: str) -> tuple[dict, dict, int]:
+        """Returns the routes of origin that reach destination if anything does.
+
+        Kept routes are used if they reach it, e.g. after distance() with a
+        budget covering it; otherwise origin is searched without a budget.
+        """
+        source = self.index[origin]
+        target = self.index[destination]
+        row = self._rows.get(source)
+        if row is None or (target not in row[0] and row[2] < math.inf):
+            row = self._route(source, math.inf)
+        else:
+            self._rows.move_to_end(source)
+        return row[0], row[1], target
+
+    def distance(self, origin: str, destination: str, budget: float = math.inf) -> float:
+        """Returns the total fee of the cheapest route.
+
+        Args:
+            origin (str): Start city.
+            destination (str): End city.
+            budget (float): The search from origin may stop at this cost.
+
+        Returns:
+            float: The cost; inf if destination is unreachable or, with a
+                budget, costs more than it.
+        """
+        dist, _, _ = self._route(self.index[origin], budget)
+        cost = dist.get(self.index[destination], math.inf)
+        return cost if cost <= budget else math.inf
+
+    def next_hop(self, origin: str, destination: str) -> str | None:
+        """Returns the neighbor of origin to travel to, None if there is none."""
+        _, first, target = self._reached(origin, destination)
+        hop = first.get(target)
+        return None if hop is None else self.names[hop]
+
+    def path(self, origin: str, destination: str) -> list[str]:
+        """Returns the cities of the cheapest route after origin."""
+        path = []
+        city = origin
+        while (hop := self.next_hop(city, destination)) is not None:
+            path.append(hop)
+            city = hop
+        return path
+
+    def within(self, origin: str, budget: float) -> list[tuple[str, float]]:
+        """Returns the (city, cost) pairs reachable from origin within budget."""
+        dist, _, _ = self._route(self.index[origin], budget)
+        return [
+            (self.names[i], cost) for i, cost in sorted(dist.items()) if cost <= budget
+        ]
+
+
+class RouteCache:
+    """The RouteTable of the latest graph version."""
+
+    def __init__(self):
+        """Initializes an empty cache."""
+        self.version: int | None = None
+        self._table: RouteTable | None = None
+        self._cities: Mapping[str, City] | None = None
+        self.builds = 0
+
+    def table(self, cities: Mapping[str, City]) -> RouteTable:
+        """Returns the table of cities, a new one if their graph changed.
+
+        The followed dict gets its table right away, even if its fees were
+        changed in place since (call invalidate() after doing so); a new one
+        is hashed with graph_version(), an O(connections) pass.
+        """
+        if self._table is not None and cities is self._cities:
+            return self._table
+        version = graph_version(cities)
+        if self._table is None or version != self.version:
+            self._table = RouteTable(cities)
+            self.version = version
+            self.builds += 1
+        self._cities = cities
+        return self._table
+
+    def on_delta(self, delta):
+        """Drops the table if a market_diff.MarketDelta changed the graph.
+
+        Subscribe it to a MarketDiffStream and call adopt() with the new
+        cities, which are then not hashed again.
+        """
+        if delta.graph_changed:
+            self.invalidate()
+
+    def adopt(
+        self, cities: Mapping[str, City], previous: Mapping[str, City] | None = None
+    ):
+        """Follows cities without hashing them (see on_delta).
+
+        Args:
+            cities (Mapping[str, City]): The world the delta was diffed to.
+            previous (Mapping[str, City] | None): The world it was diffed
+                from; if the table was not of that one, cities is hashed on
+                the next table() call instead.
+        """
+        if self._table is not None and self._cities is previous:
+            self._cities = cities
+
+    def invalidate(self):
+        """Drops the table; required after changing fees or connections in place."""
+        self._table = None
+        self.version = None
+        self._cities = None
+
+
+ROUTES = RouteCache()
@@ -0,0 +1,232 @@
+"""Memory-mapped bank of pre-generated starting worlds for TradingEnv.
+
+A bank is a structured `.npy` array with one record per scenario (seed,
+start city, money, prices and quantities of every city) plus a small
+`.meta.json` file listing the city order. TradingEnv opens the array with
+`mmap_mode="r"`, so starting an episode only copies one record into the
+already loaded world instead of reading and parsing JSON.
+"""
+
+import json
+from argparse import ArgumentParser
+
+import numpy as np
+
+from nre_ai.mechanics import COMMODITIES, MAX_INVENTORY_QTY, MAX_PRICE
+from nre_ai.world_cache import load_world
+from nre_ai.worldgen import sale_multiplier
+
+DEFAULT_MONEY_RANGE = (500.0, 5000.0)
+
+
+def _meta_path(bank_path: str) -> str:
+    return bank_path + ".meta.json"
+
+
+def scenario_dtype(n_cities: int) -> np.dtype:
+    """Returns the record layout of a bank for a world with n_cities cities."""
+    return np.dtype(
+        [
+            ("seed", np.int64),
+            ("start_city", np.int32),
+            ("money", np.float64),
+            ("price", np.float64, (n_cities, len(COMMODITIES))),
+            ("quantity", np.float64, (n_cities, len(COMMODITIES))),
+        ]
+    )
+
+
+def _world_arrays(city_data_list: list[dict]) -> tuple[np.ndarray, np.ndarray]:
+    """Returns regular prices and quantities; NaN marks missing commodities."""
+    shape = (len(city_data_list), len(COMMODITIES))
+    regular_price = np.full(shape, np.nan)
+    regular_quantity = np.full(shape, np.nan)
+    for row, city_data in enumerate(city_data_list):
+        commodities = city_data.get("commodities") or {}
+        for col, item in enumerate(COMMODITIES):
+            details = commodities.get(item)
+            if not details:
+                continue
+            regular_price[row, col] = details.get("regular_price", details["price"])
+            regular_quantity[row, col] = details.get(
+                "regular_quantity", details["quantity"]
+            )
+    return regular_price, regular_quantity
+
+
+def build_scenario_bank(
+    world_path: str,
+    bank_path: str,
+    n_scenarios: int,
+    seed: int = 0,
+    money_range: tuple[float, float] = DEFAULT_MONEY_RANGE,
+) -> str:
+    """Pre-generates starting worlds for every episode of a training run.
+
+    Each scenario redraws every quantity around its regular value, prices the
+    commodity from its scarcity (see plan.md) and picks a connected start city
+    and starting money. Records are written straight into the memory-mapped
+    file, so the bank never has to fit in memory.
+
+    Args:
+        world_path (str): World JSON the scenarios are based on.
+        bank_path (str): Output `.npy` path.
+        n_scenarios (int): Number of scenarios.
+        seed (int): Seed; scenario i is generated from the seed sequence
+            (seed, i), whose first state word is stored as its seed.
+        money_range (tuple[float, float]): Range of the starting money.
+
+    Returns:
+        str: The bank path.
+
+    Raises:
+        ValueError: If n_scenarios is not positive or the world has no cities.
+    """
+    if n_scenarios <= 0:
+        raise ValueError("n_scenarios must be positive.")
+
+    city_data_list = load_world(world_path)["after"]
+    if not city_data_list:
+        raise ValueError(f"No cities found in {world_path}.")
+
+    names = [city_data["name"] for city_data in city_data_list]
+    start_cities = np.array(
+        [i for i, city_data in enumerate(city_data_list) if city_data["connections"]]
+    )
+    if not len(start_cities):
+        start_cities = np.arange(len(names))
+
+    regular_price, regular_quantity = _world_arrays(city_data_list)
+    missing = np.isnan(regular_price)
+    regular_price = np.nan_to_num(regular_price)
+    regular_quantity = np.nan_to_num(regular_quantity)
+
+    bank = np.lib.format.open_memmap(
+        bank_path, mode="w+", dtype=scenario_dtype(len(names)), shape=(n_scenarios,)
+    )
+    for index in range(n_scenarios):
+        seed_sequence = np.random.SeedSequence([seed, index])
+        rng = np.random.default_rng(seed_sequence)
+        quantity = np.floor(regular_quantity * rng.uniform(0.0, 2.0, missing.shape))
+        ratio = quantity / np.maximum(regular_quantity, 1)
+        price = np.round(regular_price * sale_multiplier(ratio, rng), 2)
+
+        record = bank[index]
+        record["seed"] = seed_sequence.generate_state(1)[0]
+        record["start_city"] = rng.choice(start_cities)
+        record["money"] = round(rng.uniform(*money_range), 2)
+        record["price"] = np.where(missing, np.nan, np.minimum(price, MAX_PRICE))
+        record["quantity"] = np.where(
+            missing, np.nan, np.minimum(quantity, MAX_INVENTORY_QTY)
+        )
+    bank.flush()
+    del bank
+
+    with open(_meta_path(bank_path), "w") as f:
+        json.dump(
+            {
+                "world": world_path,
+                "seed": seed,
+                "cities": names,
+                "commodities": COMMODITIES,
+            },
+            f,
+            ensure_ascii=False,
+        )
+    return bank_path
+
+
+class ScenarioBank:
+    """Read-only view of a scenario bank."""
+
+    def __init__(self, bank_path: str):
+        """Opens the bank.
+
+        Args:
+            bank_path (str): Path of the `.npy` file.
+
+        Raises:
+            ValueError: If the bank was built for a different commodity set.
+        """
+        self.bank_path = bank_path
+        with open(_meta_path(bank_path)) as f:
+            meta = json.load(f)
+
+        if meta["commodities"] != COMMODITIES:
+            raise ValueError(f"Scenario bank {bank_path} uses different commodities.")
+
+        self.city_names: list[str] = meta["cities"]
+        self.scenarios = np.load(bank_path, mmap_mode="r")
+
+    def __len__(self) -> int:
+        """Returns the number of scenarios."""
+        return len(self.scenarios)
+
+    def __getitem__(self, index: int) -> np.void:
+        """Returns the scenario record with the given index."""
+        return self.scenarios[index]
+
+    def row_order(self, city_data_list: list[dict]) -> list[int]:
+        """Maps the rows of city_data_list to the city rows of the bank.
+
+        Args:
+            city_data_list (list[dict]): City dictionaries of the target world.
+
+        Returns:
+            list[int]: Bank row of every city in city_data_list.
+
+        Raises:
+            ValueError: If the world and the bank contain different cities.
+        """
+        bank_rows = {name: row for row, name in enumerate(self.city_names)}
+        names = [city_data["name"] for city_data in city_data_list]
+        if len(names) != len(bank_rows) or any(name not in bank_rows for name in names):
+            raise ValueError(
+                f"Scenario bank {self.bank_path} was built for another world."
+            )
+        return [bank_rows[name] for name in names]
+
+    def apply(self, scenario: np.void, city_data_list: list[dict], rows: list[int]):
+        """Copies the prices and quantities of a scenario into city dictionaries.
+
+        Args:
+            scenario (np.void): A record of this bank.
+            city_data_list (list[dict]): City dictionaries to update in place.
+            rows (list[int]): Result of row_order for city_data_list.
+        """
+        prices = scenario["price"].tolist()
+        quantities = scenario["quantity"].tolist()
+        for city_data, row in zip(city_data_list, rows, strict=True):
+            commodities = city_data["commodities"]
+            for col, item in enumerate(COMMODITIES):
+                details = commodities.get(item)
+                if not details:
+                    continue
+                details["price"] = prices[row][col]
+                details["quantity"] = quantities[row][col]
+
+
+def main():
+    """Builds a scenario bank from the command line."""
+    parser = ArgumentParser(description="Pre-generate TradingEnv starting worlds.")
+    parser.add_argument("world", help="World JSON the scenarios are based on.")
+    parser.add_argument("output", help="Path of the .npy bank to write.")
+    parser.add_argument("-n", "--scenarios", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    parser.add_argument(
+        "--money",
+        type=float,
+        nargs=2,
+        default=DEFAULT_MONEY_RANGE,
+        metavar=("MIN", "MAX"),
+    )
+    args = parser.parse_args()
+
+    build_scenario_bank(
+        args.world, args.output, args.scenarios, seed=args.seed, money_range=args.money
+    )
+    print(f"Scenario bank with {args.scenarios} scenarios saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
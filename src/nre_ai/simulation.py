@@ -0,0 +1,91 @@
+"""Headless world for long simulations.
+
+The regular turn loop reloads the world file at the start of every turn and
+re-serializes every city with to_dict() before the economy update.
+ScratchWorld loads the world once, hands only the traded quantities back to
+the parsed data and writes the world file only when asked to (checkpoints and
+the end of the run).
+
+The world is not kept in memory across economy updates: nrecity's only
+economy update, CityProcessor.process_changes(), works on the JSON data and
+always saves it to the file of its JsonManager, and its City objects are
+only built from that data with get_dict_of_cities(). So every update still
+serializes the world to a scratch copy (on a RAM-backed filesystem when one
+exists) and rebuilds the cities afterwards.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from typing import Self
+
+from nrecity import City, CityProcessor, JsonManager
+
+from nre_ai.mechanics import sync_city_quantities
+
+# tmpfs on Linux, the scratch copy never touches the disk there
+RAM_SCRATCH_DIR = "/dev/shm"
+
+
+def default_scratch_dir() -> str | None:
+    """Returns the RAM-backed scratch directory, None for the system default."""
+    if os.path.isdir(RAM_SCRATCH_DIR) and os.access(RAM_SCRATCH_DIR, os.W_OK):
+        return RAM_SCRATCH_DIR
+    return None
+
+
+class ScratchWorld:
+    """A world played on a scratch copy and persisted only on demand."""
+
+    def __init__(self, path: str, scratch_dir: str | None = None):
+        """Loads the world.
+
+        Args:
+            path (str): World JSON; only written by checkpoint() and close().
+            scratch_dir (str | None): Directory of the scratch copy used by
+                CityProcessor. Defaults to default_scratch_dir().
+        """
+        self.path = path
+        self._tmp_dir = tempfile.TemporaryDirectory(
+            prefix="nre_world_", dir=scratch_dir or default_scratch_dir()
+        )
+        self.scratch_path = os.path.join(self._tmp_dir.name, os.path.basename(path))
+        shutil.copy2(path, self.scratch_path)
+
+        self.json_manager = JsonManager(self.scratch_path)
+        self.processor = CityProcessor(self.json_manager)
+        self.cities: dict[str, City] = self.processor.get_dict_of_cities("after")
+        self.updates_since_checkpoint = 0
+
+    def update_economy(self):
+        """Applies the bots' trades and runs one economy update.
+
+        nrecity saves the scratch copy and the cities are rebuilt from it.
+        """
+        sync_city_quantities(self.cities, self.json_manager.data["after"])
+        self.processor.process_changes()
+        self.cities = self.processor.get_dict_of_cities("after")
+        self.updates_since_checkpoint += 1
+
+    def checkpoint(self) -> str:
+        """Atomically writes the current world to its file and returns the path."""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.json_manager.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+        self.updates_since_checkpoint = 0
+        return self.path
+
+    def close(self):
+        """Persists the world and removes the scratch copy."""
+        self.checkpoint()
+        self._tmp_dir.cleanup()
+
+    def __enter__(self) -> Self:
+        """Returns the world."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Persists the world and removes the scratch copy."""
+        self.close()
@@ -0,0 +1,325 @@
+"""Local hyperparameter sweep for PPO on TradingEnv with successive halving.
+
+Trials sample ent_coef, learning_rate, n_steps and the environment's
+max_local_actions. Every rung trains the surviving trials up to the rung's
+timestep budget in a process pool (one worker per CPU core, pinned to it),
+evaluates them and keeps the best 1/eta for the next rung, whose budget is
+eta times larger. Trials continue from the model saved by the previous rung.
+Results of every evaluation are appended to a CSV table.
+"""
+
+import csv
+import multiprocessing
+import os
+import shutil
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import torch as th
+from stable_baselines3 import PPO
+
+from nre_ai.mechanics import calculate_net_worth
+from nre_ai.trading_env import TradingEnv
+
+N_STEPS_CHOICES = (512, 1024, 2048, 4096)
+MAX_LOCAL_ACTIONS_CHOICES = (1, 2, 4, 8)
+ENT_COEF_RANGE = (1e-4, 1e-1)
+LEARNING_RATE_RANGE = (1e-5, 1e-3)
+RESULT_FIELDS = [
+    "trial",
+    "rung",
+    "timesteps",
+    "ent_coef",
+    "learning_rate",
+    "n_steps",
+    "max_local_actions",
+    "mean_reward",
+    "mean_net_worth",
+    "status",
+]
+
+
+def _log_uniform(rng: np.random.Generator, low: float, high: float) -> float:
+    return float(np.exp(rng.uniform(np.log(low), np.log(high))))
+
+
+def sample_params(rng: np.random.Generator) -> dict:
+    """Draws one trial configuration."""
+    return {
+        "ent_coef": _log_uniform(rng, *ENT_COEF_RANGE),
+        "learning_rate": _log_uniform(rng, *LEARNING_RATE_RANGE),
+        "n_steps": int(rng.choice(N_STEPS_CHOICES)),
+        "max_local_actions": int(rng.choice(MAX_LOCAL_ACTIONS_CHOICES)),
+    }
+
+
+def select_survivors(scores: dict[int, float], eta: int) -> list[int]:
+    """Returns the best len(scores) // eta trials (at least one), best first.
+
+    Args:
+        scores (dict[int, float]): Evaluation score of every trial.
+        eta (int): Reduction factor of successive halving.
+    """
+    ranked = sorted(scores, key=lambda trial: scores[trial], reverse=True)
+    return ranked[: max(len(ranked) // eta, 1)]
+
+
+def _worker_cores(n_workers: int) -> multiprocessing.Queue:
+    """Returns a queue holding one CPU core for every worker."""
+    if hasattr(os, "sched_getaffinity"):
+        available = sorted(os.sched_getaffinity(0))
+    else:
+        available = list(range(os.cpu_count() or 1))
+    cores = multiprocessing.Queue()
+    for i in range(n_workers):
+        cores.put(available[i % len(available)])
+    return cores
+
+
+def _pin_worker(cores: multiprocessing.Queue):
+    """Pins the worker process to one core taken from the cores queue."""
+    core = cores.get()
+    # CPU affinity is only available on Linux
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {core})
+    # One process per core, so keep torch from spawning extra threads
+    th.set_num_threads(1)
+
+
+def _trial_dir(directory: str, trial: int) -> str:
+    return os.path.join(directory, f"trial_{trial:03d}")
+
+
+def _make_env(world_path: str, trial_dir: str, name: str, max_local_actions: int):
+    """Creates a TradingEnv on a private copy of the world."""
+    private_path = os.path.join(trial_dir, f"{name}.json")
+    if not os.path.exists(private_path):
+        shutil.copy2(world_path, private_path)
+    env = TradingEnv(private_path)
+    env.max_local_actions = max_local_actions
+    return env
+
+
+def evaluate(model: PPO, env: TradingEnv, episodes: int, max_steps: int) -> tuple:
+    """Runs deterministic episodes and returns (mean reward, mean net worth)."""
+    env.max_steps = max_steps
+    rewards, net_worths = [], []
+    for episode in range(episodes):
+        obs, _ = env.reset(seed=episode)
+        total_reward = 0.0
+        done = False
+        while not done:
+            action, _ = model.predict(obs, deterministic=True)
+            obs, reward, terminated, truncated, _ = env.step(action)
+            total_reward += reward
+            done = terminated or truncated
+        rewards.append(total_reward)
+        net_worths.append(calculate_net_worth(env.agent, env.cities))
+    return float(np.mean(rewards)), float(np.mean(net_worths))
+
+
+def run_trial(
+    trial: int,
+    params: dict,
+    timesteps: int,
+    world_path: str,
+    directory: str,
+    eval_episodes: int,
+    eval_max_steps: int,
+    seed: int,
+) -> dict:
+    """Trains a trial up to timesteps and evaluates it.
+
+    The trial keeps its model and world copies in its own subdirectory, so a
+    later rung continues where this one stopped.
+
+    Returns:
+        dict: A row of the results table (without status).
+    """
+    trial_dir = _trial_dir(directory, trial)
+    os.makedirs(trial_dir, exist_ok=True)
+    model_path = os.path.join(trial_dir, "model")
+    max_local_actions = params["max_local_actions"]
+    env = _make_env(world_path, trial_dir, "train_world", max_local_actions)
+
+    if os.path.exists(model_path + ".zip"):
+        model = PPO.load(model_path, env=env)
+    else:
+        model = PPO(
+            "MlpPolicy",
+            env,
+            ent_coef=params["ent_coef"],
+            learning_rate=params["learning_rate"],
+            n_steps=params["n_steps"],
+            seed=seed + trial,
+            verbose=0,
+        )
+    remaining = timesteps - model.num_timesteps
+    if remaining > 0:
+        model.learn(total_timesteps=remaining, reset_num_timesteps=False)
+        model.save(model_path)
+
+    eval_env = _make_env(world_path, trial_dir, "eval_world", max_local_actions)
+    mean_reward, mean_net_worth = evaluate(model, eval_env, eval_episodes, eval_max_steps)
+    return {
+        "trial": trial,
+        "timesteps": model.num_timesteps,
+        **params,
+        "mean_reward": mean_reward,
+        "mean_net_worth": mean_net_worth,
+    }
+
+
+def run_sweep(
+    world_path: str,
+    directory: str,
+    n_trials: int = 27,
+    min_timesteps: int = 20000,
+    eta: int = 3,
+    n_workers: int | None = None,
+    eval_episodes: int = 5,
+    eval_max_steps: int = 1000,
+    seed: int = 0,
+) -> list[dict]:
+    """Runs a successive-halving sweep.
+
+    Args:
+        world_path (str): World JSON used for training and evaluation.
+        directory (str): Output directory of trial models and results.csv.
+        n_trials (int): Trials of the first rung.
+        min_timesteps (int): Timestep budget of the first rung.
+        eta (int): Reduction factor; each rung keeps 1/eta of the trials and
+            multiplies the budget by eta.
+        n_workers (int | None): Worker processes; defaults to the CPU count.
+        eval_episodes (int): Evaluation episodes after every rung.
+        eval_max_steps (int): Step limit of an evaluation episode.
+        seed (int): Seed of the parameter sampling and the models.
+
+    Returns:
+        list[dict]: Rows of the results table.
+
+    Raises:
+        ValueError: If n_trials or eta is too small.
+    """
+    if n_trials < 1:
+        raise ValueError("n_trials must be positive.")
+    if eta < 2:
+        raise ValueError("eta must be at least 2.")
+
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    params = {trial: sample_params(rng) for trial in range(n_trials)}
+    # Trials continue from saved models, so drop those of an older sweep
+    for trial in params:
+        shutil.rmtree(_trial_dir(directory, trial), ignore_errors=True)
+    n_workers = n_workers or os.cpu_count() or 1
+
+    results_path = os.path.join(directory, "results.csv")
+    rows = []
+    with open(results_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+
+    alive = list(params)
+    rung = 0
+    timesteps = min_timesteps
+    cores = _worker_cores(n_workers)
+    with ProcessPoolExecutor(
+        max_workers=n_workers, initializer=_pin_worker, initargs=(cores,)
+    ) as pool:
+        while True:
+            futures = {
+                trial: pool.submit(
+                    run_trial,
+                    trial,
+                    params[trial],
+                    timesteps,
+                    world_path,
+                    directory,
+                    eval_episodes,
+                    eval_max_steps,
+                    seed,
+                )
+                for trial in alive
+            }
+            rung_rows = {trial: future.result() for trial, future in futures.items()}
+
+            last_rung = len(alive) == 1
+            survivors = select_survivors(
+                {trial: row["mean_net_worth"] for trial, row in rung_rows.items()}, eta
+            )
+            with open(results_path, "a", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+                for trial, row in rung_rows.items():
+                    if last_rung:
+                        status = "best"
+                    else:
+                        status = "promoted" if trial in survivors else "stopped"
+                    row = {**row, "rung": rung, "status": status}
+                    writer.writerow(row)
+                    rows.append(row)
+
+            if last_rung:
+                return rows
+            alive = survivors
+            rung += 1
+            timesteps *= eta
+
+
+def print_results(rows: list[dict]):
+    """Prints the final evaluation of every trial, best first."""
+    final = {}
+    for row in rows:
+        final[row["trial"]] = row
+    print(
+        f"{'trial':>5} {'rung':>4} {'steps':>8} {'ent_coef':>9} {'lr':>9} "
+        f"{'n_steps':>7} {'local':>5} {'reward':>9} {'net worth':>11} status"
+    )
+    for row in sorted(final.values(), key=lambda r: (-r["rung"], -r["mean_net_worth"])):
+        print(
+            f"{row['trial']:>5} {row['rung']:>4} {row['timesteps']:>8} "
+            f"{row['ent_coef']:>9.2e} {row['learning_rate']:>9.2e} "
+            f"{row['n_steps']:>7} {row['max_local_actions']:>5} "
+            f"{row['mean_reward']:>9.3f} {row['mean_net_worth']:>11.2f} {row['status']}"
+        )
+
+
+def main():
+    """Runs a sweep from the command line."""
+    parser = ArgumentParser(description="Successive-halving PPO hyperparameter sweep.")
+    parser.add_argument("world", help="World JSON to train on (copied per trial).")
+    parser.add_argument("--output", default="sweeps/latest", help="Output directory.")
+    parser.add_argument("--trials", type=int, default=27)
+    parser.add_argument(
+        "--min-timesteps",
+        type=int,
+        default=20000,
+        help="Timesteps of the first rung.",
+    )
+    parser.add_argument("--eta", type=int, default=3, help="Reduction factor.")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Worker processes (default: CPUs)."
+    )
+    parser.add_argument("--eval-episodes", type=int, default=5)
+    parser.add_argument("--eval-max-steps", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    args = parser.parse_args()
+
+    rows = run_sweep(
+        args.world,
+        args.output,
+        n_trials=args.trials,
+        min_timesteps=args.min_timesteps,
+        eta=args.eta,
+        n_workers=args.workers,
+        eval_episodes=args.eval_episodes,
+        eval_max_steps=args.eval_max_steps,
+        seed=args.seed,
+    )
+    print_results(rows)
+    print(f"Results saved to {os.path.join(args.output, 'results.csv')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,7 +14,11 @@ from nre_ai.mechanics import (
     execute_action,
     get_observation,
     sanitize_city_data,
+    sync_city_quantities,
+    traded_commodities,
 )
+from nre_ai.metrics import BANKRUPTCIES, ECONOMY_UPDATES
+from nre_ai.scenario_bank import ScenarioBank
 
 # Constants
 NUM_COMMODITIES = len(COMMODITIES)
@@ -25,13 +29,30 @@ class TradingEnv(gym.Env):
 
     metadata = {"render_modes": ["human"], "render_fps": 30}
 
-    def __init__(self, cities_json_path: str):
+    def __init__(self, cities_json_path: str, scenario_bank_path: str | None = None):
+        """Initializes the environment.
+
+        Args:
+            cities_json_path (str): The world file used by the environment.
+            scenario_bank_path (str | None): Optional scenario bank built for
+                the same world (see nre_ai.scenario_bank). If given, every
+                reset starts from a randomly sampled scenario.
+        """
         super().__init__()
 
         self.cities_json_path = cities_json_path
         self.json_manager = JsonManager(cities_json_path)
         self.city_processor = CityProcessor(self.json_manager)
 
+        self.scenario_bank: ScenarioBank | None = None
+        self._scenario_rows: dict[str, list[int]] = {}
+        if scenario_bank_path is not None:
+            self.scenario_bank = ScenarioBank(scenario_bank_path)
+            for key in ("cities", "after"):
+                self._scenario_rows[key] = self.scenario_bank.row_order(
+                    self.json_manager.data[key]
+                )
+
         # Initialize state
         self.cities: dict[str, City] = {}
         self.agent: AIAgent | None = None
@@ -43,6 +64,10 @@ class TradingEnv(gym.Env):
         self.steps_since_last_update = 0
         self.max_local_actions = 4  # Allow 4 buys/sells before forced update
 
+        # (row in "after", commodity) cells traded since the last economy update
+        self._dirty: set[tuple[int, str]] = set()
+        self._rows: dict[str, int] = {}
+
         # Define Action Space
         # 0-4: Buy
         # 5-9: Sell
@@ -58,6 +83,9 @@ class TradingEnv(gym.Env):
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
 
+        if self.scenario_bank is not None:
+            return self._reset_from_scenario()
+
         # Sanitize data before processing to catch any lingering overflows
         if "after" in self.json_manager.data:
             sanitize_city_data(self.json_manager.data["after"])
@@ -65,7 +93,7 @@ class TradingEnv(gym.Env):
             sanitize_city_data(self.json_manager.data["cities"])
 
         self.city_processor.process_changes()
-        self.cities = self.city_processor.get_dict_of_cities("after")
+        self._load_cities()
         self.city_names = list(self.cities.keys())
 
         start_city = self.city_names[0] if self.city_names else "Stolica"
@@ -73,10 +101,35 @@ class TradingEnv(gym.Env):
 
         self.current_step = 0
         self.steps_since_last_update = 0
+        self._dirty.clear()
         self.prev_net_worth = 1000.0
 
         return get_observation(self.agent, self.cities), {}
 
+    def _reset_from_scenario(self):
+        """Starts an episode from a scenario sampled from the bank."""
+        index = int(self.np_random.integers(len(self.scenario_bank)))
+        scenario = self.scenario_bank[index]
+
+        # Both snapshots start equal, so the first economy update sees no changes
+        for key, rows in self._scenario_rows.items():
+            self.scenario_bank.apply(scenario, self.json_manager.data[key], rows)
+
+        self._load_cities()
+        self.city_names = list(self.cities.keys())
+
+        start_city = self.scenario_bank.city_names[int(scenario["start_city"])]
+        money = float(scenario["money"])
+        self.agent = AIAgent(name="TrainingBot", money=money, initial_city=start_city)
+
+        self.current_step = 0
+        self.steps_since_last_update = 0
+        self._dirty.clear()
+        self.prev_net_worth = money
+
+        info = {"scenario": index, "scenario_seed": int(scenario["seed"])}
+        return get_observation(self.agent, self.cities), info
+
     def step(self, action):
         self.current_step += 1
         self.steps_since_last_update += 1
@@ -87,19 +140,17 @@ class TradingEnv(gym.Env):
         info = {}
 
         # --- 1. Execute Action ---
+        row = self._row(self.agent.current_city_name)
+        if row is not None:
+            self._dirty.update(
+                (row, item) for item in traded_commodities(action, self.agent)
+            )
         is_travel_action = execute_action(action, self.agent, self.cities)
 
         # --- 2. Conditional Economy Update ---
         # Update ONLY if we traveled OR if we hit the limit of local actions
         if is_travel_action or self.steps_since_last_update >= self.max_local_actions:
-            self._sync_agent_changes_to_json_manager()
-
-            # Sanitize the data in json_manager to prevent overflows in the submodule
-            if "after" in self.json_manager.data:
-                sanitize_city_data(self.json_manager.data["after"])
-
-            self.city_processor.process_changes()
-            self.cities = self.city_processor.get_dict_of_cities("after")
+            self._update_economy()
             self.steps_since_last_update = 0  # Reset counter
 
         # --- 3. Calculate Reward ---
@@ -122,6 +173,7 @@ class TradingEnv(gym.Env):
         if self.agent.money <= 0:
             terminated = True
             reward -= 10.0  # Bankruptcy
+            BANKRUPTCIES.inc()
 
         # Stuck check
         min_fee = float("inf")
@@ -146,28 +198,41 @@ class TradingEnv(gym.Env):
             info,
         )
 
+    def _update_economy(self):
+        """Hands the traded cells to the economy update and rebuilds the cities.
+
+        Only the traded quantities are synced. The whole "after" section is
+        clamped, since nrecity does not report which cells its economy
+        update wrote.
+        """
+        self._sync_agent_changes_to_json_manager()
+        self._dirty.clear()
+
+        # Sanitize the data in json_manager to prevent overflows in the submodule
+        if "after" in self.json_manager.data:
+            sanitize_city_data(self.json_manager.data["after"])
+
+        self.city_processor.process_changes()
+        ECONOMY_UPDATES.inc()
+        self._load_cities()
+
+    def _load_cities(self):
+        """Builds the cities of "after"."""
+        self.cities = self.city_processor.get_dict_of_cities("after")
+
     def _sync_agent_changes_to_json_manager(self):
         """Syncs the current state of self.cities back to the json_manager's data."""
         # The CityProcessor reads from self.json_manager.data["after"] (by default)
-        # We need to update that list of dicts with the current values from self.cities
-
-        target_list = self.json_manager.data.get("after", [])
-        city_map = {c["name"]: c for c in target_list}
-
-        for city_name, city_obj in self.cities.items():
-            if city_name in city_map:
-                city_dict = city_map[city_name]
-                # Update commodities
-                for item, details in city_obj.commodities.items():
-                    # Check if details is None (which can happen based on City definition)
-                    if details is None:
-                        continue
-
-                    if item in city_dict["commodities"]:
-                        target_details = city_dict["commodities"][item]
-                        # Check if target_details is None
-                        if target_details is None:
-                            continue
-
-                        # Only update quantity as that's what the agent changes
-                        target_details["quantity"] = details["quantity"]
+        sync_city_quantities(
+            self.cities, self.json_manager.data.get("after", []), self._dirty
+        )
+
+    def _row(self, city_name: str) -> int | None:
+        """Returns the index of a city in the "after" data."""
+        after = self.json_manager.data.get("after", [])
+        row = self._rows.get(city_name)
+        if row is None or row >= len(after) or after[row]["name"] != city_name:
+            # The list was replaced (reset, economy update), map it again
+            self._rows = {city_data["name"]: i for i, city_data in enumerate(after)}
+            row = self._rows.get(city_name)
+        return row
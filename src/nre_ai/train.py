@@ -1,11 +1,24 @@
 """Training script for the trading bot using PPO."""
 
+import glob
+import math
 import os
+import pickle
+import random
+import re
 import shutil
+import time
+from argparse import ArgumentParser
 
+import numpy as np
+import torch as th
 from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import BaseCallback
 from stable_baselines3.common.env_checker import check_env
+from stable_baselines3.common.monitor import Monitor
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecEnv
 
+from nre_ai.imitation import collect_demonstrations, pretrain_policy
 from nre_ai.trading_env import TradingEnv
 
 # Paths
@@ -25,30 +38,231 @@ DEST_DATA_PATH = os.path.join(DEST_DIR, "training_cities.json")
 MODELS_DIR = "models"
 MODEL_NAME = "trading_bot_v1"
 LOG_DIR = "logs"
+CHECKPOINTS_DIR = os.path.join(MODELS_DIR, "checkpoints")
+DEMONSTRATIONS_DIR = os.path.join(DEST_DIR, "demonstrations")
+RNG_STATE_SUFFIX = "_rng.pkl"
 
 
-def setup_fresh_data():
-    """Copies the source data to a working directory to ensure a fresh start."""
+def worker_data_path(rank: int) -> str:
+    """Returns the private world file of the environment worker with rank."""
+    if rank == 0:
+        return DEST_DATA_PATH
+    root, ext = os.path.splitext(DEST_DATA_PATH)
+    return f"{root}_{rank}{ext}"
+
+
+def setup_fresh_data(dest_path: str = DEST_DATA_PATH):
+    """Copies the source data to a working directory to ensure a fresh start.
+
+    Args:
+        dest_path (str): Where to put the copy.
+    """
     # Ensure source exists
     if not os.path.exists(SOURCE_DATA_PATH):
         raise FileNotFoundError(f"Source data file not found at {SOURCE_DATA_PATH}")
 
     # Ensure destination directory exists
-    if not os.path.exists(DEST_DIR):
-        os.makedirs(DEST_DIR)
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
 
     # Remove old destination file if it exists
-    if os.path.exists(DEST_DATA_PATH):
-        os.remove(DEST_DATA_PATH)
-        print(f"Removed old training data at {DEST_DATA_PATH}")
+    if os.path.exists(dest_path):
+        os.remove(dest_path)
+        print(f"Removed old training data at {dest_path}")
 
     # Copy source to destination
-    shutil.copy2(SOURCE_DATA_PATH, DEST_DATA_PATH)
-    print(f"Copied fresh data from {SOURCE_DATA_PATH} to {DEST_DATA_PATH}")
+    shutil.copy2(SOURCE_DATA_PATH, dest_path)
+    print(f"Copied fresh data from {SOURCE_DATA_PATH} to {dest_path}")
+
+
+def make_env(rank: int):
+    """Returns a factory of the environment of worker rank.
+
+    The factory runs inside the worker process, so every worker copies the
+    source world to its own file; economy updates write that file back and
+    must never race with another worker.
+    """
+
+    def _init():
+        data_path = worker_data_path(rank)
+        setup_fresh_data(data_path)
+        return Monitor(TradingEnv(cities_json_path=data_path))
+
+    return _init
+
+
+def make_vec_env(n_envs: int, seed: int | None = None) -> VecEnv:
+    """Creates n_envs environments, one subprocess each if n_envs > 1."""
+    env_fns = [make_env(rank) for rank in range(n_envs)]
+    vec_env = SubprocVecEnv(env_fns) if n_envs > 1 else DummyVecEnv(env_fns)
+    if seed is not None:
+        vec_env.seed(seed)
+    return vec_env
+
+
+def save_rng_state(path: str):
+    """Saves the python, numpy and torch RNG states to path."""
+    state = {
+        "python": random.getstate(),
+        "numpy": np.random.get_state(),
+        "torch": th.get_rng_state(),
+    }
+    with open(path, "wb") as f:
+        pickle.dump(state, f)
+
+
+def load_rng_state(path: str):
+    """Restores RNG states saved by save_rng_state."""
+    with open(path, "rb") as f:
+        state = pickle.load(f)
+    random.setstate(state["python"])
+    np.random.set_state(state["numpy"])
+    th.set_rng_state(state["torch"])
+
+
+class ResumableCheckpointCallback(BaseCallback):
+    """Periodically saves the model (with its optimizer) and the RNG state."""
+
+    def __init__(self, save_freq: int, directory: str, name_prefix: str):
+        """Initializes the callback.
+
+        Args:
+            save_freq (int): Timesteps between checkpoints, counted over all
+                environments.
+            directory (str): Checkpoint directory.
+            name_prefix (str): Prefix of the checkpoint files.
+        """
+        super().__init__()
+        self.save_freq = save_freq
+        self.directory = directory
+        self.name_prefix = name_prefix
+        self._last_save = 0
+
+    def _on_training_start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._last_save = self.num_timesteps
+
+    def _on_step(self) -> bool:
+        if self.num_timesteps - self._last_save >= self.save_freq:
+            self.save()
+        return True
+
+    def _on_training_end(self):
+        # A finished run can be extended by resuming with more timesteps
+        if self.num_timesteps > self._last_save:
+            self.save()
+
+    def save(self) -> str:
+        """Writes a checkpoint for the current timestep and returns its path."""
+        path = os.path.join(self.directory, f"{self.name_prefix}_{self.num_timesteps}")
+        self.model.save(path)
+        save_rng_state(path + RNG_STATE_SUFFIX)
+        self._last_save = self.num_timesteps
+        if self.verbose:
+            print(f"Saved checkpoint {path}.zip")
+        return path
+
 
+def latest_checkpoint(directory: str, name_prefix: str) -> str | None:
+    """Returns the checkpoint with the most timesteps, without `.zip`.
+
+    Args:
+        directory (str): Checkpoint directory.
+        name_prefix (str): Prefix of the checkpoint files.
+
+    Returns:
+        str | None: The checkpoint path, None if there is no checkpoint.
+    """
+    pattern = re.compile(rf"{re.escape(name_prefix)}_(\d+)\.zip$")
+    best_path, best_steps = None, -1
+    for path in glob.glob(os.path.join(glob.escape(directory), f"{name_prefix}_*.zip")):
+        match = pattern.search(os.path.basename(path))
+        if match and int(match.group(1)) > best_steps:
+            best_path, best_steps = path[: -len(".zip")], int(match.group(1))
+    return best_path
+
+
+def warm_start(
+    model: PPO,
+    episodes: int,
+    epochs: int = 5,
+    world_paths: list[str] | None = None,
+    scenario_bank_path: str | None = None,
+    n_workers: int | None = None,
+):
+    """Pretrains the policy of model on episodes of the rule-based AIAgent.
+
+    The episodes are split evenly over the worlds and recorded in a process
+    pool. With fewer worlds than workers the worlds are repeated (each episode
+    has its own seed), so every worker records a share.
+
+    Args:
+        model (PPO): The freshly initialized model.
+        episodes (int): Expert episodes to record in total.
+        epochs (int): Behavior-cloning epochs.
+        world_paths (list[str] | None): Worlds to record on, e.g. generated by
+            nre_ai.worldgen; defaults to the training world.
+        scenario_bank_path (str | None): Scenario bank built for the worlds.
+        n_workers (int | None): Worker processes; defaults to the CPU count.
+    """
+    # Start from an empty dataset, the writer would append to an old one
+    if os.path.exists(DEMONSTRATIONS_DIR):
+        shutil.rmtree(DEMONSTRATIONS_DIR)
+
+    worlds = list(world_paths or [SOURCE_DATA_PATH])
+    n_workers = n_workers or os.cpu_count() or 1
+    n_tasks = max(len(worlds), min(n_workers, episodes))
+    worlds = [worlds[i % len(worlds)] for i in range(n_tasks)]
+
+    n_transitions = collect_demonstrations(
+        worlds,
+        DEMONSTRATIONS_DIR,
+        episodes_per_world=max(math.ceil(episodes / n_tasks), 1),
+        n_workers=n_workers,
+        scenario_bank_path=scenario_bank_path,
+    )
+    print(f"Recorded {n_transitions} expert transitions on {len(worlds)} worlds.")
+
+    losses = pretrain_policy(model, DEMONSTRATIONS_DIR, epochs=epochs)
+    print(f"Behavior cloning finished, final loss: {losses[-1]:.4f}")
+
+
+def train(
+    total_timesteps: int = 300000,
+    bc_episodes: int = 0,
+    bc_epochs: int = 5,
+    n_envs: int = 1,
+    checkpoint_freq: int = 50000,
+    resume: bool = False,
+    model_name: str = MODEL_NAME,
+    seed: int | None = None,
+    bc_worlds: list[str] | None = None,
+    bc_scenario_bank: str | None = None,
+    bc_workers: int | None = None,
+):
+    """Trains the PPO agent.
+
+    Args:
+        total_timesteps (int): RL training steps, including the steps of a
+            resumed checkpoint.
+        bc_episodes (int): Expert episodes used to warm start the policy by
+            behavior cloning; 0 disables the warm start.
+        bc_epochs (int): Behavior-cloning epochs.
+        n_envs (int): Parallel environments, each in its own process.
+        checkpoint_freq (int): Timesteps between checkpoints; 0 disables them.
+        resume (bool): Continue from the latest checkpoint of model_name.
+        model_name (str): Name of the saved model and its checkpoints.
+        seed (int | None): Random seed of the model and the environments.
+        bc_worlds (list[str] | None): Worlds of the warm start episodes;
+            defaults to the training world.
+        bc_scenario_bank (str | None): Scenario bank of the warm start worlds.
+        bc_workers (int | None): Processes recording the warm start episodes;
+            defaults to the CPU count.
+    """
+    checkpoint_dir = os.path.join(CHECKPOINTS_DIR, model_name)
+    checkpoint = latest_checkpoint(checkpoint_dir, model_name) if resume else None
+    if resume and checkpoint is None:
+        print(f"No checkpoint found in {checkpoint_dir}, starting a new run.")
 
-def train():
-    """Trains the PPO agent."""
     # 0. Setup Fresh Data
     try:
         setup_fresh_data()
@@ -56,34 +270,150 @@ def train():
         print(f"Error during setup: {e}")
         return
 
-    # 1. Create Environment
-    # Use the fresh copy at DEST_DATA_PATH
-    env = TradingEnv(cities_json_path=DEST_DATA_PATH)
-
     # Validate Environment
-    check_env(env)
+    check_env(TradingEnv(cities_json_path=DEST_DATA_PATH))
     print("Environment check passed.")
 
+    # 1. Create Environment
+    # Every worker gets its own copy of the world
+    env = make_vec_env(n_envs, seed)
+
     # 2. Initialize Model
-    # MlpPolicy is suitable for vector observations.
-    # Added ent_coef to encourage exploration
-    model = PPO("MlpPolicy", env, verbose=1, tensorboard_log=LOG_DIR, ent_coef=0.01)
+    if checkpoint is not None:
+        # The saved policy includes the optimizer state
+        model = PPO.load(checkpoint, env=env, tensorboard_log=LOG_DIR)
+        rng_path = checkpoint + RNG_STATE_SUFFIX
+        if os.path.exists(rng_path):
+            load_rng_state(rng_path)
+        print(f"Resumed from {checkpoint}.zip at {model.num_timesteps} timesteps.")
+    else:
+        # MlpPolicy is suitable for vector observations.
+        # Added ent_coef to encourage exploration
+        model = PPO(
+            "MlpPolicy",
+            env,
+            verbose=1,
+            tensorboard_log=LOG_DIR,
+            ent_coef=0.01,
+            seed=seed,
+        )
+
+        # 3. Warm start from the rule-based bot
+        if bc_episodes > 0:
+            warm_start(
+                model,
+                bc_episodes,
+                epochs=bc_epochs,
+                world_paths=bc_worlds,
+                scenario_bank_path=bc_scenario_bank,
+                n_workers=bc_workers,
+            )
+
+    # 4. Train
+    callback = None
+    if checkpoint_freq > 0:
+        callback = ResumableCheckpointCallback(
+            checkpoint_freq, checkpoint_dir, model_name
+        )
 
-    # 3. Train
+    start_timesteps = model.num_timesteps
+    remaining = max(total_timesteps - start_timesteps, 0)
     print("Starting training...")
-    # Increased timesteps to allow for better convergence
-    model.learn(total_timesteps=300000)
+    start = time.perf_counter()
+    model.learn(
+        total_timesteps=remaining,
+        callback=callback,
+        reset_num_timesteps=checkpoint is None,
+        tb_log_name=model_name,
+    )
+    elapsed = time.perf_counter() - start
     print("Training finished.")
+    env.close()
 
-    # 4. Save Model
+    steps = model.num_timesteps - start_timesteps
+    print(
+        f"Throughput: {steps} steps in {elapsed:.1f}s "
+        f"({steps / max(elapsed, 1e-9):.0f} steps/s with {n_envs} envs)"
+    )
+
+    # 5. Save Model
     # Ensure models directory exists
     if not os.path.exists(MODELS_DIR):
         os.makedirs(MODELS_DIR)
 
-    save_path = os.path.join(MODELS_DIR, MODEL_NAME)
+    save_path = os.path.join(MODELS_DIR, model_name)
     model.save(save_path)
     print(f"Model saved to {save_path}.zip")
 
 
+def main():
+    """Parses the command line and starts training."""
+    parser = ArgumentParser(description="Train the PPO trading bot.")
+    parser.add_argument("--timesteps", type=int, default=300000)
+    parser.add_argument(
+        "--n-envs",
+        type=int,
+        default=1,
+        help="Parallel environments, each in its own process with its own world.",
+    )
+    parser.add_argument(
+        "--checkpoint-freq",
+        type=int,
+        default=50000,
+        help="Timesteps between checkpoints (0 disables them).",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue from the latest checkpoint of the model.",
+    )
+    parser.add_argument("--model-name", default=MODEL_NAME)
+    parser.add_argument("--seed", type=int, default=None, help="Random seed.")
+    parser.add_argument(
+        "--bc-episodes",
+        type=int,
+        default=0,
+        help="Rule-based bot episodes for a behavior-cloning warm start.",
+    )
+    parser.add_argument("--bc-epochs", type=int, default=5)
+    parser.add_argument(
+        "--bc-worlds",
+        nargs="+",
+        default=None,
+        help="World files of the warm start episodes (default: the training world).",
+    )
+    parser.add_argument(
+        "--bc-scenario-bank",
+        default=None,
+        help="Scenario bank of the warm start worlds.",
+    )
+    parser.add_argument(
+        "--bc-workers",
+        type=int,
+        default=None,
+        help="Processes recording the warm start episodes (default: CPU count).",
+    )
+    args = parser.parse_args()
+
+    if args.n_envs < 1:
+        parser.error("--n-envs must be at least 1")
+    if args.bc_workers is not None and args.bc_workers < 1:
+        parser.error("--bc-workers must be at least 1")
+
+    train(
+        total_timesteps=args.timesteps,
+        bc_episodes=args.bc_episodes,
+        bc_epochs=args.bc_epochs,
+        n_envs=args.n_envs,
+        checkpoint_freq=args.checkpoint_freq,
+        resume=args.resume,
+        model_name=args.model_name,
+        seed=args.seed,
+        bc_worlds=args.bc_worlds,
+        bc_scenario_bank=args.bc_scenario_bank,
+        bc_workers=args.bc_workers,
+    )
+
+
 if __name__ == "__main__":
-    train()
+    main()
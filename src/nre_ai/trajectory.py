@@ -0,0 +1,343 @@
+"""Streaming recorder of (obs, action, reward, done) transitions.
+
+Transitions are written into preallocated chunk buffers. A full chunk is
+flushed to disk as a shard, so memory stays bounded by the chunk size no
+matter how long the run is. Shards are either compressed `.npz` files or
+`.npy` memmaps (one per field), and `manifest.json` lists every shard with
+its number of transitions.
+
+Two entry points feed the same writer:
+
+- TrajectoryRecorder wraps a TradingEnv (or any gym env) and records every
+  step.
+- TurnRecorder is a BotManager turn hook, it records one transition per bot
+  turn, so rule-based AIAgent and RLAgent runs produce the same datasets.
+"""
+
+import json
+import os
+from typing import Self
+
+import gymnasium as gym
+import numpy as np
+
+from nre_ai.mechanics import calculate_net_worth, get_observation
+
+MANIFEST_NAME = "manifest.json"
+SHARD_FORMATS = ("npz", "memmap")
+FIELDS = ("obs", "actions", "rewards", "dones")
+NO_ACTION = -1
+
+
+class TrajectoryWriter:
+    """Buffers transitions and flushes them to shards in a directory."""
+
+    def __init__(
+        self,
+        directory: str,
+        obs_dim: int = 37,
+        chunk_size: int = 65536,
+        shard_format: str = "npz",
+    ):
+        """Initializes the writer.
+
+        Shards already listed in the directory's manifest are kept, new shards
+        are appended after them. If the last one has room left it is reopened
+        and filled first, so short runs (e.g. one nre-ai invocation per turn)
+        do not leave a tiny shard each.
+
+        Args:
+            directory (str): Output directory, created if missing.
+            obs_dim (int): Length of an observation vector.
+            chunk_size (int): Transitions per shard; bounds the memory used.
+            shard_format (str): 'npz' for compressed shards or 'memmap' for
+                `.npy` files written in place.
+
+        Raises:
+            ValueError: If shard_format is not supported.
+        """
+        if shard_format not in SHARD_FORMATS:
+            raise ValueError(f"Unsupported shard format '{shard_format}'.")
+
+        self.directory = directory
+        self.obs_dim = obs_dim
+        self.chunk_size = chunk_size
+        self.shard_format = shard_format
+        os.makedirs(directory, exist_ok=True)
+
+        self.manifest = read_manifest(directory)
+        self._size = 0
+        self.obs = self.actions = self.rewards = self.dones = None
+        if not self._resume():
+            self._open_buffers()
+
+    def _shard_name(self) -> str:
+        return f"shard_{len(self.manifest):06d}"
+
+    def _open_buffers(self):
+        """Allocates the buffers of the next shard."""
+        shapes = {
+            "obs": ((self.chunk_size, self.obs_dim), np.float32),
+            "actions": ((self.chunk_size,), np.int64),
+            "rewards": ((self.chunk_size,), np.float32),
+            "dones": ((self.chunk_size,), np.bool_),
+        }
+        if self.shard_format == "npz":
+            # Buffers are reused for every shard
+            if self.obs is not None:
+                return
+            for field, (shape, dtype) in shapes.items():
+                setattr(self, field, np.empty(shape, dtype=dtype))
+        else:
+            name = self._shard_name()
+            for field, (shape, dtype) in shapes.items():
+                path = os.path.join(self.directory, f"{name}_{field}.npy")
+                buffer = np.lib.format.open_memmap(path, "w+", dtype, shape)
+                setattr(self, field, buffer)
+
+    def _resume(self) -> bool:
+        """Reopens the last shard if it is not full.
+
+        Returns:
+            bool: Whether a shard was reopened.
+        """
+        if not self.manifest:
+            return False
+        entry = self.manifest[-1]
+        name, size = entry["shard"], entry["size"]
+        if entry["format"] != self.shard_format or size >= self.chunk_size:
+            return False
+
+        if self.shard_format == "npz":
+            with np.load(os.path.join(self.directory, f"{name}.npz")) as shard:
+                data = {field: shard[field] for field in FIELDS}
+            if data["obs"].shape[1:] != (self.obs_dim,):
+                return False
+            self.manifest.pop()
+            self._open_buffers()
+            for field in FIELDS:
+                getattr(self, field)[:size] = data[field]
+        else:
+            buffers = {
+                field: np.load(
+                    os.path.join(self.directory, f"{name}_{field}.npy"), mmap_mode="r+"
+                )
+                for field in FIELDS
+            }
+            if buffers["obs"].shape != (self.chunk_size, self.obs_dim):
+                return False
+            self.manifest.pop()
+            for field, buffer in buffers.items():
+                setattr(self, field, buffer)
+        self._size = size
+        return True
+
+    def add(self, obs: np.ndarray, action: int, reward: float, done: bool):
+        """Appends a single transition.
+
+        Args:
+            obs (np.ndarray): Observation the action was chosen from.
+            action (int): Action index, NO_ACTION if unknown.
+            reward (float): Reward received for the action.
+            done (bool): Whether the episode ended after the action.
+        """
+        i = self._size
+        self.obs[i] = obs
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.dones[i] = done
+        self._size = i + 1
+        if self._size == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered transitions as a new shard."""
+        if self._size == 0:
+            return
+
+        name = self._shard_name()
+        size = self._size
+        if self.shard_format == "npz":
+            # A reopened shard is replaced only once the new one is complete
+            path = os.path.join(self.directory, f"{name}.npz")
+            with open(path + ".tmp", "wb") as f:
+                np.savez_compressed(
+                    f, **{field: getattr(self, field)[:size] for field in FIELDS}
+                )
+            os.replace(path + ".tmp", path)
+        else:
+            for field in FIELDS:
+                getattr(self, field).flush()
+
+        self.manifest.append({"shard": name, "format": self.shard_format, "size": size})
+        self._write_manifest()
+        self._size = 0
+        self._open_buffers()
+
+    def _write_manifest(self):
+        path = os.path.join(self.directory, MANIFEST_NAME)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def close(self):
+        """Flushes the remaining transitions."""
+        self.flush()
+        if self.shard_format == "memmap":
+            # Drop the empty shard that was opened after the last flush
+            name = self._shard_name()
+            for field in FIELDS:
+                setattr(self, field, None)
+                path = os.path.join(self.directory, f"{name}_{field}.npy")
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def __enter__(self) -> Self:
+        """Returns the writer."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Closes the writer."""
+        self.close()
+
+
+def read_manifest(directory: str) -> list[dict]:
+    """Returns the shard list of a trajectory directory (empty if missing)."""
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def iter_shards(directory: str):
+    """Yields the transitions of every shard as a dict of arrays.
+
+    Memmap shards are opened read-only, so iterating a large dataset does not
+    load it into memory.
+
+    Args:
+        directory (str): Directory written by TrajectoryWriter.
+
+    Yields:
+        dict[str, np.ndarray]: Arrays keyed by 'obs', 'actions', 'rewards'
+            and 'dones'.
+    """
+    for entry in read_manifest(directory):
+        name, size = entry["shard"], entry["size"]
+        if entry["format"] == "npz":
+            with np.load(os.path.join(directory, f"{name}.npz")) as shard:
+                yield {field: shard[field] for field in FIELDS}
+        else:
+            yield {
+                field: np.load(
+                    os.path.join(directory, f"{name}_{field}.npy"), mmap_mode="r"
+                )[:size]
+                for field in FIELDS
+            }
+
+
+class TrajectoryRecorder(gym.Wrapper):
+    """Environment wrapper that records every step to a TrajectoryWriter."""
+
+    def __init__(self, env: gym.Env, writer: TrajectoryWriter):
+        """Initializes the wrapper.
+
+        Args:
+            env (gym.Env): The environment to record.
+            writer (TrajectoryWriter): Destination of the transitions.
+        """
+        super().__init__(env)
+        self.writer = writer
+        self._last_obs = None
+
+    def reset(self, **kwargs):
+        """Resets the environment and remembers the first observation."""
+        obs, info = self.env.reset(**kwargs)
+        self._last_obs = obs
+        return obs, info
+
+    def step(self, action):
+        """Steps the environment and records the transition."""
+        obs, reward, terminated, truncated, info = self.env.step(action)
+        self.writer.add(self._last_obs, int(action), reward, terminated or truncated)
+        self._last_obs = obs
+        return obs, reward, terminated, truncated, info
+
+    def close(self):
+        """Flushes the recorder and closes the environment."""
+        self.writer.close()
+        super().close()
+
+
+class TurnRecorder:
+    """BotManager turn hook that records the decisions of every bot turn.
+
+    Bots with an `action_hook` (AIAgent and its subclasses) report each
+    decision of the turn before it takes effect; every entry of their
+    `turn_actions` becomes its own transition, observed in the state it was
+    chosen in. The reward of a decision is the change of the bot's net worth
+    (calculate_net_worth) until the next one, or until the end of the turn for
+    the last, and done marks a bankruptcy at the end of the turn.
+
+    Other bots give one transition per turn with their `last_action`, taken
+    from the observation before the turn.
+    """
+
+    def __init__(self, writer: TrajectoryWriter):
+        """Initializes the hook.
+
+        Args:
+            writer (TrajectoryWriter): Destination of the transitions.
+        """
+        self.writer = writer
+        self._cities: dict | None = None
+        # bot name -> (bot, observation and net worth before the turn, and
+        # before every reported decision)
+        self._pending: dict[str, tuple[object, list[tuple[np.ndarray, float]]]] = {}
+
+    def before_turn(self, bot, cities: dict):
+        """Captures the observation and net worth before the bot acts."""
+        self._cities = cities
+        self._pending[bot.name] = (bot, [self._observe(bot)])
+        if hasattr(bot, "action_hook"):
+            bot.action_hook = self._on_action
+
+    def _observe(self, bot) -> tuple[np.ndarray, float]:
+        return get_observation(bot, self._cities), calculate_net_worth(bot, self._cities)
+
+    def _on_action(self, bot, action: int):
+        """Observes the state a decision is taken in."""
+        pending = self._pending.get(bot.name)
+        # Copies of the bot (e.g. in look-ahead searches) are not recorded
+        if pending is not None and pending[0] is bot:
+            pending[1].append(self._observe(bot))
+
+    def after_turn(self, bot, cities: dict):
+        """Records the transitions of the finished turn."""
+        _, states = self._pending.pop(bot.name)
+        if hasattr(bot, "action_hook"):
+            bot.action_hook = None
+
+        # The first state is the one before the turn; the decisions reported
+        # but not kept in turn_actions (dropped by the bot) are not recorded
+        actions = list(getattr(bot, "turn_actions", []))
+        if len(states) > 1 and actions:
+            states = states[1 : len(actions) + 1]
+        else:
+            action = getattr(bot, "last_action", None)
+            actions = [NO_ACTION if action is None else action]
+            states = states[:1]
+
+        end_net_worth = calculate_net_worth(bot, cities)
+        next_net_worths = [net_worth for _, net_worth in states[1:]] + [end_net_worth]
+        for i, ((obs, net_worth), action, next_net_worth) in enumerate(
+            zip(states, actions, next_net_worths, strict=False)
+        ):
+            self.writer.add(
+                obs,
+                action,
+                next_net_worth - net_worth,
+                i == len(states) - 1 and bot.is_bankrupt(),
+            )
@@ -0,0 +1,165 @@
+"""Watch mode: run a turn as soon as the game saves the world.
+
+The watcher polls the (mtime, size) of `miasta.json` with a short interval
+instead of waiting for an external scheduler. A changed file is accepted
+once it has stayed unchanged for the debounce time and ends like a complete
+JSON document, so a save still being written never triggers a turn. The turn
+runs on a warm daemon.TurnService, and the time from detecting the save to
+the end of the turn is recorded in REACTION_LATENCY.
+
+Example:
+    DATA_PATH=save/ python -m nre_ai.watcher --ai 2 --metrics-dir metrics/
+"""
+
+import os
+from argparse import ArgumentParser
+from time import perf_counter, sleep
+
+from nre_ai.daemon import TurnService, file_signature
+from nre_ai.metrics import EXPORT_FORMATS, REACTION_LATENCY, REGISTRY
+
+# Bytes read from the end of the file to check that the save is complete
+TAIL_BYTES = 64
+
+
+def looks_complete(path: str) -> bool:
+    """Returns True if the file ends with the closing brace of a JSON object."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(f.tell() - TAIL_BYTES, 0))
+            tail = f.read().rstrip()
+    except FileNotFoundError:
+        return False
+    return tail.endswith(b"}")
+
+
+class SaveWatcher:
+    """Detects new, complete saves of a file by polling its stat."""
+
+    def __init__(self, path: str, debounce: float = 0.05, poll_interval: float = 0.005):
+        """Initializes the watcher; the current file counts as seen.
+
+        Args:
+            path (str): The watched file.
+            debounce (float): Seconds the file must stay unchanged before a
+                save is accepted.
+            poll_interval (float): Seconds between two stat calls.
+        """
+        self.path = path
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.mark_seen()
+
+    def mark_seen(self, signature: tuple[int, int] | None = None):
+        """Treats a version of the file as seen, e.g. one we wrote ourselves.
+
+        Args:
+            signature (tuple[int, int] | None): (mtime_ns, size) of the version,
+                taken right after writing it. Defaults to the current file,
+                which also hides a save made since then.
+        """
+        self._seen = file_signature(self.path) if signature is None else signature
+
+    def wait(self, timeout: float | None = None) -> float | None:
+        """Blocks until a new complete save appears.
+
+        Args:
+            timeout (float | None): Give up this many seconds after the call,
+                even while the file keeps changing; None waits forever.
+
+        Returns:
+            float | None: perf_counter() time the change was first detected,
+                None on timeout.
+        """
+        start = perf_counter()
+        detected = None
+        last = None
+        stable_since = 0.0
+        while True:
+            signature = file_signature(self.path)
+            now = perf_counter()
+            if timeout is not None and now - start >= timeout:
+                return None
+            if signature is not None and signature != self._seen:
+                if detected is None:
+                    detected = now
+                if signature != last:
+                    last = signature
+                    stable_since = now
+                elif now - stable_since >= self.debounce:
+                    if looks_complete(self.path):
+                        self._seen = signature
+                        return detected
+                    # Stable but truncated, give the writer another debounce
+                    stable_since = now
+            sleep(self.poll_interval)
+
+
+def main():
+    """Runs turns on every save of the world from the command line."""
+    parser = ArgumentParser(description="Run a bot turn whenever the game saves.")
+    parser.add_argument("-a", "--ai", type=int, default=2, help="Number of bots.")
+    parser.add_argument(
+        "--use-rl",
+        action="store_true",
+        help="Use Reinforcement Learning agents instead of rule-based agents.",
+    )
+    parser.add_argument("--seed", type=int, default=None, help="Seed of new bots.")
+    parser.add_argument("-r", "--reset", action="store_true", help="Reset the cities")
+    parser.add_argument("--skip", action="store_true", help="Skip the economy update")
+    parser.add_argument("-s", "--skip-events", action="store_true", help="Skip events")
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=0.05,
+        help="Seconds a save must stay unchanged before the turn runs.",
+    )
+    parser.add_argument(
+        "--poll-interval", type=float, default=0.005, help="Seconds between polls."
+    )
+    parser.add_argument(
+        "--max-turns", type=int, default=None, help="Stop after this many turns."
+    )
+    parser.add_argument(
+        "--metrics-dir",
+        default=None,
+        help="Directory to write performance metrics to after every turn.",
+    )
+    parser.add_argument(
+        "--metrics-format",
+        choices=EXPORT_FORMATS,
+        default="prom",
+        help="Format of the metrics file.",
+    )
+    args = parser.parse_args()
+
+    service = TurnService(
+        num_bots=args.ai, use_rl=args.use_rl, seed=args.seed, reset=args.reset
+    )
+    watcher = SaveWatcher(service.world_path, args.debounce, args.poll_interval)
+    print(f"Watching {service.world_path}")
+
+    turns = 0
+    try:
+        while args.max_turns is None or turns < args.max_turns:
+            detected = watcher.wait()
+            result = service.run_turn(skip=args.skip, skip_events=args.skip_events)
+            # The turn's own writes are not a new save, a save made after them is
+            if result["world_signature"] is not None:
+                watcher.mark_seen(result["world_signature"])
+            latency = perf_counter() - detected
+            REACTION_LATENCY.observe(latency)
+            turns += 1
+            print(
+                f"Turn {result['turn']} done {latency * 1000:.1f} ms after the save "
+                f"(turn {result['timings']['total'] * 1000:.1f} ms)"
+            )
+            if args.metrics_dir:
+                REGISTRY.write_textfile(args.metrics_dir, args.metrics_format)
+    except KeyboardInterrupt:
+        print("Stopped.")
+
+
+if __name__ == "__main__":
+    main()
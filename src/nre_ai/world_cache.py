@@ -0,0 +1,184 @@
+"""Parsed-world cache in a private per-user directory.
+
+Parsing a large `miasta.json` dominates the start of a short run. load_world
+keeps the parsed data in the user's cache directory and returns it instead of
+parsing again while the world file is unchanged. The cache records the size,
+mtime and BLAKE2 hash of the JSON it was built from: when size and mtime
+match, the cache is used as is; when only the mtime moved (the file was
+touched or rewritten with the same content), the hash decides; anything else
+parses the file again and replaces the cache.
+
+The cache file holds two pickles, the key and the data, so a stale cache is
+rejected without unpickling the world. Unpickling runs code, so caches are
+only kept in a 0700 directory owned by the user (see cache_dir) and only read
+from files the user owns that nobody else can write.
+
+nrecity's JsonManager parses its file when it is created, which this package
+does not control. The reloads of nre-ai and the daemon follow a write of the
+world, which a cache always misses, so they parse with `json_manager()`.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import pickle
+import stat
+
+CACHE_SUFFIX = ".pkl"
+CACHE_VERSION = 1
+# Overrides the cache directory, e.g. for tests
+CACHE_DIR_ENV = "NRE_AI_CACHE_DIR"
+
+
+def private_dir(directory: str) -> str:
+    """Creates directory with mode 0700 if missing and checks it is private.
+
+    Returns:
+        str: The directory.
+
+    Raises:
+        PermissionError: If it is not a directory owned by the user and closed
+            to everyone else.
+    """
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.lstat(directory)
+    if (
+        not stat.S_ISDIR(info.st_mode)
+        or info.st_uid != os.getuid()
+        or info.st_mode & 0o077
+    ):
+        raise PermissionError(f"{directory} is not a private directory of the user.")
+    return directory
+
+
+def cache_dir() -> str:
+    """Returns the private cache directory, created if missing.
+
+    $NRE_AI_CACHE_DIR if set, otherwise `nre-ai/worlds` in $XDG_CACHE_HOME
+    (default ~/.cache).
+    """
+    directory = os.environ.get(CACHE_DIR_ENV)
+    if not directory:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+        directory = os.path.join(base, "nre-ai", "worlds")
+    return private_dir(directory)
+
+
+def cache_path(path: str) -> str:
+    """Returns the cache path of a world JSON, named after its absolute path."""
+    name = hashlib.blake2b(os.path.realpath(path).encode(), digest_size=16).hexdigest()
+    return os.path.join(cache_dir(), name + CACHE_SUFFIX)
+
+
+def _digest(raw: bytes) -> str:
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+def _read_key(f) -> dict | None:
+    try:
+        key = pickle.load(f)
+    except (pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+    if not isinstance(key, dict) or key.get("version") != CACHE_VERSION:
+        return None
+    return key
+
+
+def _trusted(f) -> bool:
+    """Checks that an open cache file is the user's and nobody else can write it."""
+    info = os.fstat(f.fileno())
+    return info.st_uid == os.getuid() and not info.st_mode & 0o022
+
+
+def _write_cache(cache: str, key: dict, data: dict):
+    tmp_path = f"{cache}.{os.getpid()}.tmp"
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(key, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache)
+    except OSError:
+        # Full or read-only cache directory, the world is still returned
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+
+
+def _read_cache(
+    cache: str, f, info: os.stat_result, verify_hash: bool
+) -> tuple[dict | None, bytes | None]:
+    """Returns the cached world if it matches the open world file f.
+
+    Returns:
+        tuple[dict | None, bytes | None]: The world (None if the cache is
+            missing, stale or untrusted) and the raw JSON if it was read.
+    """
+    raw = None
+    try:
+        with open(cache, "rb") as cache_file:
+            key = _read_key(cache_file) if _trusted(cache_file) else None
+            if not key or key["size"] != info.st_size:
+                return None, raw
+            same_mtime = key["mtime_ns"] == info.st_mtime_ns
+            if not same_mtime or verify_hash:
+                raw = f.read()
+            if not ((same_mtime and not verify_hash) or key["hash"] == _digest(raw)):
+                return None, raw
+            data = pickle.load(cache_file)
+    except FileNotFoundError:
+        return None, raw
+    except (pickle.UnpicklingError, EOFError):
+        # Truncated cache, rebuilt by the caller
+        return None, raw
+
+    if not same_mtime:
+        key["mtime_ns"] = info.st_mtime_ns
+        _write_cache(cache, key, data)
+    return data, raw
+
+
+def load_world(path: str, verify_hash: bool = False) -> dict:
+    """Returns the parsed world JSON, from the cache when it is still valid.
+
+    The world is parsed without caching if the cache directory is not private.
+
+    Args:
+        path (str): World JSON.
+        verify_hash (bool): Also compare the hash when size and mtime match,
+            for files rewritten within the mtime resolution.
+
+    Returns:
+        dict: The parsed world; a fresh object on every call.
+    """
+    try:
+        cache = cache_path(path)
+    except PermissionError:
+        cache = None
+
+    info = os.stat(path)
+    with open(path, "rb") as f:
+        raw = None
+        if cache is not None:
+            data, raw = _read_cache(cache, f, info, verify_hash)
+            if data is not None:
+                return data
+        if raw is None:
+            raw = f.read()
+
+    data = json.loads(raw)
+    if cache:
+        key = {
+            "version": CACHE_VERSION,
+            "size": len(raw),
+            "mtime_ns": info.st_mtime_ns,
+            "hash": _digest(raw),
+        }
+        _write_cache(cache, key, data)
+    return data
+
+
+def invalidate(path: str):
+    """Removes the cache of a world JSON, if any."""
+    with contextlib.suppress(FileNotFoundError, PermissionError):
+        os.remove(cache_path(path))
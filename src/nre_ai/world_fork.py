@@ -0,0 +1,204 @@
+"""Copy-on-write forks of the world for what-if planning.
+
+The mechanics and the bots change `city.commodities[item]["quantity"]` in
+place, so looking ahead used to mean deep-copying every city. A WorldFork
+looks like the `cities` dict to that code, but it reads through to the world
+it was forked from and copies a (city, commodity) cell only when the cell is
+first written. Throwing the fork away leaves the real world untouched, and a
+fork of a fork costs nothing until it is written to.
+
+Example:
+    fork = WorldFork(cities)
+    agent = SimulatedAgent.from_agent(bot)
+    for action in actions:
+        execute_action(action, agent, fork, record=False)
+    value = calculate_net_worth(agent, fork)
+"""
+
+from collections.abc import Iterator, Mapping, MutableMapping
+from typing import Any, Self
+
+from nrecity import City
+
+
+class WorldFork(Mapping):
+    """A copy-on-write view of a cities dict (or of another fork)."""
+
+    def __init__(self, cities: Mapping[str, City]):
+        """Forks cities; nothing is copied until a commodity is written.
+
+        Args:
+            cities (Mapping[str, City]): The world to fork; never modified.
+        """
+        self._base = cities
+        self._cells: dict[tuple[str, str], dict] = {}
+        self._views: dict[str, ForkedCity] = {}
+
+    def __getitem__(self, name: str) -> "ForkedCity":
+        """Returns the forked view of city name."""
+        view = self._views.get(name)
+        if view is None:
+            view = ForkedCity(self, name, self._base[name])
+            self._views[name] = view
+        return view
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterates over the city names."""
+        return iter(self._base)
+
+    def __len__(self) -> int:
+        """Returns the number of cities."""
+        return len(self._base)
+
+    def __contains__(self, name: object) -> bool:
+        """Checks if the world has city name."""
+        return name in self._base
+
+    def fork(self) -> Self:
+        """Returns a fork of this fork."""
+        return type(self)(self)
+
+    def modified_cells(self) -> set[tuple[str, str]]:
+        """Returns the (city, commodity) cells copied by this fork."""
+        return set(self._cells)
+
+    def _read(self, city: str, item: str) -> Any:
+        """Returns the current details of a cell (KeyError if missing)."""
+        cell = self._cells.get((city, item))
+        if cell is not None:
+            return cell
+        if isinstance(self._base, WorldFork):
+            return self._base._read(city, item)
+        return self._base[city].commodities[item]
+
+    def _writable(self, city: str, item: str) -> dict:
+        """Returns the fork's own copy of a cell, copying it on first write."""
+        cell = self._cells.get((city, item))
+        if cell is None:
+            cell = dict(self._read(city, item))
+            self._cells[(city, item)] = cell
+        return cell
+
+
+class ForkedCity:
+    """A city of a WorldFork; attributes other than commodities are shared."""
+
+    def __init__(self, fork: WorldFork, name: str, city: City):
+        """Initializes the view.
+
+        Args:
+            fork (WorldFork): The fork the city belongs to.
+            name (str): The city name.
+            city (City): The city in the forked world.
+        """
+        self._city = city
+        self.name = name
+        self.commodities = ForkedCommodities(fork, name, city.commodities)
+
+    def __getattr__(self, attribute: str) -> Any:
+        """Reads fee, connections, factory... from the forked city."""
+        return getattr(self._city, attribute)
+
+
+class ForkedCommodities(Mapping):
+    """The commodities of a ForkedCity."""
+
+    def __init__(self, fork: WorldFork, city: str, base: Mapping):
+        """Initializes the view.
+
+        Args:
+            fork (WorldFork): The fork the city belongs to.
+            city (str): The city name.
+            base (Mapping): The commodities in the forked world.
+        """
+        self._fork = fork
+        self._city = city
+        self._base = base
+
+    def __getitem__(self, item: str) -> "CellView | Any":
+        """Returns the details of item; empty details are returned as is."""
+        details = self._fork._read(self._city, item)
+        if not details:
+            return details
+        return CellView(self._fork, self._city, item)
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterates over the commodity names."""
+        return iter(self._base)
+
+    def __len__(self) -> int:
+        """Returns the number of commodities."""
+        return len(self._base)
+
+    def __contains__(self, item: object) -> bool:
+        """Checks if the city has item."""
+        return item in self._base
+
+
+class CellView(MutableMapping):
+    """The details of one commodity; the first write copies the cell."""
+
+    __slots__ = ("_city", "_fork", "_item")
+
+    def __init__(self, fork: WorldFork, city: str, item: str):
+        """Initializes the view of the (city, item) cell of fork."""
+        self._fork = fork
+        self._city = city
+        self._item = item
+
+    def __getitem__(self, key: str) -> Any:
+        """Reads a field (price, quantity...)."""
+        return self._fork._read(self._city, self._item)[key]
+
+    def __setitem__(self, key: str, value: Any):
+        """Writes a field to the fork's copy of the cell."""
+        self._fork._writable(self._city, self._item)[key] = value
+
+    def __delitem__(self, key: str):
+        """Deletes a field from the fork's copy of the cell."""
+        del self._fork._writable(self._city, self._item)[key]
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterates over the field names."""
+        return iter(self._fork._read(self._city, self._item))
+
+    def __len__(self) -> int:
+        """Returns the number of fields."""
+        return len(self._fork._read(self._city, self._item))
+
+
+class SimulatedAgent:
+    """A throwaway copy of a bot's trading state for execute_action."""
+
+    def __init__(self, name: str, money: float, current_city_name: str, inventory: dict):
+        """Initializes the state.
+
+        Args:
+            name (str): The bot name.
+            money (float): Money.
+            current_city_name (str): The city the bot is in.
+            inventory (dict): Item to {'quantity', 'avg_buy_price'}; owned by
+                the simulated agent.
+        """
+        self.name = name
+        self.money = money
+        self.current_city_name = current_city_name
+        self.inventory = inventory
+
+    @classmethod
+    def from_agent(cls, agent) -> Self:
+        """Copies the money, position and inventory of agent."""
+        return cls(
+            agent.name,
+            agent.money,
+            agent.current_city_name,
+            {item: dict(details) for item, details in agent.inventory.items()},
+        )
+
+    def copy(self) -> Self:
+        """Returns an independent copy of the state."""
+        return self.from_agent(self)
+
+    def is_bankrupt(self) -> bool:
+        """Checks if the simulated bot is bankrupt."""
+        return self.money <= 0 and not self.inventory
@@ -0,0 +1,374 @@
+"""Seeded generator of synthetic NRE-City worlds for scale testing.
+
+Produces the same "cities"/"after" JSON layout as the game saves (see
+tests/test_city_data.json) and follows the rules from plan.md:
+
+- a city has a 40% chance for a factory, a big city always has one and a 20%
+  chance for a second,
+- big cities hold 5x more goods than small ones,
+- sale prices depend on how scarce a commodity is compared to its regular
+  quantity.
+
+Cities are written one chunk at a time, so only the connection graph (a few
+integers per city) is kept in memory and worlds with millions of cities can
+be generated.
+"""
+
+import json
+from argparse import ArgumentParser
+
+import numpy as np
+from nrecity import factory as nrecity_factory_map
+
+from nre_ai.mechanics import COMMODITIES
+
+# Regular price and (small city) regular quantity ranges per commodity
+COMMODITY_RANGES = {
+    "metal": {"price": (29.0, 84.0), "quantity": (1, 100)},
+    "gems": {"price": (77.0, 210.0), "quantity": (1, 40)},
+    "food": {"price": (2.0, 53.0), "quantity": (1, 100)},
+    "fuel": {"price": (44.0, 113.0), "quantity": (5, 100)},
+    "relics": {"price": (1133.0, 2245.0), "quantity": (0, 9)},
+}
+DEGREE_DISTRIBUTIONS = ("uniform", "poisson", "powerlaw")
+SMALL_FEE_RANGE = (10, 50)
+BIG_FEE_RANGE = (300, 700)
+BIG_CITY_MULTIPLIER = 5
+FACTORY_CHANCE = 0.4
+SECOND_FACTORY_CHANCE = 0.2
+CAPITAL_NAME = "Stolica"
+CHUNK_SIZE = 4096
+
+# Quantity / regular_quantity thresholds and the matching sale price ranges
+SCARCITY_PRICE_RANGES = (
+    (0.1, (2.0, 3.0)),  # Almost depleted
+    (0.5, (1.5, 2.0)),  # Low
+    (1.5, (0.9, 1.0)),  # Regular
+    (float("inf"), (0.75, 0.8)),  # Abundant
+)
+
+
+def city_name(index: int) -> str:
+    """Returns the name of the city with the given index."""
+    return CAPITAL_NAME if index == 0 else f"Miasto {index}"
+
+
+def sample_degrees(
+    n_cities: int,
+    rng: np.random.Generator,
+    distribution: str = "poisson",
+    mean_degree: float = 2.5,
+    min_degree: int = 1,
+    max_degree: int = 10,
+) -> np.ndarray:
+    """Draws the target number of connections of every city.
+
+    Args:
+        n_cities (int): Number of cities.
+        rng (np.random.Generator): Random generator.
+        distribution (str): One of 'uniform', 'poisson' or 'powerlaw'.
+        mean_degree (float): Mean degree for 'poisson', exponent for 'powerlaw'.
+        min_degree (int): Lower bound of the degree.
+        max_degree (int): Upper bound of the degree. TradingEnv only observes
+            the first 10 connections.
+
+    Returns:
+        np.ndarray: Degree per city.
+
+    Raises:
+        ValueError: If the distribution is unknown.
+    """
+    if distribution == "uniform":
+        degrees = rng.integers(min_degree, max_degree + 1, size=n_cities)
+    elif distribution == "poisson":
+        degrees = min_degree + rng.poisson(max(mean_degree - min_degree, 0), n_cities)
+    elif distribution == "powerlaw":
+        degrees = min_degree - 1 + rng.zipf(max(mean_degree, 1.01), n_cities)
+    else:
+        raise ValueError(f"Unknown degree distribution '{distribution}'.")
+    return np.clip(degrees, min_degree, max_degree)
+
+
+def build_connections(
+    degrees: np.ndarray, rng: np.random.Generator
+) -> tuple[np.ndarray, np.ndarray]:
+    """Builds an undirected, connected city graph close to the given degrees.
+
+    A random spanning path keeps the graph connected and the remaining
+    connections are paired at random (configuration model). Self loops and
+    duplicate connections are dropped.
+
+    Args:
+        degrees (np.ndarray): Target degree per city.
+        rng (np.random.Generator): Random generator.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: CSR offsets and neighbor indices; the
+            neighbors of city i are neighbors[offsets[i]:offsets[i + 1]].
+    """
+    n_cities = len(degrees)
+    order = rng.permutation(n_cities)
+
+    path_degree = np.zeros(n_cities, dtype=np.int64)
+    path_degree[order[:-1]] += 1
+    path_degree[order[1:]] += 1
+
+    residual = np.maximum(degrees - path_degree, 0)
+    stubs = np.repeat(np.arange(n_cities), residual)
+    rng.shuffle(stubs)
+    stubs = stubs[: len(stubs) // 2 * 2]
+
+    u = np.concatenate([order[:-1], stubs[0::2]])
+    v = np.concatenate([order[1:], stubs[1::2]])
+    keep = u != v
+    low = np.minimum(u, v)[keep].astype(np.int64)
+    high = np.maximum(u, v)[keep].astype(np.int64)
+    keys = np.unique(low * n_cities + high)
+    low, high = keys // n_cities, keys % n_cities
+
+    sources = np.concatenate([low, high])
+    targets = np.concatenate([high, low])
+    sort = np.argsort(sources, kind="stable")
+    neighbors = targets[sort]
+    offsets = np.zeros(n_cities + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n_cities), out=offsets[1:])
+    return offsets, neighbors
+
+
+def sale_multiplier(ratio: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Draws sale price multipliers for quantity / regular_quantity ratios."""
+    multiplier = np.empty_like(ratio)
+    lower = -np.inf
+    for threshold, (low, high) in SCARCITY_PRICE_RANGES:
+        mask = (ratio >= lower) & (ratio < threshold)
+        multiplier[mask] = rng.uniform(low, high, int(mask.sum()))
+        lower = threshold
+    return multiplier
+
+
+def generate_chunk(
+    start: int,
+    stop: int,
+    offsets: np.ndarray,
+    neighbors: np.ndarray,
+    seed: int,
+    big_city_chance: float = 0.05,
+    factory_map: dict | None = None,
+    commodity_ranges: dict | None = None,
+) -> list[dict]:
+    """Generates the cities with indices in [start, stop).
+
+    The result only depends on the arguments, so a chunk can be regenerated
+    for both the "cities" and the "after" section instead of being kept.
+
+    Args:
+        start (int): Index of the first city.
+        stop (int): Index after the last city.
+        offsets (np.ndarray): CSR offsets from build_connections.
+        neighbors (np.ndarray): CSR neighbors from build_connections.
+        seed (int): World seed.
+        big_city_chance (float): Probability that a city is big.
+        factory_map (dict | None): Map of commodities to factories. If None,
+            uses the default from nrecity.
+        commodity_ranges (dict | None): Regular price and quantity ranges per
+            commodity. If None, uses COMMODITY_RANGES.
+
+    Returns:
+        list[dict]: City dictionaries in the NRE-City format.
+    """
+    factory_map = factory_map if factory_map is not None else nrecity_factory_map
+    commodity_ranges = commodity_ranges or COMMODITY_RANGES
+    factories = list(dict.fromkeys(factory_map.values()))
+    produces = {factory_name: item for item, factory_name in factory_map.items()}
+
+    rng = np.random.default_rng([seed, 1, start])
+    count = stop - start
+
+    is_big = rng.random(count) < big_city_chance
+    if start == 0:
+        is_big[0] = True
+    size_multiplier = np.where(is_big, BIG_CITY_MULTIPLIER, 1)
+
+    fees = np.where(
+        is_big,
+        rng.integers(*BIG_FEE_RANGE, size=count),
+        rng.integers(*SMALL_FEE_RANGE, size=count),
+    )
+    missions = rng.integers(0, 3, size=count)
+
+    has_factory = is_big | (rng.random(count) < FACTORY_CHANCE)
+    has_second = is_big & (rng.random(count) < SECOND_FACTORY_CHANCE)
+    first_factory = rng.integers(0, len(factories), size=count)
+    second_factory = rng.integers(0, len(factories), size=count)
+
+    city_factories = []
+    for i in range(count):
+        names = []
+        if has_factory[i]:
+            names.append(factories[first_factory[i]])
+        if has_second[i] and second_factory[i] != first_factory[i]:
+            names.append(factories[second_factory[i]])
+        city_factories.append(names)
+
+    commodity_columns = {}
+    for item, ranges in commodity_ranges.items():
+        produced = np.array(
+            [
+                any(produces.get(name) == item for name in names)
+                for names in city_factories
+            ]
+        )
+        regular_price = rng.uniform(*ranges["price"], size=count)
+        regular_price = np.where(produced, regular_price * 0.8, regular_price)
+        low, high = ranges["quantity"]
+        regular_quantity = rng.integers(low, high + 1, size=count) * size_multiplier
+        regular_quantity = np.where(produced, regular_quantity * 1.5, regular_quantity)
+        regular_quantity = np.floor(regular_quantity)
+        quantity = np.floor(regular_quantity * rng.uniform(0.0, 2.0, size=count))
+        ratio = quantity / np.maximum(regular_quantity, 1)
+        price = regular_price * sale_multiplier(ratio, rng)
+        commodity_columns[item] = (
+            quantity.tolist(),
+            np.round(price, 2).tolist(),
+            np.round(regular_price, 2).tolist(),
+            regular_quantity.tolist(),
+        )
+
+    cities = []
+    for i in range(count):
+        index = start + i
+        connections = [
+            city_name(int(j)) for j in neighbors[offsets[index] : offsets[index + 1]]
+        ]
+        commodities = {}
+        for item, columns in commodity_columns.items():
+            commodities[item] = {
+                "quantity": columns[0][i],
+                "price": columns[1][i],
+                "regular_price": columns[2][i],
+                "regular_quantity": columns[3][i],
+                "special": None,
+            }
+        commodities["special"] = None
+
+        cities.append(
+            {
+                "name": city_name(index),
+                "size": "big" if is_big[i] else "small",
+                "factory": city_factories[i],
+                "fee": int(fees[i]),
+                "nr_of_conn": str(len(connections)),
+                "commodities": commodities,
+                "missions": int(missions[i]),
+                "missions_titles": [],
+                "connections": connections,
+            }
+        )
+    return cities
+
+
+def generate_world(
+    path: str,
+    n_cities: int,
+    seed: int = 0,
+    degree_distribution: str = "poisson",
+    mean_degree: float = 2.5,
+    min_degree: int = 1,
+    max_degree: int = 10,
+    big_city_chance: float = 0.05,
+    factory_map: dict | None = None,
+    commodity_ranges: dict | None = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> str:
+    """Streams a generated world to a JSON file.
+
+    Args:
+        path (str): Output file path.
+        n_cities (int): Number of cities, the first one is the capital.
+        seed (int): Seed, the same seed always produces the same world.
+        degree_distribution (str): One of 'uniform', 'poisson' or 'powerlaw'.
+        mean_degree (float): Mean degree for 'poisson', exponent for 'powerlaw'.
+        min_degree (int): Lower bound of connections per city.
+        max_degree (int): Upper bound of connections per city.
+        big_city_chance (float): Probability that a city is big.
+        factory_map (dict | None): Map of commodities to factories. If None,
+            uses the default from nrecity.
+        commodity_ranges (dict | None): Regular price and quantity ranges per
+            commodity. If None, uses COMMODITY_RANGES.
+        chunk_size (int): Number of cities generated at once.
+
+    Returns:
+        str: The output path.
+
+    Raises:
+        ValueError: If n_cities is not positive.
+    """
+    if n_cities <= 0:
+        raise ValueError("n_cities must be positive.")
+
+    unknown = set(commodity_ranges or {}) - set(COMMODITIES)
+    if unknown:
+        raise ValueError(f"Unknown commodities: {sorted(unknown)}.")
+
+    graph_rng = np.random.default_rng([seed, 0])
+    degrees = sample_degrees(
+        n_cities, graph_rng, degree_distribution, mean_degree, min_degree, max_degree
+    )
+    offsets, neighbors = build_connections(degrees, graph_rng)
+
+    with open(path, "w") as f:
+        for section_index, section in enumerate(("cities", "after")):
+            f.write("{" if section_index == 0 else ", ")
+            f.write(f'"{section}": [')
+            for start in range(0, n_cities, chunk_size):
+                chunk = generate_chunk(
+                    start,
+                    min(start + chunk_size, n_cities),
+                    offsets,
+                    neighbors,
+                    seed,
+                    big_city_chance,
+                    factory_map,
+                    commodity_ranges,
+                )
+                for i, city in enumerate(chunk):
+                    if start or i:
+                        f.write(", ")
+                    f.write(json.dumps(city, ensure_ascii=False))
+            f.write("]")
+        f.write("}\n")
+    return path
+
+
+def main():
+    """Generates a world from the command line."""
+    parser = ArgumentParser(description="Generate a synthetic NRE-City world.")
+    parser.add_argument("output", help="Path of the JSON file to write.")
+    parser.add_argument(
+        "-n", "--cities", type=int, default=1000, help="Number of cities."
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    parser.add_argument(
+        "--degree-distribution", choices=DEGREE_DISTRIBUTIONS, default="poisson"
+    )
+    parser.add_argument("--mean-degree", type=float, default=2.5)
+    parser.add_argument("--min-degree", type=int, default=1)
+    parser.add_argument("--max-degree", type=int, default=10)
+    parser.add_argument("--big-city-chance", type=float, default=0.05)
+    args = parser.parse_args()
+
+    generate_world(
+        args.output,
+        args.cities,
+        seed=args.seed,
+        degree_distribution=args.degree_distribution,
+        mean_degree=args.mean_degree,
+        min_degree=args.min_degree,
+        max_degree=args.max_degree,
+        big_city_chance=args.big_city_chance,
+    )
+    print(f"World with {args.cities} cities saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,14 @@ def city_factory():  # noqa
     return make_city
 
 
+@pytest.fixture(autouse=True)
+def world_cache_dir(tmp_path, monkeypatch):  # noqa
+    # Parsed-world caches never leave the test's directory
+    directory = tmp_path / "world_cache"
+    monkeypatch.setenv("NRE_AI_CACHE_DIR", str(directory))
+    return directory
+
+
 # class MockCityAll:  # noqa
 #     def __init__(self, factories: str = "all"):  # noqa
 #         if factories == "all":
@@ -3,6 +3,7 @@
 import pytest
 
 from nre_ai.agent import AIAgent
+from nre_ai.metrics import REPLANS
 
 
 # Mock City class to avoid dependency on the actual nrecity module
@@ -270,3 +271,168 @@ def test_is_bankrupt(agent):
     agent.money = 0
     agent.inventory = {"gems": {"quantity": 1}}
     assert agent.is_bankrupt() is False
+
+
+def test_take_turn_records_actions(agent, cities):
+    agent.factory_map = {"gems": "Mine"}
+    agent.take_turn(cities)
+
+    # Bought gems (action 1) in CityA
+    assert agent.turn_actions == [1]
+    assert agent.last_action == 1
+
+    agent.take_turn(cities)
+
+    # Traveled to CityB (neighbor 0, action 11), then sold gems (action 6)
+    assert agent.turn_actions == [11, 6]
+    assert agent.last_action == 6
+
+
+@pytest.fixture
+def round_trip(cities):
+    # Food is cheap in CityB and scarce in CityA: a trade back after the gems
+    cities["CityB"].commodities["food"]["price"] = 5
+    cities["CityA"].commodities["food"]["quantity"] = 5
+    return cities
+
+
+def test_plan_route_caches_next_trades(agent, round_trip):
+    agent.factory_map = {"gems": "Mine"}
+    agent._plan_and_buy_empty_inventory(round_trip["CityA"], round_trip)
+
+    assert agent.travel_plan == ("CityB", None)
+    assert [(leg.origin, leg.item, leg.destination) for leg in agent.trade_plan] == [
+        ("CityB", "food", "CityA"),
+        ("CityA", "gems", "CityB"),
+    ]
+    assert agent.trade_plan[0].buy_price == 5
+
+
+def test_cached_trade_skips_search(agent, round_trip, monkeypatch):
+    agent.factory_map = {"gems": "Mine"}
+    agent.take_turn(round_trip)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("searched")
+
+    # Arriving in CityB, the cached food leg is used without a search
+    monkeypatch.setattr(agent, "_choose_trade", fail)
+    agent.take_turn(round_trip)
+
+    assert agent.current_city_name == "CityB"
+    assert "food" in agent.inventory
+    assert agent.travel_plan == ("CityA", None)
+    assert [(leg.origin, leg.item) for leg in agent.trade_plan] == [("CityA", "gems")]
+
+
+def test_drifted_plan_is_recomputed(agent, round_trip):
+    agent.current_city_name = "CityB"
+    agent.trade_plan = [
+        agent._leg((0, "food", "CityA", 0, 5), round_trip["CityB"], round_trip)
+    ]
+
+    # Food now costs 20% more than planned, beyond the 10% tolerance
+    round_trip["CityB"].commodities["food"]["price"] = 6
+    assert agent._cached_trade(round_trip["CityB"], round_trip) is None
+    assert agent.trade_plan == []
+
+
+def test_plan_within_tolerance_is_kept(agent, round_trip):
+    agent.current_city_name = "CityB"
+    agent.trade_plan = [
+        agent._leg((0, "food", "CityA", 0, 5), round_trip["CityB"], round_trip)
+    ]
+
+    round_trip["CityA"].fee = 10.5
+    trade = agent._cached_trade(round_trip["CityB"], round_trip)
+    assert trade is not None
+    assert trade[1:3] == ("food", "CityA")
+
+
+def test_trade_plan_serialization(agent, round_trip):
+    agent.trade_plan = [
+        agent._leg((0, "food", "CityA", 0, 5), round_trip["CityB"], round_trip)
+    ]
+    restored = AIAgent.from_dict(agent.to_dict())
+    assert [leg.to_dict() for leg in restored.trade_plan] == [
+        leg.to_dict() for leg in agent.trade_plan
+    ]
+
+
+def test_plan_with_inventory_routes_to_remote_market(agent, cities):
+    # Gems sell well only in CityD, two hops away through CityC
+    cities["CityB"].commodities["gems"]["price"] = 90
+    cities["CityC"].connections.append("CityD")
+    cities["CityD"] = MockCity(
+        name="CityD",
+        fee=15,
+        commodities={"gems": {"quantity": 0, "price": 200}},
+        connections=["CityC"],
+    )
+    agent.inventory = {"gems": {"quantity": 10, "avg_buy_price": 100}}
+
+    agent._plan_with_inventory(cities["CityA"], cities)
+
+    assert agent.travel_plan == ("CityC", None)
+
+
+def test_plan_route_uses_projected_money(agent):
+    # With 100 money only food is affordable; the relics bought in CityB with
+    # the food's profit can only be planned with the money projected after it
+    cities = {
+        "CityA": MockCity(
+            name="CityA",
+            fee=5,
+            commodities={
+                "food": {"quantity": 100, "price": 10, "regular_quantity": 100},
+                "relics": {"quantity": 50, "price": 300, "regular_quantity": 100},
+            },
+            connections=["CityB"],
+        ),
+        "CityB": MockCity(
+            name="CityB",
+            fee=5,
+            commodities={
+                "food": {"quantity": 50, "price": 20, "regular_quantity": 100},
+                "relics": {"quantity": 50, "price": 150, "regular_quantity": 100},
+            },
+            connections=["CityA"],
+        ),
+    }
+    agent.money = 100
+    assert agent._choose_trade(cities["CityB"], cities) is None
+
+    agent._plan_and_buy_empty_inventory(cities["CityA"], cities)
+
+    assert agent.inventory["food"]["quantity"] == 8
+    leg = agent.trade_plan[0]
+    assert (leg.origin, leg.item, leg.destination) == ("CityB", "relics", "CityA")
+
+
+def test_replan_on_every_turn(agent, round_trip):
+    agent.factory_map = {"gems": "Mine"}
+    # Any fee change invalidates the plan, and the fees change every turn
+    agent.plan_tolerance = 0
+    stock = {
+        (name, item): details["quantity"]
+        for name, city in round_trip.items()
+        for item, details in city.commodities.items()
+    }
+    for _ in range(6):
+        replans = REPLANS.value
+        agent.take_turn(round_trip)
+        assert REPLANS.value == replans + 1
+
+        # The route goes on from where the bought goods are sold
+        origin = agent.travel_plan[0]
+        assert agent.trade_plan
+        for leg in agent.trade_plan:
+            assert leg.origin == origin
+            origin = leg.destination
+
+        for (name, item), quantity in stock.items():
+            round_trip[name].commodities[item]["quantity"] = quantity
+        for city in round_trip.values():
+            city.fee += 1
+
+    assert agent.money > 1000
@@ -0,0 +1,152 @@
+"""Unit tests for the turn daemon."""
+
+import http.client
+import json
+import os
+import socket
+import stat
+import threading
+from http.server import HTTPServer
+
+import pytest
+
+from nre_ai.daemon import (
+    TurnRequestHandler,
+    UnixHTTPServer,
+    default_socket_path,
+    file_signature,
+    remove_stale_socket,
+)
+
+
+class MockService:
+    def __init__(self):
+        self.turns = 0
+        self.calls = []
+
+    def run_turn(self, skip=False, skip_events=False):
+        self.calls.append((skip, skip_events))
+        self.turns += 1
+        return {"turn": self.turns, "timings": {"total": 0.0}}
+
+    def bot_states(self):
+        return [{"name": "bot0"}]
+
+
+@pytest.fixture
+def server():
+    server = HTTPServer(("127.0.0.1", 0), TurnRequestHandler)
+    server.service = MockService()
+    server.stop_requested = False
+    yield server
+    server.server_close()
+
+
+def request(server, method, path, body=None):
+    thread = threading.Thread(target=server.handle_request)
+    thread.start()
+    connection = http.client.HTTPConnection(*server.server_address)
+    connection.request(method, path, body=body)
+    response = connection.getresponse()
+    payload = json.loads(response.read())
+    connection.close()
+    thread.join()
+    return response.status, payload
+
+
+def test_file_signature(tmp_path):
+    path = tmp_path / "bot0.json"
+    assert file_signature(str(path)) is None
+
+    path.write_text("{}")
+    signature = file_signature(str(path))
+    assert signature[1] == 2
+
+    path.write_text('{"a": 1}')
+    assert file_signature(str(path)) != signature
+
+
+def test_turn_request(server):
+    status, payload = request(server, "POST", "/turn", json.dumps({"skip": True}))
+    assert status == 200
+    assert payload["turn"] == 1
+    assert server.service.calls == [(True, False)]
+
+    status, payload = request(server, "POST", "/turn")
+    assert payload["turn"] == 2
+    assert server.service.calls[-1] == (False, False)
+
+
+def test_status_and_shutdown(server):
+    status, payload = request(server, "GET", "/status")
+    assert status == 200
+    assert payload == {"turns": 0, "bots": [{"name": "bot0"}]}
+
+    request(server, "POST", "/shutdown")
+    assert server.stop_requested
+
+
+def test_unknown_path_and_bad_body(server):
+    status, _ = request(server, "GET", "/nope")
+    assert status == 404
+    status, _ = request(server, "POST", "/turn", "{not json")
+    assert status == 400
+    assert server.service.calls == []
+
+
+def test_non_object_body(server):
+    status, payload = request(server, "POST", "/turn", "[]")
+    assert status == 400
+    assert "object" in payload["error"]
+    assert server.service.calls == []
+
+
+def test_failed_turn_returns_error(server):
+    server.service.run_turn = lambda **kwargs: 1 / 0
+    status, payload = request(server, "POST", "/turn")
+    assert status == 500
+    assert "ZeroDivisionError" in payload["error"]
+
+    # The server keeps serving
+    status, _ = request(server, "GET", "/status")
+    assert status == 200
+
+
+def test_default_socket_path_is_private(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+
+    path = default_socket_path()
+
+    directory = os.path.dirname(path)
+    assert os.path.dirname(directory) == str(tmp_path)
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+
+    os.chmod(directory, 0o755)
+    with pytest.raises(PermissionError):
+        default_socket_path()
+
+
+def test_socket_is_user_only(tmp_path):
+    path = str(tmp_path / "nre-ai.sock")
+    server = UnixHTTPServer(path, TurnRequestHandler)
+    try:
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    finally:
+        server.server_close()
+
+
+def test_remove_stale_socket(tmp_path):
+    path = tmp_path / "nre-ai.sock"
+    remove_stale_socket(str(path))
+
+    path.write_text("not a socket")
+    with pytest.raises(FileExistsError):
+        remove_stale_socket(str(path))
+    assert path.exists()
+
+    path.unlink()
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(str(path))
+    stale.close()
+    remove_stale_socket(str(path))
+    assert not path.exists()
@@ -0,0 +1,66 @@
+"""Unit tests for the evaluation."""
+
+import os
+
+import pytest
+
+from nre_ai.evaluate import RULE_BASED_POLICY, evaluate, run_episodes, summarize
+
+TEST_DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "test_city_data.json")
+
+
+def test_summarize():
+    results = [
+        {"seed": 0, "net_worth": 100.0, "steps": 10, "bankrupt": False},
+        {"seed": 1, "net_worth": 300.0, "steps": 20, "bankrupt": True},
+        {"seed": 2, "net_worth": 200.0, "steps": 30, "bankrupt": False},
+        {"seed": 3, "net_worth": 400.0, "steps": 40, "bankrupt": False},
+    ]
+
+    summary = summarize(results, elapsed=2.0)
+
+    assert summary["episodes"] == 4
+    assert summary["net_worth"]["mean"] == pytest.approx(250.0)
+    assert summary["net_worth"]["median"] == pytest.approx(250.0)
+    low, high = summary["net_worth"]["ci95"]
+    assert low < 250.0 < high
+    assert high - 250.0 == pytest.approx(250.0 - low)
+    assert summary["bankruptcy_rate"] == pytest.approx(0.25)
+    assert summary["steps"] == 100
+    assert summary["steps_per_second"] == pytest.approx(50.0)
+
+
+def test_summarize_empty():
+    summary = summarize([], elapsed=0.0)
+
+    assert summary["episodes"] == 0
+    assert summary["net_worth"]["ci95"] == [0.0, 0.0]
+    assert summary["bankruptcy_rate"] == 0.0
+    assert summary["steps_per_second"] == 0.0
+
+
+def test_run_episodes_start_from_a_pristine_world():
+    with open(TEST_DATA_PATH, "rb") as f:
+        world = f.read()
+
+    # One env plays the episodes one after the other
+    results = run_episodes(
+        RULE_BASED_POLICY, TEST_DATA_PATH, [0, 1, 2], n_envs=1, max_steps=50
+    )
+    again = run_episodes(RULE_BASED_POLICY, TEST_DATA_PATH, [2], n_envs=1, max_steps=50)
+
+    assert [result["seed"] for result in results] == [0, 1, 2]
+    assert again == results[2:]
+    with open(TEST_DATA_PATH, "rb") as f:
+        assert f.read() == world
+
+
+def test_evaluate_is_reproducible():
+    kwargs = {"n_episodes": 4, "n_workers": 2, "n_envs": 2, "max_steps": 50, "seed": 3}
+
+    report = evaluate(RULE_BASED_POLICY, TEST_DATA_PATH, **kwargs)
+    again = evaluate(RULE_BASED_POLICY, TEST_DATA_PATH, **kwargs)
+
+    assert report["episodes"] == 4
+    assert [result["seed"] for result in report["results"]] == [3, 4, 5, 6]
+    assert report["results"] == again["results"]
@@ -0,0 +1,74 @@
+"""Unit tests for the streaming simulation history."""
+
+import numpy as np
+
+from nre_ai.history import HistoryWriter, read_history, read_manifest
+
+
+def test_writer_chunks_and_reads_back(tmp_path):
+    with HistoryWriter(str(tmp_path), chunk_size=4) as writer:
+        for turn in range(1, 11):
+            writer.add(turn, turn * 1.5, turn % 3)
+
+    manifest = read_manifest(str(tmp_path))
+    assert manifest["columns"] == ["Turn", "Money", "Inventory_Count"]
+    assert [entry["rows"] for entry in manifest["chunks"]] == [4, 4, 2]
+
+    history = read_history(str(tmp_path))
+    assert history["Turn"].tolist() == list(range(1, 11))
+    assert history["Money"][-1] == 15.0
+    assert history["Inventory_Count"].tolist() == [turn % 3 for turn in range(1, 11)]
+
+
+def test_flush_appends_to_the_current_chunk(tmp_path):
+    writer = HistoryWriter(str(tmp_path), chunk_size=4, flush_interval=None)
+    for turn in range(3):
+        writer.add(turn, 0, 0)
+        writer.flush()
+    assert [entry["rows"] for entry in read_manifest(str(tmp_path))["chunks"]] == [3]
+    assert read_history(str(tmp_path))["Turn"].tolist() == [0, 1, 2]
+
+    for turn in range(3, 6):
+        writer.add(turn, 0, 0)
+    writer.close()
+
+    assert [entry["rows"] for entry in read_manifest(str(tmp_path))["chunks"]] == [4, 2]
+    assert read_history(str(tmp_path))["Turn"].tolist() == list(range(6))
+
+
+def test_partial_chunks_flushed_periodically(tmp_path):
+    writer = HistoryWriter(str(tmp_path), chunk_size=65536, flush_interval=0.0)
+    writer.add(1, 2, 3)
+
+    # Visible before the chunk is full or the writer closed
+    assert read_history(str(tmp_path))["Money"].tolist() == [2.0]
+
+
+def test_read_history_downsamples_across_chunks(tmp_path):
+    with HistoryWriter(str(tmp_path), columns=("Turn",), chunk_size=7) as writer:
+        for turn in range(100):
+            writer.add(turn)
+
+    history = read_history(str(tmp_path), max_points=10)
+
+    assert history["Turn"].tolist() == list(range(0, 100, 10))
+
+
+def test_new_writer_replaces_old_chunks(tmp_path):
+    with HistoryWriter(str(tmp_path), chunk_size=2) as writer:
+        for turn in range(5):
+            writer.add(turn, 0, 0)
+    with HistoryWriter(str(tmp_path), chunk_size=2) as writer:
+        writer.add(42, 0, 0)
+
+    assert read_history(str(tmp_path))["Turn"].tolist() == [42]
+    assert sorted(p.name for p in tmp_path.glob("*.csv")) == ["chunk_000000.csv"]
+
+
+def test_read_empty_history(tmp_path):
+    HistoryWriter(str(tmp_path)).close()
+
+    history = read_history(str(tmp_path))
+
+    assert all(isinstance(values, np.ndarray) for values in history.values())
+    assert history["Turn"].size == 0
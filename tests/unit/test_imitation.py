@@ -0,0 +1,133 @@
+"""Unit tests for the behavior-cloning warm start."""
+
+import gymnasium as gym
+import numpy as np
+import pytest
+from gymnasium import spaces
+from stable_baselines3 import PPO
+
+from nre_ai.agent import AIAgent
+from nre_ai.imitation import expert_action, iter_demonstrations, pretrain_policy
+from nre_ai.mechanics import SELL_ALL_ACTION
+from nre_ai.trajectory import NO_ACTION, TrajectoryWriter
+
+
+class MockCity:
+    def __init__(self, name, fee, commodities, connections, factory=None):
+        self.name = name
+        self.fee = fee
+        self.commodities = commodities
+        self.connections = connections
+        self.factory = factory if factory else []
+
+
+class ObservationEnv(gym.Env):
+    """Env with the TradingEnv spaces and random observations."""
+
+    def __init__(self):
+        self.observation_space = spaces.Box(low=0, high=1, shape=(37,), dtype=np.float32)
+        self.action_space = spaces.Discrete(21)
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        return self.observation_space.sample(), {}
+
+    def step(self, action):
+        return self.observation_space.sample(), 0.0, False, False, {}
+
+
+def _gems(quantity, price):
+    return {
+        "quantity": quantity,
+        "price": price,
+        "regular_price": 100,
+        "regular_quantity": 100,
+    }
+
+
+@pytest.fixture
+def agent():
+    return AIAgent(
+        name="TestBot", money=1000, initial_city="CityA", factory_map={"gems": "Mine"}
+    )
+
+
+@pytest.fixture
+def cities():
+    return {
+        "CityA": MockCity("CityA", 10, {"gems": _gems(50, 100)}, ["CityB", "CityC"]),
+        "CityB": MockCity("CityB", 20, {"gems": _gems(5, 150)}, ["CityA"]),
+        "CityC": MockCity("CityC", 5, {"gems": _gems(20, 90)}, ["CityA"]),
+    }
+
+
+def test_expert_buys_then_travels(agent, cities):
+    cities["CityA"].factory = ["Mine"]
+
+    # Buys gems and plans to sell them in CityB
+    assert expert_action(agent, cities) == 1
+    assert agent.travel_plan == ("CityB", None)
+
+    # Keeps buying while the planned trade allows it, then travels
+    agent.inventory = {"gems": {"quantity": 9, "avg_buy_price": 100}}
+    agent.money = 100
+    assert expert_action(agent, cities) == 11
+    assert agent.travel_plan is None
+
+
+def test_expert_sells_profitable_inventory(agent, cities):
+    agent.current_city_name = "CityB"
+    agent.inventory = {"gems": {"quantity": 10, "avg_buy_price": 100}}
+
+    assert expert_action(agent, cities) == 6
+
+
+def test_expert_travels_to_best_market(agent, cities):
+    agent.inventory = {"gems": {"quantity": 10, "avg_buy_price": 100}}
+
+    assert expert_action(agent, cities) == 11
+
+
+def test_expert_fallback_travel(agent, cities):
+    cities["CityA"].commodities["gems"]["price"] = 1000
+
+    # CityC (neighbor 1) has the lowest fee
+    assert expert_action(agent, cities) == 12
+
+
+def test_expert_stuck(agent, cities):
+    cities["CityA"].connections = []
+    cities["CityA"].commodities["gems"]["price"] = 1000
+
+    assert expert_action(agent, cities) == SELL_ALL_ACTION
+
+
+def test_iter_demonstrations_skips_unknown_actions(tmp_path):
+    with TrajectoryWriter(str(tmp_path / "world_0000"), obs_dim=37) as writer:
+        writer.add(np.zeros(37), 4, 0.0, False)
+        writer.add(np.zeros(37), NO_ACTION, 0.0, True)
+
+    chunks = list(iter_demonstrations(str(tmp_path)))
+
+    assert [actions.tolist() for _, actions in chunks] == [[4]]
+
+
+def test_pretrain_policy_imitates_expert(tmp_path):
+    rng = np.random.default_rng(0)
+    with TrajectoryWriter(str(tmp_path / "world_0000"), chunk_size=128) as writer:
+        for _ in range(512):
+            writer.add(rng.random(37), 3, 0.0, False)
+
+    model = PPO("MlpPolicy", ObservationEnv(), seed=0)
+    losses = pretrain_policy(model, str(tmp_path), epochs=10, learning_rate=3e-3)
+
+    assert losses[-1] < losses[0]
+    action, _ = model.predict(rng.random(37).astype(np.float32), deterministic=True)
+    assert int(action) == 3
+
+
+def test_pretrain_policy_without_data(tmp_path):
+    model = PPO("MlpPolicy", ObservationEnv(), seed=0)
+
+    with pytest.raises(ValueError, match="No demonstrations"):
+        pretrain_policy(model, str(tmp_path))
@@ -8,6 +8,8 @@ import pytest
 from nre_ai.agent import AIAgent
 from nre_ai.bot_state_processor import BotStateProcessor
 from nre_ai.manager import BotManager
+from nre_ai.metrics import BANKRUPTCIES
+from nre_ai.order_book import OrderBook
 
 
 @pytest.fixture
@@ -100,3 +102,102 @@ def test_run_all_turns_no_bots(mock_processor):
     manager.run_all_turns({})
 
     mock_processor.save_bot_state.assert_not_called()
+
+
+def test_run_all_turns_calls_hooks(mock_processor, mock_agent_factory):
+    """Test that turn hooks wrap every bot turn."""
+    events = []
+
+    class Hook:
+        def before_turn(self, bot, cities):
+            events.append(("before", bot.name))
+
+        def after_turn(self, bot, cities):
+            events.append(("after", bot.name))
+
+    manager = BotManager(processor=mock_processor)
+    manager.add_hook(Hook())
+    bot1 = mock_agent_factory("bot1")
+    bot1.take_turn.side_effect = lambda cities: events.append(("turn", "bot1"))
+    manager.add_bot(bot1)
+
+    manager.run_all_turns({"Miasto": MagicMock()})
+
+    assert events == [("before", "bot1"), ("turn", "bot1"), ("after", "bot1")]
+
+
+def test_run_all_turns_without_saving(mock_processor, mock_agent_factory):
+    """Test that unsaved turns are persisted by save_all."""
+    manager = BotManager(processor=mock_processor)
+    bot1 = mock_agent_factory("bot1")
+    manager.add_bot(bot1)
+
+    manager.run_all_turns({"Miasto": MagicMock()}, save=False)
+    manager.run_all_turns({"Miasto": MagicMock()}, save=False)
+
+    assert bot1.take_turn.call_count == 2
+    mock_processor.save_bot_state.assert_not_called()
+
+    manager.save_all()
+    mock_processor.save_bot_state.assert_called_once_with(bot1.to_dict())
+
+
+def test_run_all_turns_with_order_book(mock_processor):
+    """Test that batched trades do not depend on the bot order."""
+
+    class City:
+        def __init__(self):
+            self.name = "Miasto"
+            self.fee = 10
+            self.connections = []
+            self.commodities = {
+                "gems": {
+                    "price": 10,
+                    "quantity": 10,
+                    "regular_price": 10,
+                    "regular_quantity": 100,
+                }
+            }
+
+    def run(names):
+        cities = {"Miasto": City()}
+        manager = BotManager(processor=mock_processor, order_book=OrderBook())
+        bots = {name: AIAgent(name, 1000, "Miasto", factory_map={}) for name in names}
+        for name in names:
+            manager.add_bot(bots[name])
+        # Both bots want the whole stock
+        for bot in bots.values():
+            bot._choose_trade = lambda city, cities: (50, "gems", "Miasto", 10, 10)
+            bot._plan_route = lambda trade, cities: None
+        manager.run_all_turns(cities)
+        return {name: bot.inventory["gems"]["quantity"] for name, bot in bots.items()}
+
+    assert run(["bot1", "bot2"]) == run(["bot2", "bot1"]) == {"bot1": 5, "bot2": 5}
+    assert mock_processor.save_bot_state.call_count == 4
+
+
+def test_order_book_escrow_is_not_bankruptcy(mock_processor):
+    """Test that hooks and bankruptcy checks see the bots after clearing."""
+    city = MagicMock()
+    city.name = "Miasto"
+    city.commodities = {"gems": {"price": 10, "quantity": 10}}
+    cities = {"Miasto": city}
+
+    manager = BotManager(processor=mock_processor, order_book=OrderBook())
+    bot = AIAgent("bot1", 100, "Miasto", factory_map={})
+    # The bot puts all of its money in escrow
+    bot.take_turn = lambda cities: bot.order_book.buy(bot, city, "gems", 10)
+    manager.add_bot(bot)
+
+    seen = []
+    hook = MagicMock()
+    hook.after_turn.side_effect = lambda bot, cities: seen.append(
+        (bot.money, dict(bot.inventory), bot.is_bankrupt())
+    )
+    manager.add_hook(hook)
+
+    bankruptcies = BANKRUPTCIES.value
+    manager.run_all_turns(cities)
+
+    assert seen == [(0, {"gems": {"quantity": 10, "avg_buy_price": 10.0}}, False)]
+    assert BANKRUPTCIES.value == bankruptcies
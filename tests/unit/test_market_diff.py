@@ -0,0 +1,207 @@
+"""Unit tests for the market diff stream."""
+
+import copy
+
+import pytest
+
+from nre_ai import routing
+from nre_ai.market_diff import (
+    MarketDiffStream,
+    MarketSnapshot,
+    WorldFeed,
+    diff,
+    diff_sections,
+)
+from nre_ai.market_index import MarketIndex
+from nre_ai.routing import RouteCache
+
+
+class MockCity:
+    def __init__(self, name, fee, commodities, connections=None):
+        self.name = name
+        self.fee = fee
+        self.commodities = commodities
+        self.connections = connections or []
+
+
+@pytest.fixture
+def city_data():
+    return [
+        {
+            "name": "CityA",
+            "fee": 10,
+            "commodities": {
+                "gems": {"price": 100, "quantity": 10, "regular_quantity": 100},
+                "food": {"price": 5, "quantity": 50, "regular_quantity": 100},
+            },
+        },
+        {
+            "name": "CityB",
+            "fee": 20,
+            "commodities": {"gems": {"price": 150, "quantity": 5}, "food": None},
+        },
+    ]
+
+
+def to_cities(city_data):
+    return {
+        data["name"]: MockCity(data["name"], data["fee"], data["commodities"])
+        for data in city_data
+    }
+
+
+def test_snapshot(city_data):
+    snapshot = MarketSnapshot.from_city_data(city_data)
+    gems = snapshot.items.index("gems")
+    food = snapshot.items.index("food")
+
+    assert snapshot.names == ["CityA", "CityB"]
+    assert snapshot.fee.tolist() == [10, 20]
+    assert snapshot.price[0, gems] == 100
+    assert snapshot.quantity[1, gems] == 5
+    assert snapshot.price[1, food] != snapshot.price[1, food]  # NaN
+
+
+def test_unchanged_world_has_empty_delta(city_data):
+    delta = diff(
+        MarketSnapshot.from_city_data(city_data),
+        MarketSnapshot.from_cities(to_cities(copy.deepcopy(city_data))),
+    )
+
+    assert len(delta) == 0
+    assert not delta.graph_changed
+
+
+def test_changed_cells_and_fees(city_data):
+    after = copy.deepcopy(city_data)
+    after[0]["commodities"]["gems"]["quantity"] = 3
+    after[1]["commodities"]["gems"]["price"] = 160
+    after[1]["commodities"]["food"] = {"price": 7, "quantity": 1}
+    after[0]["commodities"]["food"] = None
+    after[1]["fee"] = 25
+
+    delta = diff_sections({"cities": city_data, "after": after})
+
+    assert sorted(delta.cells()) == [
+        ("CityA", "food", None, None, None),
+        ("CityA", "gems", 100, 3, 100),
+        ("CityB", "food", 7, 1, None),
+        ("CityB", "gems", 160, 5, None),
+    ]
+    assert list(delta.fees()) == [("CityB", 20, 25)]
+    assert delta.graph_changed
+
+
+def test_added_and_removed_cities(city_data):
+    after = copy.deepcopy(city_data[1:])
+    after.append(
+        {"name": "CityC", "fee": 5, "commodities": {"gems": {"price": 1, "quantity": 1}}}
+    )
+
+    delta = diff(
+        MarketSnapshot.from_city_data(city_data), MarketSnapshot.from_city_data(after)
+    )
+
+    assert delta.added == ["CityC"]
+    assert delta.removed == ["CityA"]
+    assert list(delta.cells()) == [("CityC", "gems", 1, 1, None)]
+    assert list(delta.fees()) == []
+    assert delta.graph_changed
+
+
+def test_stream_updates_subscribers(city_data):
+    stream = MarketDiffStream()
+    index = MarketIndex()
+    routes = RouteCache()
+    deltas = []
+    stream.subscribe(index.on_delta)
+    stream.subscribe(routes.on_delta)
+    stream.subscribe(deltas.append)
+
+    cities = to_cities(city_data)
+    routes.table(cities)
+    stream.push(MarketSnapshot.from_cities(cities))
+
+    # The first push adds every city
+    assert len(deltas[0]) == 3
+    assert index.best_sell("gems", 2) == [("CityB", 150), ("CityA", 100)]
+    assert routes.version is None
+
+    after = copy.deepcopy(city_data)
+    after[0]["commodities"]["gems"]["price"] = 200
+    cities = to_cities(after)
+    routes.table(cities)
+    stream.push(MarketSnapshot.from_cities(cities))
+    index.adopt(cities)
+
+    assert len(deltas[1]) == 1
+    assert index.best_sell("gems") == [("CityA", 200)]
+    assert index.view(cities) is index
+    assert routes.version is not None
+
+    stream.unsubscribe(deltas.append)
+    stream.push(MarketSnapshot([]))
+    assert len(deltas) == 2
+    assert index.best_sell("gems") == []
+
+
+def test_connection_changes_change_the_graph(city_data):
+    after = copy.deepcopy(city_data)
+    after[0]["connections"] = ["CityB"]
+
+    delta = diff(
+        MarketSnapshot.from_city_data(city_data), MarketSnapshot.from_city_data(after)
+    )
+
+    assert len(delta) == 0
+    assert list(delta.fees()) == []
+    assert delta.connection_rows.tolist() == [0]
+    assert delta.graph_changed
+
+
+def test_world_feed(city_data, monkeypatch):
+    index = MarketIndex()
+    routes = RouteCache()
+    feed = WorldFeed(index, routes)
+
+    cities = to_cities(copy.deepcopy(city_data))
+    feed.push(cities)
+    table = routes.table(cities)
+    assert index.best_sell("gems", 2) == [("CityB", 150), ("CityA", 100)]
+
+    # A trade between two pushes is reported with touch()
+    cities["CityB"].commodities["gems"]["quantity"] = 0
+    index.touch(cities["CityB"], "gems")
+
+    # The economy update restores the traded stock and moves a price
+    after = copy.deepcopy(city_data)
+    after[0]["commodities"]["gems"]["price"] = 200
+    cities = to_cities(after)
+
+    def fail(cities):
+        raise AssertionError("hashed")
+
+    monkeypatch.setattr(routing, "graph_version", fail)
+    delta = feed.push(cities)
+
+    assert [cell[:2] for cell in delta.cells()] == [("CityA", "gems")]
+    assert index.best_sell("gems", 2) == [("CityA", 200), ("CityB", 150)]
+    assert index.best_buy("gems", 2) == [("CityB", 150), ("CityA", 200)]
+    assert routes.table(cities) is table
+
+
+def test_world_feed_catches_up_with_other_worlds(city_data):
+    index = MarketIndex()
+    feed = WorldFeed(index, RouteCache())
+    feed.push(to_cities(city_data))
+
+    # Someone else moved the index to another world in between
+    other = copy.deepcopy(city_data)
+    other[1]["commodities"]["gems"]["price"] = 1
+    index.view(to_cities(other))
+
+    after = copy.deepcopy(city_data)
+    after[0]["commodities"]["gems"]["price"] = 200
+    feed.push(to_cities(after))
+
+    assert index.best_sell("gems", 2) == [("CityA", 200), ("CityB", 150)]
@@ -0,0 +1,124 @@
+"""Unit tests for the per-commodity market index."""
+
+import pytest
+
+from nre_ai.market_index import COMPACT_SLACK, MarketIndex
+from nre_ai.mechanics import buy_action, execute_action
+from nre_ai.routing import RouteTable
+from nre_ai.world_fork import SimulatedAgent, WorldFork
+
+
+class MockCity:
+    def __init__(self, name, fee, commodities, connections):
+        self.name = name
+        self.fee = fee
+        self.commodities = commodities
+        self.connections = connections
+
+
+def gems(price, quantity, regular_quantity=100):
+    return {"price": price, "quantity": quantity, "regular_quantity": regular_quantity}
+
+
+@pytest.fixture
+def cities():
+    return {
+        "CityA": MockCity("CityA", 10, {"gems": gems(100, 50), "food": None}, ["CityB"]),
+        "CityB": MockCity("CityB", 20, {"gems": gems(150, 5)}, ["CityA", "CityC"]),
+        "CityC": MockCity("CityC", 30, {"gems": gems(120, 0, 10)}, ["CityB"]),
+    }
+
+
+def test_queries(cities):
+    index = MarketIndex(cities)
+
+    assert index.best_sell("gems", 2) == [("CityB", 150), ("CityC", 120)]
+    assert index.best_buy("gems", 3) == [("CityA", 100), ("CityB", 150)]
+    assert index.scarcest("gems") == [("CityC", 0.0)]
+    assert index.best_sell("food") == []
+
+
+def test_origin_and_reach(cities):
+    index = MarketIndex(cities)
+    routes = RouteTable.build(cities)
+
+    assert index.best_sell("gems", 3, origin="CityB") == [
+        ("CityC", 120),
+        ("CityA", 100),
+    ]
+    # CityC costs 20 + 30 from CityA
+    assert index.best_sell("gems", 3, "CityA", routes, budget=40) == [("CityB", 150)]
+    assert index.best_sell("gems", 3, "CityA", routes, budget=50) == [
+        ("CityB", 150),
+        ("CityC", 120),
+    ]
+
+
+def test_touch_moves_cell(cities):
+    index = MarketIndex(cities)
+    cities["CityA"].commodities["gems"]["price"] = 200
+
+    # Not reported yet
+    assert index.best_sell("gems") == [("CityB", 150)]
+
+    index.touch(cities["CityA"], "gems")
+
+    assert index.best_sell("gems") == [("CityA", 200)]
+    assert index.updates == 4
+
+
+def test_touch_ignores_other_worlds(cities):
+    index = MarketIndex(cities)
+    other = MockCity("CityA", 10, {"gems": gems(999, 1)}, [])
+
+    index.touch(other, "gems")
+
+    assert index.best_sell("gems") == [("CityB", 150)]
+
+
+def test_view_diffs_new_world(cities):
+    index = MarketIndex(cities)
+    updates = index.updates
+    new_world = dict(cities)
+    new_world["CityC"] = MockCity("CityC", 30, {"gems": gems(300, 0, 10)}, ["CityB"])
+    del new_world["CityA"]
+
+    assert index.view(new_world) is index
+
+    # Only the changed cell is moved, CityA is dropped
+    assert index.updates == updates + 1
+    assert index.best_sell("gems", 3) == [("CityC", 300), ("CityB", 150)]
+    assert index.view(new_world) is index
+    assert index.updates == updates + 1
+
+
+def test_mechanics_report_trades(cities, monkeypatch):
+    index = MarketIndex(cities)
+    monkeypatch.setattr("nre_ai.mechanics.MARKETS", index)
+    agent = SimulatedAgent("Bot", 1000, "CityA", {})
+
+    execute_action(buy_action("gems"), agent, cities)
+
+    assert index.scarcest("gems", 3) == [("CityC", 0.0), ("CityB", 0.05), ("CityA", 0.4)]
+
+    # Hypothetical trades leave the index alone
+    execute_action(buy_action("gems"), agent, WorldFork(cities), record=False)
+    assert index.scarcest("gems", 3)[-1] == ("CityA", 0.4)
+
+
+def test_stale_entries_are_dropped(cities):
+    index = MarketIndex(cities)
+    city = cities["CityA"]
+
+    # Back and forth leaves an old entry with the current price behind
+    for price in (200, 100, 200, *range(300, 1000)):
+        city.commodities["gems"]["price"] = price
+        index.touch(city, "gems")
+
+    assert index.best_sell("gems", 3) == [("CityA", 999), ("CityB", 150), ("CityC", 120)]
+    assert index.best_buy("gems", 3) == [("CityB", 150), ("CityA", 999)]
+    # Rebuilt along the way, not one entry per update
+    assert all(
+        len(heap["gems"]) <= 2 * 3 + COMPACT_SLACK for heap in index._heaps.values()
+    )
+    assert index.best_sell("gems", 3) == [("CityA", 999), ("CityB", 150), ("CityC", 120)]
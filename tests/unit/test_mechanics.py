@@ -12,6 +12,8 @@ from nre_ai.mechanics import (
     execute_action,
     get_observation,
     sanitize_city_data,
+    sync_city_quantities,
+    traded_commodities,
 )
 
 
@@ -178,3 +180,74 @@ def test_sanitize_city_data():
     assert details["quantity"] == int(MAX_INVENTORY_QTY)
     assert details["regular_price"] == int(MAX_PRICE)
     assert details["regular_quantity"] == int(MAX_INVENTORY_QTY)
+
+
+def test_sync_city_quantities(cities):
+    cities["CityA"].commodities["gems"]["quantity"] = 3
+    city_data_list = [
+        {
+            "name": "CityA",
+            "commodities": {
+                "gems": {"quantity": 10, "price": 100},
+                "food": None,
+            },
+        },
+        {"name": "Elsewhere", "commodities": {"gems": {"quantity": 7, "price": 1}}},
+    ]
+
+    sync_city_quantities(cities, city_data_list)
+
+    assert city_data_list[0]["commodities"]["gems"] == {"quantity": 3, "price": 100}
+    assert city_data_list[0]["commodities"]["food"] is None
+    assert city_data_list[1]["commodities"]["gems"]["quantity"] == 7
+
+
+def test_sanitize_city_data_cells():
+    bad_data = [
+        {
+            "name": "CityA",
+            "commodities": {"gems": {"price": MAX_PRICE + 1}, "food": None},
+        },
+        {
+            "name": "CityB",
+            "commodities": {
+                "gems": {"price": MAX_PRICE + 1},
+                "food": {"quantity": MAX_INVENTORY_QTY + 1},
+            },
+        },
+    ]
+
+    sanitize_city_data(bad_data, [(1, "food"), (0, "food"), (0, "relics")])
+
+    assert bad_data[1]["commodities"]["food"]["quantity"] == int(MAX_INVENTORY_QTY)
+    # Only the given cells are clamped
+    assert bad_data[0]["commodities"]["gems"]["price"] == MAX_PRICE + 1
+    assert bad_data[1]["commodities"]["gems"]["price"] == MAX_PRICE + 1
+
+
+def test_sync_city_quantities_cells(cities):
+    cities["CityA"].commodities["gems"]["quantity"] = 3
+    cities["CityA"].commodities["food"]["quantity"] = 4
+    city_data_list = [
+        {
+            "name": "CityA",
+            "commodities": {
+                "gems": {"quantity": 10, "price": 100},
+                "food": {"quantity": 10, "price": 10},
+            },
+        }
+    ]
+
+    sync_city_quantities(cities, city_data_list, [(0, "gems")])
+
+    assert city_data_list[0]["commodities"]["gems"]["quantity"] == 3
+    assert city_data_list[0]["commodities"]["food"]["quantity"] == 10
+
+
+def test_traded_commodities(agent):
+    agent.inventory = {"gems": {"quantity": 1}, "food": {"quantity": 2}}
+
+    assert traded_commodities(1, agent) == ["gems"]
+    assert traded_commodities(7, agent) == ["food"]
+    assert traded_commodities(10, agent) == ["gems", "food"]
+    assert traded_commodities(11, agent) == []
@@ -0,0 +1,88 @@
+"""Unit tests for the metrics registry and textfile export."""
+
+import json
+import os
+
+import pytest
+
+from nre_ai.metrics import MetricsRegistry, TextfileExporter
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+def test_counter_inc(registry):
+    counter = registry.counter("trades_total", "Trades.")
+    counter.inc()
+    counter.inc(4)
+
+    assert counter.value == 5
+    # Same name returns the same instance
+    assert registry.counter("trades_total", "Trades.") is counter
+
+
+def test_histogram_buckets(registry):
+    hist = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    hist.observe(0.05)
+    hist.observe(0.1)  # Upper bound is inclusive
+    hist.observe(0.5)
+    hist.observe(10.0)
+
+    assert hist.counts == [2, 1, 1]
+    assert hist.count == 4
+    assert hist.sum == pytest.approx(10.65)
+
+
+def test_to_prometheus(registry):
+    registry.counter("trades_total", "Trades.").inc(3)
+    hist = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    hist.observe(0.05)
+    hist.observe(0.5)
+
+    text = registry.to_prometheus()
+
+    assert "# TYPE trades_total counter" in text
+    assert "trades_total 3" in text
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1.0"} 2' in text  # Cumulative
+    assert 'latency_seconds_bucket{le="+Inf"} 2' in text
+    assert "latency_seconds_count 2" in text
+
+
+def test_write_textfile_json(registry, tmp_path):
+    registry.counter("trades_total", "Trades.").inc()
+
+    path = registry.write_textfile(str(tmp_path), "json")
+
+    with open(path) as f:
+        data = json.load(f)
+    assert data["trades_total"] == {"type": "counter", "value": 1}
+    # No temporary files are left behind
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+
+
+def test_write_textfile_invalid_format(registry, tmp_path):
+    with pytest.raises(ValueError, match="Unsupported"):
+        registry.write_textfile(str(tmp_path), "xml")
+
+
+def test_reset(registry):
+    registry.counter("trades_total", "Trades.").inc()
+    registry.histogram("latency_seconds", "Latency.").observe(0.2)
+
+    registry.reset()
+
+    snapshot = registry.to_dict()
+    assert snapshot["trades_total"]["value"] == 0
+    assert snapshot["latency_seconds"]["count"] == 0
+
+
+def test_exporter_respects_interval(registry, tmp_path):
+    exporter = TextfileExporter(registry, str(tmp_path), interval=3600)
+
+    assert exporter.maybe_export() is True
+    assert exporter.maybe_export() is False
+    assert os.path.exists(tmp_path / "nre_ai.prom")
@@ -0,0 +1,70 @@
+"""Unit tests for the Monte Carlo agent comparison."""
+
+import os
+
+import numpy as np
+import pytest
+
+from nre_ai.monte_carlo import aggregate, compare, distribution, run_simulation
+
+TEST_DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "test_city_data.json")
+
+
+def _run(agent, world, net_worth, bankrupt=False, turns=10):
+    return {
+        "agent": agent,
+        "world": world,
+        "net_worth": net_worth,
+        "bankrupt": bankrupt,
+        "turns": turns,
+    }
+
+
+def test_distribution():
+    stats = distribution([1.0, 2.0, 3.0, 4.0, 5.0])
+
+    assert stats["count"] == 5
+    assert stats["mean"] == pytest.approx(3.0)
+    assert stats["min"] == 1.0
+    assert stats["max"] == 5.0
+    assert stats["p50"] == pytest.approx(3.0)
+    assert stats["p5"] < stats["p25"] < stats["p75"] < stats["p95"]
+
+
+def test_distribution_empty():
+    assert distribution([]) == {"count": 0}
+
+
+def test_aggregate():
+    results = [
+        _run("ai", "a.json", 100.0),
+        _run("ai", "b.json", 300.0, bankrupt=True, turns=4),
+        _run("rl", "a.json", 50.0),
+    ]
+
+    summary = aggregate(results)
+
+    assert summary["agents"]["ai"]["net_worth"]["mean"] == pytest.approx(200.0)
+    assert summary["agents"]["ai"]["bankruptcy_rate"] == pytest.approx(0.5)
+    assert summary["agents"]["ai"]["mean_turns"] == pytest.approx(7.0)
+    assert summary["agents"]["rl"]["net_worth"]["count"] == 1
+    assert set(summary["worlds"]) == {"ai|a.json", "ai|b.json", "rl|a.json"}
+
+
+def test_compare_unknown_agent():
+    with pytest.raises(ValueError, match="Unknown agent type"):
+        compare(["genius"], [TEST_DATA_PATH], 1)
+
+
+def test_run_simulation_leaves_world_untouched():
+    with open(TEST_DATA_PATH) as f:
+        original = f.read()
+    stream = np.random.SeedSequence(0).spawn(1)[0]
+
+    result = run_simulation("ai", TEST_DATA_PATH, stream, turns=3)
+
+    assert result["agent"] == "ai"
+    assert 1 <= result["turns"] <= 3
+    assert result["net_worth"] >= 0
+    with open(TEST_DATA_PATH) as f:
+        assert f.read() == original
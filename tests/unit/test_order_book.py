@@ -0,0 +1,137 @@
+"""Unit tests for the batched order book."""
+
+import itertools
+
+import pytest
+
+from nre_ai.mechanics import buy_action, execute_action, sell_action
+from nre_ai.order_book import OrderBook
+from nre_ai.world_fork import SimulatedAgent
+
+
+class MockCity:
+    def __init__(self, name, commodities):
+        self.name = name
+        self.fee = 10
+        self.commodities = commodities
+        self.connections = []
+
+
+@pytest.fixture
+def city():
+    return MockCity("CityA", {"gems": {"price": 10, "quantity": 10}, "food": None})
+
+
+def bot(name, money=1000, inventory=None):
+    return SimulatedAgent(name, money, "CityA", inventory or {})
+
+
+def test_buy_is_escrowed(city):
+    book = OrderBook()
+    agent = bot("A", money=55)
+
+    assert book.buy(agent, city, "gems", 10) == 5
+    assert agent.money == 5
+    assert agent.inventory == {}
+    assert city.commodities["gems"]["quantity"] == 10
+    assert book.buy(agent, city, "food", 1) == 0
+    assert len(book) == 1
+
+
+def test_fills_when_supply_suffices(city):
+    book = OrderBook()
+    agent = bot("A")
+    book.buy(agent, city, "gems", 4)
+
+    (fill,) = book.clear()
+
+    assert (fill.requested, fill.quantity) == (4, 4)
+    assert agent.inventory == {"gems": {"quantity": 4, "avg_buy_price": 10}}
+    assert agent.money == 960
+    assert city.commodities["gems"]["quantity"] == 6
+    assert len(book) == 0
+
+
+def test_pro_rata_when_short(city):
+    book = OrderBook()
+    agents = [bot("A"), bot("B"), bot("C")]
+    for agent, wanted in zip(agents, [10, 5, 5], strict=True):
+        book.buy(agent, city, "gems", wanted)
+
+    fills = book.clear()
+
+    # 10 units for 20 wanted: half each
+    assert [fill.quantity for fill in fills] == [5, 3, 2]
+    assert city.commodities["gems"]["quantity"] == 0
+    # Unfilled units are refunded
+    assert [agent.money for agent in agents] == [950, 970, 980]
+
+
+def test_sells_supply_the_buys(city):
+    book = OrderBook()
+    seller = bot("S", money=0, inventory={"gems": {"quantity": 7, "avg_buy_price": 5}})
+    buyer = bot("B")
+
+    assert book.sell(seller, city, "gems", 100) == 7
+    assert seller.inventory == {}
+    book.buy(buyer, city, "gems", 20)
+    book.clear()
+
+    assert seller.money == 70
+    assert buyer.inventory["gems"]["quantity"] == 17
+    assert city.commodities["gems"]["quantity"] == 0
+
+
+def test_clearing_is_order_independent(city):
+    wanted = {"A": 7, "B": 7, "C": 3}
+    outcomes = set()
+    for names in itertools.permutations(wanted):
+        world = MockCity("CityA", {"gems": {"price": 10, "quantity": 10}})
+        book = OrderBook()
+        for name in names:
+            book.buy(bot(name), world, "gems", wanted[name])
+        fills = book.clear()
+        outcomes.add(tuple(sorted((fill.agent.name, fill.quantity) for fill in fills)))
+
+    assert outcomes == {(("A", 4), ("B", 4), ("C", 2))}
+
+
+def test_execute_action_submits_to_book(city):
+    book = OrderBook()
+    agent = bot("A", inventory={"gems": {"quantity": 3, "avg_buy_price": 5}})
+
+    execute_action(sell_action("gems"), agent, {"CityA": city}, book=book)
+    execute_action(buy_action("gems"), agent, {"CityA": city}, book=book)
+
+    assert len(book) == 2
+    assert agent.inventory == {}
+    book.clear()
+    assert agent.inventory["gems"]["quantity"] == 10
+    assert city.commodities["gems"]["quantity"] == 3
+
+
+def test_fractional_stock_and_sells_keep_their_fractions():
+    world = MockCity("CityA", {"gems": {"price": 10, "quantity": 2.5}})
+    book = OrderBook()
+    seller = bot("S", money=0, inventory={"gems": {"quantity": 1.25, "avg_buy_price": 5}})
+    buyer = bot("B")
+
+    assert book.sell(seller, world, "gems", 5) == 1.25
+    book.buy(buyer, world, "gems", 5)
+    fills = book.clear()
+
+    # 3.75 units in stock: 3 whole units are bought, the fraction stays
+    assert [fill.quantity for fill in fills] == [-1.25, 3]
+    assert world.commodities["gems"]["quantity"] == 0.75
+    assert buyer.inventory["gems"]["quantity"] == 3
+    assert buyer.money == 970
+    assert seller.money == 12.5
+
+
+def test_integer_stock_stays_integer(city):
+    book = OrderBook()
+    book.buy(bot("A"), city, "gems", 4)
+    book.clear()
+
+    assert city.commodities["gems"]["quantity"] == 6
+    assert isinstance(city.commodities["gems"]["quantity"], int)
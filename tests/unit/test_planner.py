@@ -0,0 +1,121 @@
+"""Unit tests for the MCTS planner."""
+
+import copy
+from time import perf_counter
+
+import pytest
+
+from nre_ai.mechanics import TRAVEL_ACTION_OFFSET, buy_action, sell_action
+from nre_ai.planner import MCTSPlanner, PlanningAgent, is_travel, legal_actions
+
+
+class MockCity:
+    def __init__(self, name, fee, commodities, connections):
+        self.name = name
+        self.fee = fee
+        self.commodities = commodities
+        self.connections = connections
+        self.factory = []
+
+
+@pytest.fixture
+def cities():
+    # Metal is cheap in CityA and expensive in CityB, CityC is a dead end
+    return {
+        "CityA": MockCity(
+            "CityA",
+            5,
+            {
+                "metal": {"price": 10, "quantity": 100},
+                "gems": {"price": 500, "quantity": 1},
+            },
+            ["CityB", "CityC"],
+        ),
+        "CityB": MockCity(
+            "CityB",
+            5,
+            {"metal": {"price": 40, "quantity": 10}, "gems": None},
+            ["CityA"],
+        ),
+        "CityC": MockCity("CityC", 5, {"metal": {"price": 8, "quantity": 0}}, ["CityA"]),
+    }
+
+
+def snapshot(cities):
+    return copy.deepcopy({name: city.commodities for name, city in cities.items()})
+
+
+def test_legal_actions(cities):
+    agent = PlanningAgent("Bot", 100, "CityA")
+    assert legal_actions(agent, cities) == [
+        buy_action("metal"),
+        TRAVEL_ACTION_OFFSET,
+        TRAVEL_ACTION_OFFSET + 1,
+    ]
+
+    agent.inventory = {"metal": {"quantity": 10, "avg_buy_price": 10}}
+    agent.current_city_name = "CityB"
+    agent.money = 1
+    assert legal_actions(agent, cities) == [sell_action("metal")]
+
+
+def test_plan_buys_then_travels_to_the_better_market(cities):
+    agent = PlanningAgent("Bot", 200, "CityA")
+    planner = MCTSPlanner(budget_ms=50, seed=0)
+    before = snapshot(cities)
+
+    actions = planner.plan(agent, cities)
+
+    assert actions[0] == buy_action("metal")
+    assert actions[-1] == TRAVEL_ACTION_OFFSET
+    assert is_travel(actions[-1])
+    assert not any(is_travel(action) for action in actions[:-1])
+    assert snapshot(cities) == before
+    assert agent.money == 200
+    assert planner.iterations > 0
+
+
+def test_plan_respects_budget(cities):
+    agent = PlanningAgent("Bot", 100, "CityA")
+    planner = MCTSPlanner(budget_ms=5, seed=0)
+    start = perf_counter()
+    planner.plan(agent, cities)
+    # One iteration may finish after the deadline, but not much later
+    assert perf_counter() - start < 0.05
+
+
+def test_take_turn_plays_plan_and_reuses_tree(cities):
+    agent = PlanningAgent("Bot", 200, "CityA", planner=MCTSPlanner(budget_ms=50, seed=0))
+
+    agent.take_turn(cities)
+    assert agent.current_city_name == "CityB"
+    assert agent.turn_actions[-1] == TRAVEL_ACTION_OFFSET
+    assert agent.last_action == TRAVEL_ACTION_OFFSET
+    assert "metal" in agent.inventory
+
+    agent.take_turn(cities)
+    assert agent.planner.reused
+    assert agent.turn_actions[0] == sell_action("metal")
+    assert agent.money > 200
+
+
+def test_tree_dropped_when_bot_leaves_the_branch(cities):
+    agent = PlanningAgent("Bot", 200, "CityA", planner=MCTSPlanner(budget_ms=20, seed=0))
+    agent.take_turn(cities)
+    # Moved by something else than the plan
+    agent.current_city_name = "CityC"
+    agent.planner.plan(agent, cities)
+    assert not agent.planner.reused
+
+
+def test_from_dict_keeps_planner():
+    agent = PlanningAgent.from_dict(
+        {"name": "Bot", "zloto": 50, "current_city": "CityA", "inventory_full": {}}
+    )
+    assert isinstance(agent, PlanningAgent)
+    assert isinstance(agent.planner, MCTSPlanner)
+
+
+def test_does_not_use_the_world_index():
+    # run() moves MARKETS and ROUTES along the worlds only for bots that read them
+    assert not PlanningAgent.uses_world_index
@@ -0,0 +1,90 @@
+"""Unit tests for the phase profiler."""
+
+import json
+import time
+
+import pytest
+
+from nre_ai.profiling import (
+    PhaseProfiler,
+    measure_imports,
+    parse_importtime,
+    write_report,
+)
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       353 |        353 |   _io
+import time:      1120 |       1473 | _frozen_importlib_external
+import time:       106 |        106 |     _codecs
+import time:       943 |       1049 |   codecs
+import time:       819 |       2515 | encodings
+"""
+
+
+def test_phases_accumulate():
+    profiler = PhaseProfiler()
+    for _ in range(2):
+        with profiler.phase("events"):
+            time.sleep(0.01)
+    profiler.add("imports", 0.5, 0.25)
+
+    report = profiler.report()
+    assert report["phases"]["events"]["calls"] == 2
+    assert report["phases"]["events"]["wall"] >= 0.02
+    assert report["phases"]["imports"] == {"calls": 1, "wall": 0.5, "cpu": 0.25}
+    assert list(report["phases"]) == ["events", "imports"]
+    assert report["total"]["wall"] >= 0.02
+
+
+def test_phase_recorded_on_error():
+    profiler = PhaseProfiler()
+    with pytest.raises(ValueError), profiler.phase("process_changes"):
+        raise ValueError
+    assert profiler.phases["process_changes"]["calls"] == 1
+
+
+def test_parse_importtime():
+    imports = parse_importtime(IMPORTTIME_OUTPUT)
+    assert [entry["module"] for entry in imports] == [
+        "encodings",
+        "_frozen_importlib_external",
+        "codecs",
+        "_io",
+        "_codecs",
+    ]
+    assert imports[0] == {
+        "module": "encodings",
+        "self_us": 819,
+        "cumulative_us": 2515,
+        "depth": 0,
+    }
+    assert {entry["module"]: entry["depth"] for entry in imports}["_codecs"] == 2
+
+
+def test_measure_imports():
+    imports = measure_imports("json", top=3)
+    assert imports["module"] == "json"
+    assert imports["cumulative_us"] > 0
+    assert len(imports["top"]) <= 3
+
+
+def test_measure_imports_failure():
+    with pytest.raises(RuntimeError):
+        measure_imports("nre_ai_no_such_module")
+
+
+def test_write_report(tmp_path):
+    profiler = PhaseProfiler()
+    with profiler.phase("needed_managers"):
+        pass
+
+    path = write_report(
+        str(tmp_path / "reports" / "profile.json"), profiler, extra={"turns": 3}
+    )
+    with open(path) as f:
+        report = json.load(f)
+    assert report["turns"] == 3
+    assert report["phases"]["needed_managers"]["calls"] == 1
+    assert report["imports"] is None
+    assert "python" in report
@@ -102,3 +102,23 @@ def test_from_dict_missing_path(mock_ppo):
     }
     with pytest.raises(ValueError):
         RLAgent.from_dict(data)
+
+
+def test_initialization_with_loaded_model(mock_ppo):
+    model = MagicMock()
+
+    agent = RLAgent("Bot1", 1000, "CityA", "dummy_path.zip", model=model)
+
+    assert agent.model is model
+    mock_ppo.load.assert_not_called()
+
+
+def test_from_dict_default_model_path(mock_ppo):
+    model = MagicMock()
+    data = {"name": "Bot1", "zloto": 1000, "current_city": "CityA"}
+
+    agent = RLAgent.from_dict(data, "fallback.zip", model=model)
+
+    assert agent.model_path == "fallback.zip"
+    assert agent.model is model
+    mock_ppo.load.assert_not_called()
@@ -0,0 +1,184 @@
+"""Unit tests for the cheapest-route table."""
+
+import math
+
+import pytest
+
+from nre_ai import routing
+from nre_ai.routing import RouteCache, RouteTable, dijkstra, graph_version
+
+
+class MockCity:
+    def __init__(self, name, fee, connections):
+        self.name = name
+        self.fee = fee
+        self.commodities = {}
+        self.connections = connections
+
+
+@pytest.fixture
+def cities():
+    return {
+        "CityA": MockCity("CityA", 5, ["CityB", "CityC"]),
+        "CityB": MockCity("CityB", 10, ["CityA", "CityC"]),
+        "CityC": MockCity("CityC", 50, ["CityB"]),
+        "CityD": MockCity("CityD", 1, ["CityA"]),
+    }
+
+
+def test_dijkstra_charges_destination_fees():
+    adjacency = [[1, 2], [2], []]
+    fees = [0.0, 10.0, 1.0]
+
+    cost, first = dijkstra(0, adjacency, fees)
+
+    assert cost.tolist() == [0.0, 10.0, 1.0]
+    assert first.tolist() == [-1, 1, 2]
+
+
+def test_table_finds_cheapest_route(cities):
+    table = RouteTable.build(cities)
+
+    assert table.distance("CityA", "CityC") == 50
+    assert table.next_hop("CityA", "CityC") == "CityC"
+    assert table.distance("CityC", "CityA") == 15
+    assert table.next_hop("CityC", "CityA") == "CityB"
+
+
+def test_multi_hop_path(cities):
+    cities["CityC"].fee = 3
+    cities["CityA"].connections = ["CityB"]
+
+    table = RouteTable.build(cities)
+
+    assert table.distance("CityA", "CityC") == 13
+    assert table.next_hop("CityA", "CityC") == "CityB"
+    assert table.path("CityA", "CityC") == ["CityB", "CityC"]
+    assert table.path("CityA", "CityA") == []
+
+
+def test_unreachable_city(cities):
+    table = RouteTable.build(cities)
+
+    # Nothing connects to CityD
+    assert math.isinf(table.distance("CityA", "CityD"))
+    assert table.next_hop("CityA", "CityD") is None
+    assert table.path("CityA", "CityD") == []
+    assert table.distance("CityD", "CityB") == 15
+
+
+def test_within_budget(cities):
+    table = RouteTable.build(cities)
+
+    assert dict(table.within("CityA", 10)) == {"CityA": 0.0, "CityB": 10.0}
+
+
+def test_process_pool_matches_inline(cities):
+    inline = RouteTable.build(cities, n_workers=1)
+    pooled = RouteTable.build(cities, n_workers=2)
+    searches = inline.searches, pooled.searches
+
+    assert pooled.names == inline.names
+    for origin in cities:
+        for destination in cities:
+            assert pooled.distance(origin, destination) == inline.distance(
+                origin, destination
+            )
+            assert pooled.next_hop(origin, destination) == inline.next_hop(
+                origin, destination
+            )
+    # Every origin was routed up front
+    assert (inline.searches, pooled.searches) == searches
+
+
+def test_build_refuses_big_maps(cities, monkeypatch):
+    monkeypatch.setattr(routing, "ALL_PAIRS_MAX_CITIES", 3)
+    with pytest.raises(ValueError, match="too many"):
+        RouteTable.build(cities)
+
+
+def test_lazy_table_searches_per_origin_within_budget(cities):
+    table = RouteTable(cities)
+    assert table.searches == 0
+
+    # The search from CityA stops at the budget and is kept
+    assert table.distance("CityA", "CityB", 10) == 10
+    assert math.isinf(table.distance("CityA", "CityC", 10))
+    assert table.next_hop("CityA", "CityB") == "CityB"
+    assert table.searches == 1
+
+    # CityC lies beyond the budget searched so far
+    assert table.next_hop("CityA", "CityC") == "CityC"
+    assert table.distance("CityA", "CityC") == 50
+    assert table.searches == 2
+
+
+def test_lazy_table_keeps_recent_origins(cities):
+    table = RouteTable(cities, max_rows=2)
+    for origin in ("CityA", "CityB", "CityC"):
+        table.distance(origin, "CityA")
+    assert table.searches == 3
+
+    table.distance("CityC", "CityB")
+    assert table.searches == 3
+    # CityA was dropped
+    table.distance("CityA", "CityB")
+    assert table.searches == 4
+
+
+def test_cache_rebuilds_when_fees_change(cities):
+    cache = RouteCache()
+    table = cache.table(cities)
+
+    assert cache.table(cities) is table
+    assert cache.builds == 1
+
+    # A new dict of the same graph is hashed but not routed again
+    assert cache.table(dict(cities)) is table
+    assert cache.builds == 1
+
+    version = graph_version(cities)
+    cities["CityC"].fee = 1
+    assert graph_version(cities) != version
+
+    table = cache.table(dict(cities))
+    assert cache.builds == 2
+    assert table.distance("CityA", "CityC") == 1
+
+    cache.invalidate()
+    assert cache.table(cities) is not table
+    assert cache.builds == 3
+
+
+def test_cache_needs_invalidate_after_in_place_changes(cities):
+    cache = RouteCache()
+    assert cache.table(cities).distance("CityA", "CityC") == 50
+
+    # The followed dict is trusted, its table goes stale
+    cities["CityC"].fee = 1
+    assert cache.table(cities).distance("CityA", "CityC") == 50
+
+    cache.invalidate()
+    assert cache.table(cities).distance("CityA", "CityC") == 1
+
+
+def test_cache_trusts_the_followed_dict(cities, monkeypatch):
+    cache = RouteCache()
+    table = cache.table(cities)
+
+    def fail(cities):
+        raise AssertionError("hashed")
+
+    monkeypatch.setattr(routing, "graph_version", fail)
+    assert cache.table(cities) is table
+
+    # Adopted after a delta without graph changes, a new dict is not hashed
+    world = dict(cities)
+    cache.adopt(world, cities)
+    assert cache.table(world) is table
+    assert cache.builds == 1
+
+    # A delta from a world the table is not of is no reason to trust
+    cache.adopt(dict(cities), cities)
+    with pytest.raises(AssertionError, match="hashed"):
+        cache.table(dict(cities))
@@ -0,0 +1,84 @@
+"""Unit tests for the scenario bank."""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from nre_ai.mechanics import COMMODITIES, MAX_INVENTORY_QTY, MAX_PRICE
+from nre_ai.scenario_bank import ScenarioBank, build_scenario_bank
+
+TEST_DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "test_city_data.json")
+
+
+@pytest.fixture
+def bank_path(tmp_path):
+    path = str(tmp_path / "bank.npy")
+    build_scenario_bank(TEST_DATA_PATH, path, 20, seed=1)
+    return path
+
+
+@pytest.fixture
+def world_data():
+    with open(TEST_DATA_PATH) as f:
+        return json.load(f)
+
+
+def test_build_scenario_bank(bank_path, world_data):
+    bank = ScenarioBank(bank_path)
+
+    n_cities = len(world_data["after"])
+    assert len(bank) == 20
+    assert bank.city_names == [city["name"] for city in world_data["after"]]
+    assert bank[0]["price"].shape == (n_cities, len(COMMODITIES))
+    assert isinstance(bank.scenarios, np.memmap)
+
+
+def test_scenarios_are_clamped_and_valid(bank_path, world_data):
+    bank = ScenarioBank(bank_path)
+    connected = {i for i, city in enumerate(world_data["after"]) if city["connections"]}
+
+    for scenario in bank.scenarios:
+        assert np.nanmax(scenario["price"]) <= MAX_PRICE
+        assert np.nanmax(scenario["quantity"]) <= MAX_INVENTORY_QTY
+        assert np.nanmin(scenario["quantity"]) >= 0
+        assert int(scenario["start_city"]) in connected
+        assert 500 <= scenario["money"] <= 5000
+
+
+def test_build_is_seeded(tmp_path):
+    first = str(tmp_path / "first.npy")
+    second = str(tmp_path / "second.npy")
+    build_scenario_bank(TEST_DATA_PATH, first, 5, seed=3)
+    build_scenario_bank(TEST_DATA_PATH, second, 5, seed=3)
+
+    with open(first, "rb") as f, open(second, "rb") as g:
+        assert f.read() == g.read()
+
+
+def test_build_invalid_count(tmp_path):
+    with pytest.raises(ValueError, match="positive"):
+        build_scenario_bank(TEST_DATA_PATH, str(tmp_path / "bank.npy"), 0)
+
+
+def test_apply(bank_path, world_data):
+    bank = ScenarioBank(bank_path)
+    city_data_list = world_data["after"]
+    rows = bank.row_order(city_data_list)
+    scenario = bank[3]
+
+    bank.apply(scenario, city_data_list, rows)
+
+    for city_data, row in zip(city_data_list, rows, strict=True):
+        for col, item in enumerate(COMMODITIES):
+            details = city_data["commodities"][item]
+            assert details["price"] == scenario["price"][row, col]
+            assert details["quantity"] == scenario["quantity"][row, col]
+
+
+def test_row_order_other_world(bank_path):
+    bank = ScenarioBank(bank_path)
+
+    with pytest.raises(ValueError, match="another world"):
+        bank.row_order([{"name": "Nowhere", "commodities": {}}])
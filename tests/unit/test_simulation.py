@@ -0,0 +1,46 @@
+"""Unit tests for the scratch world."""
+
+import json
+import os
+import shutil
+
+import pytest
+
+from nre_ai.simulation import ScratchWorld
+
+TEST_DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "test_city_data.json")
+
+
+@pytest.fixture
+def world_path(tmp_path):
+    path = tmp_path / "miasta.json"
+    shutil.copy(TEST_DATA_PATH, path)
+    return path
+
+
+def test_world_file_written_only_on_checkpoint(world_path, tmp_path):
+    original = world_path.read_text()
+    world = ScratchWorld(str(world_path), scratch_dir=str(tmp_path))
+
+    world.update_economy()
+    world.update_economy()
+    assert world_path.read_text() == original
+    assert world.updates_since_checkpoint == 2
+
+    world.checkpoint()
+    assert world.updates_since_checkpoint == 0
+    with open(world_path) as f:
+        data = json.load(f)
+    assert [city["name"] for city in data["after"]] == list(world.cities)
+    world.close()
+
+
+def test_close_persists_and_cleans_up(world_path, tmp_path):
+    with ScratchWorld(str(world_path), scratch_dir=str(tmp_path)) as world:
+        world.update_economy()
+        scratch_path = world.scratch_path
+        expected = json.loads(json.dumps(world.json_manager.data))
+
+    assert not os.path.exists(scratch_path)
+    with open(world_path) as f:
+        assert json.load(f) == expected
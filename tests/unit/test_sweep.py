@@ -0,0 +1,47 @@
+"""Unit tests for the hyperparameter sweep helpers."""
+
+import numpy as np
+import pytest
+
+from nre_ai.sweep import (
+    ENT_COEF_RANGE,
+    LEARNING_RATE_RANGE,
+    MAX_LOCAL_ACTIONS_CHOICES,
+    N_STEPS_CHOICES,
+    run_sweep,
+    sample_params,
+    select_survivors,
+)
+
+
+def test_sample_params_ranges():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        params = sample_params(rng)
+        assert ENT_COEF_RANGE[0] <= params["ent_coef"] <= ENT_COEF_RANGE[1]
+        assert LEARNING_RATE_RANGE[0] <= params["learning_rate"] <= LEARNING_RATE_RANGE[1]
+        assert params["n_steps"] in N_STEPS_CHOICES
+        assert params["max_local_actions"] in MAX_LOCAL_ACTIONS_CHOICES
+
+
+def test_sample_params_is_seeded():
+    first = sample_params(np.random.default_rng(5))
+    second = sample_params(np.random.default_rng(5))
+    assert first == second
+
+
+def test_select_survivors():
+    scores = {0: 10.0, 1: 50.0, 2: 30.0, 3: 20.0, 4: 40.0, 5: 0.0}
+
+    assert select_survivors(scores, eta=3) == [1, 4]
+    assert select_survivors(scores, eta=2) == [1, 4, 2]
+
+
+def test_select_survivors_keeps_one():
+    assert select_survivors({7: 1.0, 8: 2.0}, eta=3) == [8]
+
+
+@pytest.mark.parametrize(("n_trials", "eta"), [(0, 3), (9, 1)])
+def test_run_sweep_invalid_arguments(tmp_path, n_trials, eta):
+    with pytest.raises(ValueError):
+        run_sweep("world.json", str(tmp_path), n_trials=n_trials, eta=eta)
@@ -1,10 +1,12 @@
 """Unit tests for TradingEnv."""
 
+import json
 from unittest.mock import MagicMock, patch
 
 import numpy as np
 import pytest
 
+from nre_ai.scenario_bank import ScenarioBank, build_scenario_bank
 from nre_ai.trading_env import TradingEnv
 
 
@@ -133,3 +135,74 @@ def test_max_steps_truncation(mock_dependencies):
 
         _, _, _, truncated, _ = env.step(0)
         assert truncated is True
+
+
+def test_reset_from_scenario_bank(mock_dependencies, tmp_path):
+    mock_json, _ = mock_dependencies
+    city = {
+        "name": "CityA",
+        "fee": 10,
+        "connections": [],
+        "commodities": {
+            "metal": {
+                "quantity": 50.0,
+                "price": 40.0,
+                "regular_price": 40.0,
+                "regular_quantity": 50.0,
+            },
+        },
+    }
+    world_path = tmp_path / "world.json"
+    world_path.write_text(json.dumps({"cities": [city], "after": [city]}))
+    bank_path = str(tmp_path / "bank.npy")
+    build_scenario_bank(str(world_path), bank_path, 4, seed=0)
+    mock_json.return_value.data = json.loads(world_path.read_text())
+
+    env = TradingEnv("dummy_path.json", scenario_bank_path=bank_path)
+    env.city_processor.process_changes.reset_mock()
+
+    obs, info = env.reset(seed=1)
+
+    scenario = ScenarioBank(bank_path)[info["scenario"]]
+    assert obs.shape == (37,)
+    assert info["scenario_seed"] == int(scenario["seed"])
+    # The scenario is copied in, no economy update or file I/O is needed
+    env.city_processor.process_changes.assert_not_called()
+    assert env.agent.current_city_name == "CityA"
+    assert env.agent.money == float(scenario["money"])
+    assert env.prev_net_worth == float(scenario["money"])
+    for key in ("cities", "after"):
+        details = mock_json.return_value.data[key][0]["commodities"]["metal"]
+        assert details["quantity"] == scenario["quantity"][0, 0]
+        assert details["price"] == scenario["price"][0, 0]
+
+
+def test_economy_update_sanitizes_the_world(mock_dependencies):
+    env = TradingEnv("dummy_path.json")
+    env.max_local_actions = 1
+    env.cities["CityA"].commodities = {"gems": {"price": 1, "quantity": 5}}
+    after = [
+        {
+            "name": "CityA",
+            "commodities": {
+                "gems": {"price": 5000, "quantity": 5},
+                "food": {"price": 1, "quantity": 5000},
+            },
+        }
+    ]
+    env.json_manager.data = {"after": after}
+    seen = []
+
+    def economy():
+        seen.append(after[0]["commodities"]["food"]["quantity"])
+        after[0]["commodities"]["food"]["quantity"] = 7000
+
+    env.city_processor.process_changes.side_effect = economy
+
+    env.step(1)  # Buy gems
+    env.step(11)  # Nowhere to travel, another update
+
+    # The traded cell is synced and every cell is clamped before each update,
+    # also what the previous update wrote
+    assert after[0]["commodities"]["gems"] == {"price": 1000, "quantity": 0}
+    assert seen == [1000, 1000]
@@ -0,0 +1,72 @@
+"""Unit tests for the training helpers."""
+
+import random
+
+import numpy as np
+import torch as th
+
+from nre_ai import train
+from nre_ai.train import latest_checkpoint, load_rng_state, save_rng_state
+
+
+def test_latest_checkpoint(tmp_path):
+    for steps in (2048, 10240, 4096):
+        (tmp_path / f"bot_{steps}.zip").touch()
+    (tmp_path / "bot_10240_rng.pkl").touch()
+    (tmp_path / "other_99999.zip").touch()
+
+    assert latest_checkpoint(str(tmp_path), "bot") == str(tmp_path / "bot_10240")
+
+
+def test_latest_checkpoint_missing(tmp_path):
+    assert latest_checkpoint(str(tmp_path), "bot") is None
+    assert latest_checkpoint(str(tmp_path / "nowhere"), "bot") is None
+
+
+def test_rng_state_roundtrip(tmp_path):
+    path = str(tmp_path / "rng.pkl")
+    random.seed(1)
+    np.random.seed(1)
+    th.manual_seed(1)
+    save_rng_state(path)
+    expected = (random.random(), np.random.rand(), th.rand(1).item())
+
+    random.seed(2)
+    np.random.seed(2)
+    th.manual_seed(2)
+    load_rng_state(path)
+
+    assert (random.random(), np.random.rand(), th.rand(1).item()) == expected
+
+
+def _fake_warm_start(monkeypatch, tmp_path):
+    calls = {}
+
+    def collect(world_paths, directory, episodes_per_world, n_workers, **kwargs):
+        calls.update(worlds=world_paths, episodes=episodes_per_world, workers=n_workers)
+        return 0
+
+    monkeypatch.setattr(train, "DEMONSTRATIONS_DIR", str(tmp_path / "demos"))
+    monkeypatch.setattr(train, "collect_demonstrations", collect)
+    monkeypatch.setattr(train, "pretrain_policy", lambda *args, **kwargs: [0.0])
+    return calls
+
+
+def test_warm_start_spreads_one_world_over_the_pool(monkeypatch, tmp_path):
+    calls = _fake_warm_start(monkeypatch, tmp_path)
+
+    train.warm_start(None, episodes=10, n_workers=4)
+
+    assert calls["worlds"] == [train.SOURCE_DATA_PATH] * 4
+    assert calls["episodes"] == 3
+    assert calls["workers"] == 4
+
+
+def test_warm_start_splits_episodes_over_worlds(monkeypatch, tmp_path):
+    calls = _fake_warm_start(monkeypatch, tmp_path)
+    worlds = [f"world_{i}.json" for i in range(6)]
+
+    train.warm_start(None, episodes=12, world_paths=worlds, n_workers=2)
+
+    assert calls["worlds"] == worlds
+    assert calls["episodes"] == 2
@@ -0,0 +1,199 @@
+"""Unit tests for the trajectory recorder."""
+
+import gymnasium as gym
+import numpy as np
+import pytest
+from gymnasium import spaces
+
+from nre_ai.trajectory import (
+    NO_ACTION,
+    TrajectoryRecorder,
+    TrajectoryWriter,
+    TurnRecorder,
+    iter_shards,
+    read_manifest,
+)
+
+
+class CountingEnv(gym.Env):
+    """Env whose observation is the step counter, done after 3 steps."""
+
+    def __init__(self):
+        self.observation_space = spaces.Box(low=0, high=10, shape=(2,), dtype=np.float32)
+        self.action_space = spaces.Discrete(4)
+        self.t = 0
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        self.t = 0
+        return np.full(2, self.t, dtype=np.float32), {}
+
+    def step(self, action):
+        self.t += 1
+        obs = np.full(2, self.t, dtype=np.float32)
+        return obs, float(action), self.t >= 3, False, {}
+
+
+class MockAgent:
+    def __init__(self, money=100):
+        self.name = "bot0"
+        self.money = money
+        self.current_city_name = "CityA"
+        self.inventory = {}
+        self.last_action = None
+
+    def is_bankrupt(self):
+        return self.money <= 0 and not self.inventory
+
+
+class MockCity:
+    def __init__(self, name, fee, commodities, connections):
+        self.name = name
+        self.fee = fee
+        self.commodities = commodities
+        self.connections = connections
+
+
+def _concat(directory):
+    shards = list(iter_shards(directory))
+    return {key: np.concatenate([s[key] for s in shards]) for key in shards[0]}
+
+
+@pytest.mark.parametrize("shard_format", ["npz", "memmap"])
+def test_writer_chunks_and_reads_back(tmp_path, shard_format):
+    writer = TrajectoryWriter(
+        str(tmp_path), obs_dim=2, chunk_size=4, shard_format=shard_format
+    )
+    for i in range(10):
+        writer.add(np.full(2, i), i, i * 0.5, i == 9)
+    writer.close()
+
+    manifest = read_manifest(str(tmp_path))
+    assert [entry["size"] for entry in manifest] == [4, 4, 2]
+
+    data = _concat(str(tmp_path))
+    assert data["obs"][:, 0].tolist() == list(range(10))
+    assert data["actions"].tolist() == list(range(10))
+    assert data["rewards"][-1] == pytest.approx(4.5)
+    assert data["dones"].tolist() == [False] * 9 + [True]
+
+
+@pytest.mark.parametrize("shard_format", ["npz", "memmap"])
+def test_writer_fills_the_last_shard_of_a_directory(tmp_path, shard_format):
+    kwargs = {"obs_dim": 2, "chunk_size": 3, "shard_format": shard_format}
+    for i in range(4):
+        with TrajectoryWriter(str(tmp_path), **kwargs) as writer:
+            writer.add(np.full(2, i), i, float(i), False)
+
+    manifest = read_manifest(str(tmp_path))
+    assert [entry["shard"] for entry in manifest] == ["shard_000000", "shard_000001"]
+    assert [entry["size"] for entry in manifest] == [3, 1]
+    data = _concat(str(tmp_path))
+    assert data["actions"].tolist() == [0, 1, 2, 3]
+    assert data["obs"][:, 0].tolist() == [0, 1, 2, 3]
+
+
+def test_writer_does_not_reopen_other_formats(tmp_path):
+    with TrajectoryWriter(str(tmp_path), obs_dim=2, chunk_size=8) as writer:
+        writer.add(np.zeros(2), 0, 0.0, False)
+    with TrajectoryWriter(
+        str(tmp_path), obs_dim=2, chunk_size=8, shard_format="memmap"
+    ) as writer:
+        writer.add(np.ones(2), 1, 1.0, True)
+
+    manifest = read_manifest(str(tmp_path))
+    assert [entry["shard"] for entry in manifest] == ["shard_000000", "shard_000001"]
+    assert _concat(str(tmp_path))["actions"].tolist() == [0, 1]
+
+
+def test_writer_invalid_format(tmp_path):
+    with pytest.raises(ValueError, match="Unsupported"):
+        TrajectoryWriter(str(tmp_path), shard_format="csv")
+
+
+def test_env_recorder(tmp_path):
+    writer = TrajectoryWriter(str(tmp_path), obs_dim=2, chunk_size=16)
+    env = TrajectoryRecorder(CountingEnv(), writer)
+
+    env.reset()
+    for action in (1, 2, 3):
+        env.step(action)
+    env.close()
+
+    data = _concat(str(tmp_path))
+    # Observations are the ones the actions were chosen from
+    assert data["obs"][:, 0].tolist() == [0, 1, 2]
+    assert data["actions"].tolist() == [1, 2, 3]
+    assert data["rewards"].tolist() == [1.0, 2.0, 3.0]
+    assert data["dones"].tolist() == [False, False, True]
+
+
+def test_turn_recorder(tmp_path):
+    cities = {
+        "CityA": MockCity(
+            "CityA", 10, {"gems": {"quantity": 10, "price": 100}}, ["CityB"]
+        ),
+        "CityB": MockCity("CityB", 20, {}, ["CityA"]),
+    }
+    agent = MockAgent(money=100)
+    writer = TrajectoryWriter(str(tmp_path), chunk_size=16)
+    recorder = TurnRecorder(writer)
+
+    recorder.before_turn(agent, cities)
+    agent.money = 80
+    agent.current_city_name = "CityB"
+    recorder.after_turn(agent, cities)
+
+    recorder.before_turn(agent, cities)
+    agent.money = 0
+    agent.last_action = 10
+    recorder.after_turn(agent, cities)
+    writer.close()
+
+    data = _concat(str(tmp_path))
+    assert data["obs"].shape == (2, 37)
+    assert data["actions"].tolist() == [NO_ACTION, 10]
+    assert data["rewards"].tolist() == [-20.0, -80.0]
+    assert data["dones"].tolist() == [False, True]
+
+
+class HookedAgent(MockAgent):
+    def __init__(self, money=100):
+        super().__init__(money)
+        self.action_hook = None
+        self.turn_actions = []
+
+    def act(self, action, money):
+        if self.action_hook is not None:
+            self.action_hook(self, action)
+        self.turn_actions.append(action)
+        self.money = money
+
+
+def test_turn_recorder_records_every_action(tmp_path):
+    cities = {
+        "CityA": MockCity("CityA", 10, {}, ["CityB"]),
+        "CityB": MockCity("CityB", 20, {}, ["CityA"]),
+    }
+    agent = HookedAgent(money=100)
+    writer = TrajectoryWriter(str(tmp_path), chunk_size=16)
+    recorder = TurnRecorder(writer)
+
+    recorder.before_turn(agent, cities)
+    agent.act(11, 80)
+    agent.current_city_name = "CityB"
+    agent.act(6, 130)
+    agent.act(2, 130)
+    # A dropped decision is not recorded
+    agent.turn_actions.pop()
+    recorder.after_turn(agent, cities)
+    writer.close()
+
+    assert agent.action_hook is None
+    data = _concat(str(tmp_path))
+    assert data["actions"].tolist() == [11, 6]
+    assert data["rewards"].tolist() == [-20.0, 50.0]
+    assert data["dones"].tolist() == [False, False]
+    # Each action is observed in the state it was taken in
+    assert data["obs"][0, 0] == pytest.approx(100 / 1e6)
+    assert data["obs"][1, 0] == pytest.approx(80 / 1e6)
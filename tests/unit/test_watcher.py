@@ -0,0 +1,104 @@
+"""Unit tests for the save watcher."""
+
+import os
+import threading
+import time
+
+import pytest
+
+from nre_ai.watcher import SaveWatcher, looks_complete
+
+
+@pytest.fixture
+def save_path(tmp_path):
+    path = tmp_path / "miasta.json"
+    path.write_text('{"after": []}')
+    return str(path)
+
+
+def rewrite(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+    # Make the change visible even on filesystems with coarse mtimes
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_looks_complete(save_path):
+    assert looks_complete(save_path)
+    rewrite(save_path, '{"after": [{"name": "Rybnik"')
+    assert not looks_complete(save_path)
+    assert not looks_complete(save_path + ".missing")
+
+
+def test_wait_times_out_without_changes(save_path):
+    watcher = SaveWatcher(save_path, debounce=0.01, poll_interval=0.001)
+    assert watcher.wait(timeout=0.05) is None
+
+
+def test_wait_returns_detection_time(save_path):
+    watcher = SaveWatcher(save_path, debounce=0.01, poll_interval=0.001)
+    before = time.perf_counter()
+    rewrite(save_path, '{"after": [1]}')
+
+    detected = watcher.wait(timeout=1)
+    assert detected is not None
+    assert detected >= before
+    # The save is consumed
+    assert watcher.wait(timeout=0.05) is None
+
+
+def test_partial_save_waits_for_completion(save_path):
+    watcher = SaveWatcher(save_path, debounce=0.01, poll_interval=0.001)
+    rewrite(save_path, '{"after": [')
+
+    def finish():
+        time.sleep(0.1)
+        rewrite(save_path, '{"after": [2]}')
+
+    thread = threading.Thread(target=finish)
+    thread.start()
+    start = time.perf_counter()
+    assert watcher.wait(timeout=1) is not None
+    thread.join()
+    assert time.perf_counter() - start >= 0.1
+
+
+def test_mark_seen_ignores_own_writes(save_path):
+    watcher = SaveWatcher(save_path, debounce=0.01, poll_interval=0.001)
+    rewrite(save_path, '{"after": [3]}')
+    watcher.mark_seen()
+    assert watcher.wait(timeout=0.05) is None
+
+
+def test_save_after_own_write_is_detected(save_path):
+    watcher = SaveWatcher(save_path, debounce=0.01, poll_interval=0.001)
+    rewrite(save_path, '{"after": [4]}')
+    own_write = os.stat(save_path)
+    # The game saves while the turn is still running
+    rewrite(save_path, '{"after": [4, 5]}')
+
+    watcher.mark_seen((own_write.st_mtime_ns, own_write.st_size))
+    assert watcher.wait(timeout=1) is not None
+
+
+def test_wait_times_out_while_the_file_keeps_changing(save_path):
+    watcher = SaveWatcher(save_path, debounce=0.05, poll_interval=0.001)
+    stop = threading.Event()
+
+    def keep_writing():
+        count = 0
+        while not stop.is_set():
+            count += 1
+            rewrite(save_path, f'{{"after": [{count}]}}')
+            time.sleep(0.005)
+
+    thread = threading.Thread(target=keep_writing)
+    thread.start()
+    start = time.perf_counter()
+    try:
+        assert watcher.wait(timeout=0.2) is None
+    finally:
+        stop.set()
+        thread.join()
+    assert time.perf_counter() - start < 1
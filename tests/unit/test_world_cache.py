@@ -0,0 +1,116 @@
+"""Unit tests for the parsed-world cache."""
+
+import json
+import os
+import shutil
+import stat
+
+import pytest
+
+from nre_ai import world_cache
+from nre_ai.world_cache import cache_path, invalidate, load_world
+
+TEST_DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "test_city_data.json")
+
+
+@pytest.fixture
+def world_path(tmp_path):
+    path = tmp_path / "data" / "miasta.json"
+    path.parent.mkdir()
+    shutil.copy(TEST_DATA_PATH, path)
+    return str(path)
+
+
+def test_first_load_writes_cache(world_path):
+    with open(TEST_DATA_PATH) as f:
+        expected = json.load(f)
+
+    assert load_world(world_path) == expected
+    assert os.path.exists(cache_path(world_path))
+    # Nothing is written next to the world
+    assert os.listdir(os.path.dirname(world_path)) == ["miasta.json"]
+
+
+def test_unchanged_world_skips_parsing(world_path, monkeypatch):
+    expected = load_world(world_path)
+
+    def fail(raw):
+        raise AssertionError("world parsed")
+
+    monkeypatch.setattr(world_cache.json, "loads", fail)
+    assert load_world(world_path) == expected
+    assert load_world(world_path, verify_hash=True) == expected
+
+
+def test_touched_world_validated_by_hash(world_path, monkeypatch):
+    expected = load_world(world_path)
+    stat = os.stat(world_path)
+    os.utime(world_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def fail(raw):
+        raise AssertionError("world parsed")
+
+    monkeypatch.setattr(world_cache.json, "loads", fail)
+    assert load_world(world_path) == expected
+
+
+def test_modified_world_invalidates_cache(world_path):
+    data = load_world(world_path)
+    data["after"][0]["fee"] = 12345
+    stat = os.stat(world_path)
+    with open(world_path, "w") as f:
+        json.dump(data, f)
+    # Same mtime as the cached file, only the size tells them apart
+    os.utime(world_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert load_world(world_path)["after"][0]["fee"] == 12345
+
+
+def test_same_size_rewrite_detected_with_verify_hash(world_path):
+    load_world(world_path)
+    stat = os.stat(world_path)
+    with open(world_path) as f:
+        text = f.read()
+    name = json.loads(text)["after"][0]["name"]
+    with open(world_path, "w") as f:
+        f.write(text.replace(f'"{name}"', f'"{name[::-1]}"'))
+    os.utime(world_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert load_world(world_path)["after"][0]["name"] == name
+    assert load_world(world_path, verify_hash=True)["after"][0]["name"] == name[::-1]
+
+
+def test_corrupt_cache_is_rebuilt(world_path):
+    expected = load_world(world_path)
+    with open(cache_path(world_path), "wb") as f:
+        f.write(b"not a pickle")
+
+    assert load_world(world_path) == expected
+    invalidate(world_path)
+    assert not os.path.exists(cache_path(world_path))
+
+
+def test_cache_directory_is_private(world_path, world_cache_dir):
+    load_world(world_path)
+
+    assert stat.S_IMODE(os.stat(world_cache_dir).st_mode) == 0o700
+    assert stat.S_IMODE(os.stat(cache_path(world_path)).st_mode) == 0o600
+
+
+def test_shared_cache_directory_is_not_used(world_path, world_cache_dir):
+    world_cache_dir.mkdir(mode=0o777)
+    os.chmod(world_cache_dir, 0o777)
+
+    assert load_world(world_path)["after"]
+    assert os.listdir(world_cache_dir) == []
+
+
+def test_cache_writable_by_others_is_ignored(world_path, monkeypatch):
+    expected = load_world(world_path)
+    os.chmod(cache_path(world_path), 0o666)
+
+    def fail(f):
+        raise AssertionError("untrusted cache unpickled")
+
+    monkeypatch.setattr(world_cache.pickle, "load", fail)
+    assert load_world(world_path) == expected
@@ -0,0 +1,144 @@
+"""Unit tests for copy-on-write world forks."""
+
+import copy
+
+import pytest
+
+from nre_ai.mechanics import (
+    buy_action,
+    calculate_net_worth,
+    execute_action,
+    get_observation,
+    sell_action,
+)
+from nre_ai.metrics import TRADES, TRAVELS
+from nre_ai.world_fork import SimulatedAgent, WorldFork
+
+
+class MockAgent:
+    def __init__(self, name="TestBot", money=1000, initial_city="CityA"):
+        self.name = name
+        self.money = money
+        self.current_city_name = initial_city
+        self.inventory = {}
+
+
+class MockCity:
+    def __init__(self, name, fee, commodities, connections):
+        self.name = name
+        self.fee = fee
+        self.commodities = commodities
+        self.connections = connections
+        self.factory = []
+
+
+@pytest.fixture
+def cities():
+    return {
+        "CityA": MockCity(
+            "CityA",
+            10,
+            {
+                "metal": {"price": 10, "quantity": 100, "regular_quantity": 100},
+                "gems": {"price": 50, "quantity": 5},
+                "food": None,
+            },
+            ["CityB"],
+        ),
+        "CityB": MockCity(
+            "CityB",
+            20,
+            {
+                "metal": {"price": 30, "quantity": 10},
+                "gems": {"price": 40, "quantity": 0},
+            },
+            ["CityA"],
+        ),
+    }
+
+
+def test_fork_leaves_world_untouched(cities):
+    original = copy.deepcopy({name: city.commodities for name, city in cities.items()})
+    fork = WorldFork(cities)
+    agent = SimulatedAgent.from_agent(MockAgent())
+
+    execute_action(buy_action("metal"), agent, fork, record=False)
+    execute_action(11, agent, fork, record=False)
+    execute_action(sell_action("metal"), agent, fork, record=False)
+
+    assert {name: city.commodities for name, city in cities.items()} == original
+    assert fork["CityA"].commodities["metal"]["quantity"] == 90
+    assert fork["CityB"].commodities["metal"]["quantity"] == 20
+    assert agent.money == 1000 - 100 - 20 + 300
+
+
+def test_only_written_cells_are_copied(cities):
+    fork = WorldFork(cities)
+    agent = SimulatedAgent.from_agent(MockAgent())
+
+    get_observation(agent, fork)
+    calculate_net_worth(agent, fork)
+    assert fork.modified_cells() == set()
+
+    execute_action(buy_action("gems"), agent, fork, record=False)
+    assert fork.modified_cells() == {("CityA", "gems")}
+    assert cities["CityA"].commodities["gems"]["quantity"] == 5
+
+
+def test_fork_matches_deep_copy(cities):
+    actions = [buy_action("metal"), buy_action("gems"), 11, 10, 11, buy_action("metal")]
+    real = MockAgent()
+    deep = copy.deepcopy(cities)
+    for action in actions:
+        execute_action(action, real, deep, record=False)
+
+    fork = WorldFork(cities)
+    agent = SimulatedAgent.from_agent(MockAgent())
+    for action in actions:
+        execute_action(action, agent, fork, record=False)
+
+    assert agent.money == real.money
+    assert agent.inventory == real.inventory
+    for name, city in deep.items():
+        for item, details in city.commodities.items():
+            forked = fork[name].commodities[item]
+            assert (dict(forked) if details else forked) == details
+
+
+def test_nested_forks(cities):
+    parent = WorldFork(cities)
+    parent["CityA"].commodities["metal"]["quantity"] = 50
+    child = parent.fork()
+    child["CityA"].commodities["metal"]["quantity"] -= 5
+
+    assert child["CityA"].commodities["metal"]["quantity"] == 45
+    assert parent["CityA"].commodities["metal"]["quantity"] == 50
+    assert cities["CityA"].commodities["metal"]["quantity"] == 100
+    assert child.modified_cells() == {("CityA", "metal")}
+
+
+def test_city_attributes_are_shared(cities):
+    fork = WorldFork(cities)
+    city = fork["CityA"]
+    assert city.fee == 10
+    assert city.connections == ["CityB"]
+    assert "food" in city.commodities
+    assert city.commodities["food"] is None
+    assert list(fork) == ["CityA", "CityB"]
+
+
+def test_simulated_agent_is_independent():
+    bot = MockAgent()
+    bot.inventory = {"metal": {"quantity": 5, "avg_buy_price": 10}}
+    agent = SimulatedAgent.from_agent(bot)
+    agent.inventory["metal"]["quantity"] = 1
+    assert bot.inventory["metal"]["quantity"] == 5
+    assert agent.copy().inventory == agent.inventory
+
+
+def test_hypothetical_actions_not_counted(cities):
+    trades, travels = TRADES.value, TRAVELS.value
+    agent = SimulatedAgent.from_agent(MockAgent())
+    execute_action(buy_action("metal"), agent, WorldFork(cities), record=False)
+    execute_action(11, agent, WorldFork(cities), record=False)
+    assert (TRADES.value, TRAVELS.value) == (trades, travels)
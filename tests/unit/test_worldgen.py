@@ -0,0 +1,124 @@
+"""Unit tests for the synthetic world generator."""
+
+import json
+
+import numpy as np
+import pytest
+
+from nre_ai.mechanics import COMMODITIES
+from nre_ai.worldgen import (
+    CAPITAL_NAME,
+    build_connections,
+    generate_world,
+    sample_degrees,
+)
+
+FACTORY_MAP = {
+    "metal": "Wysypisko",
+    "gems": "Jubiler",
+    "food": "McRoman",
+    "fuel": "Grobowiec",
+    "relics": "Kosciol",
+}
+
+
+def _neighbor_sets(offsets, neighbors):
+    return [
+        set(neighbors[offsets[i] : offsets[i + 1]].tolist())
+        for i in range(len(offsets) - 1)
+    ]
+
+
+@pytest.mark.parametrize("distribution", ["uniform", "poisson", "powerlaw"])
+def test_sample_degrees_bounds(distribution):
+    rng = np.random.default_rng(0)
+    degrees = sample_degrees(500, rng, distribution, min_degree=2, max_degree=6)
+
+    assert degrees.shape == (500,)
+    assert degrees.min() >= 2
+    assert degrees.max() <= 6
+
+
+def test_sample_degrees_unknown_distribution():
+    with pytest.raises(ValueError, match="Unknown degree distribution"):
+        sample_degrees(10, np.random.default_rng(0), "normal")
+
+
+def test_build_connections_symmetric_and_connected():
+    rng = np.random.default_rng(1)
+    degrees = sample_degrees(300, rng)
+    offsets, neighbors = build_connections(degrees, rng)
+    adjacency = _neighbor_sets(offsets, neighbors)
+
+    for city, linked in enumerate(adjacency):
+        assert city not in linked
+        for other in linked:
+            assert city in adjacency[other]
+
+    seen = {0}
+    stack = [0]
+    while stack:
+        for other in adjacency[stack.pop()]:
+            if other not in seen:
+                seen.add(other)
+                stack.append(other)
+    assert len(seen) == 300
+
+
+def test_generate_world_format(tmp_path):
+    path = tmp_path / "world.json"
+    generate_world(str(path), 50, seed=3, factory_map=FACTORY_MAP, chunk_size=16)
+
+    with open(path) as f:
+        data = json.load(f)
+
+    assert len(data["cities"]) == 50
+    assert data["cities"] == data["after"]
+
+    capital = data["cities"][0]
+    assert capital["name"] == CAPITAL_NAME
+    assert capital["size"] == "big"
+    assert capital["factory"]
+
+    names = {city["name"] for city in data["cities"]}
+    assert len(names) == 50
+    for city in data["cities"]:
+        assert set(city["connections"]) <= names
+        for item in COMMODITIES:
+            details = city["commodities"][item]
+            assert details["quantity"] >= 0
+            assert details["price"] > 0
+            assert set(details) == {
+                "quantity",
+                "price",
+                "regular_price",
+                "regular_quantity",
+                "special",
+            }
+
+
+def test_generate_world_is_seeded(tmp_path):
+    first = tmp_path / "first.json"
+    second = tmp_path / "second.json"
+    other = tmp_path / "other.json"
+
+    generate_world(str(first), 40, seed=7, factory_map=FACTORY_MAP)
+    generate_world(str(second), 40, seed=7, factory_map=FACTORY_MAP)
+    generate_world(str(other), 40, seed=8, factory_map=FACTORY_MAP)
+
+    assert first.read_text() == second.read_text()
+    assert first.read_text() != other.read_text()
+
+
+def test_generate_world_single_city(tmp_path):
+    path = tmp_path / "world.json"
+    generate_world(str(path), 1, factory_map=FACTORY_MAP)
+
+    with open(path) as f:
+        data = json.load(f)
+    assert data["cities"][0]["connections"] == []
+
+
+def test_generate_world_invalid_size(tmp_path):
+    with pytest.raises(ValueError, match="positive"):
+        generate_world(str(tmp_path / "world.json"), 0)